@@ -0,0 +1,161 @@
+from typing import Dict, Hashable, Iterable, List, Tuple
+from heapq import heappush, heappop
+
+
+# ----------------------------
+# Minimum-cost bipartite assignment
+# ----------------------------
+
+Edge = Tuple[Hashable, Hashable, float]
+
+
+def connected_components(edges: Iterable[Edge]) -> List[List[Edge]]:
+    """
+    Split a bipartite edge list (left, right, cost) into independent
+    components, so each can be solved on its own.
+    """
+    parent: Dict[tuple, tuple] = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    edges = list(edges)
+    for left, right, _ in edges:
+        a, b = find(("L", left)), find(("R", right))
+        if a != b:
+            parent[a] = b
+
+    components: Dict[tuple, List[Edge]] = {}
+    for edge in edges:
+        components.setdefault(find(("L", edge[0])), []).append(edge)
+    return list(components.values())
+
+
+def min_cost_assignment(edges: Iterable[Edge]) -> Dict[Hashable, Hashable]:
+    """
+    Maximum-cardinality, minimum-cost matching over a sparse bipartite graph.
+
+    Primal-dual successive shortest paths: each phase runs Dijkstra (with
+    Johnson potentials) from all free left nodes at once to find the cheapest
+    augmenting path length, then augments along every vertex-disjoint path of
+    that length. After each phase the matching is the cheapest one of its
+    size. Costs must be non-negative; integer costs give the most ties and so
+    the fewest phases.
+
+    Returns {left: right}.
+    """
+    adjacency: Dict[Hashable, List[Tuple[Hashable, float]]] = {}
+    for left, right, c in edges:
+        adjacency.setdefault(left, []).append((right, c))
+
+    match_l: Dict[Hashable, Hashable] = {}
+    match_r: Dict[Hashable, Hashable] = {}
+    pot_l = dict.fromkeys(adjacency, 0)
+    pot_r = {right: 0 for links in adjacency.values() for right, _ in links}
+
+    def augment(lefts: List[Hashable], rights: List[Hashable]) -> None:
+        for left, right in zip(lefts, rights):
+            match_l[left] = right
+            match_r[right] = left
+
+    def augment_admissible(source: Hashable, visited: set) -> None:
+        """
+        Depth-first search for a zero-reduced-cost augmenting path.
+        """
+        lefts = [source]
+        rights: List[Hashable] = []
+        stack = [iter(adjacency[source])]
+
+        while stack:
+            left = lefts[-1]
+            for right, c in stack[-1]:
+                if right in visited or match_l.get(left) == right:
+                    continue
+                if c + pot_l[left] - pot_r[right] > 0:
+                    continue
+
+                visited.add(right)
+                rights.append(right)
+                partner = match_r.get(right)
+                if partner is None:
+                    augment(lefts, rights)
+                    return
+                lefts.append(partner)
+                stack.append(iter(adjacency[partner]))
+                break
+            else:
+                stack.pop()
+                lefts.pop()
+                if rights:
+                    rights.pop()
+
+    while True:
+        dist_l = {left: 0 for left in adjacency if left not in match_l}
+        dist_r: Dict[Hashable, float] = {}
+        prev_r: Dict[Hashable, Hashable] = {}
+        heap = [(0, n, left) for n, left in enumerate(dist_l)]
+        counter = len(heap)
+        done = set()
+
+        limit = float("inf")
+        target = None
+
+        while heap:
+            d, _, left = heappop(heap)
+            if d >= limit:
+                break
+            if left in done:
+                continue
+            done.add(left)
+
+            for right, c in adjacency[left]:
+                if match_l.get(left) == right:
+                    continue
+                # Clamp float round-off so a settled node is never improved
+                nd = d + max(c + pot_l[left] - pot_r[right], 0)
+                if nd < dist_r.get(right, float("inf")):
+                    dist_r[right] = nd
+                    prev_r[right] = left
+                    # A matched right node's only residual edge leads back to
+                    # its partner with zero reduced cost.
+                    partner = match_r.get(right)
+                    if partner is None:
+                        if nd < limit:
+                            limit, target = nd, right
+                    elif nd < dist_l.get(partner, float("inf")):
+                        dist_l[partner] = nd
+                        heappush(heap, (nd, counter, partner))
+                        counter += 1
+
+        if target is None:
+            break
+
+        # Nodes at or beyond the target's distance keep their potential;
+        # shifting every potential by the same constant leaves reduced costs
+        # unchanged, so only nodes closer than the target need touching.
+        # Afterwards every shortest augmenting path has zero reduced cost.
+        for left, d in dist_l.items():
+            if d < limit:
+                pot_l[left] += d - limit
+        for right, d in dist_r.items():
+            if d < limit:
+                pot_r[right] += d - limit
+
+        lefts, rights = [], [target]
+        while True:
+            lefts.append(prev_r[rights[-1]])
+            previous = match_l.get(lefts[-1])
+            if previous is None:
+                break
+            rights.append(previous)
+        augment(lefts, rights)
+
+        visited = set()
+        for source in [left for left in adjacency if left not in match_l]:
+            augment_admissible(source, visited)
+
+    return match_l
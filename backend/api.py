@@ -1,32 +1,228 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from contextlib import aclosing, asynccontextmanager
 from datetime import datetime
+from typing import TYPE_CHECKING
+import asyncio
+import importlib
+import io
+import json
+import logging
+import os
 import sys
+import time
+import zipfile
 from pathlib import Path
-import requests
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from parser import parse_purchases
-from reconcile import reconcile_expenses
-from backend.pdf_generator import generate_affidavit
+import metrics
+from metrics import METRICS, stage
+from backend.pools import STAGES, StageSaturated, retrieve, shutdown_pools
+from result_cache import ResultCache, result_key
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from session import ReconcileSession
 
 from backend.models import (
     ReconcileRequest,
     ReconcileResponse,
+    BatchReconcileRequest,
     ExpectedExpenseSchema,
     ReportItemSchema,
-    MatchedPair,
-    AffidavitRequest
+    expected_expense_dict,
+    match_candidate_dict,
+    rejected_line_dict,
+    reconcile_response_dict,
+    report_item_dict,
+    AffidavitRequest,
+    BulkAffidavitRequest,
+    SessionCreateRequest,
+    SessionExpectedRequest,
+    SessionExpectedSchema,
+    SessionActualSchema,
+    SessionPairSchema,
+    SessionDeltaResponse
 )
 
+
+# ----------------------------
+# Lazy imports
+# ----------------------------
+
+class LazyModule:
+    """
+    A module imported on first attribute access, so its import cost lands on
+    the first request that needs it instead of on process startup.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._module = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the module has been imported, here or by anything else"""
+        return self.name in sys.modules
+
+    def load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self.name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+
+# openpyxl, numpy and requests (parser, and session through it) and pypdf
+# and reportlab (pdf_generator) take most of the import time; /health and
+# /metrics need none of them.
+parser_module = LazyModule("parser")
+sources_module = LazyModule("sources")
+reconcile_module = LazyModule("reconcile")
+session_module = LazyModule("session")
+pdf_module = LazyModule("backend.pdf_generator")
+requests = LazyModule("requests")
+
+LAZY_MODULES = [requests, parser_module, sources_module, reconcile_module, session_module, pdf_module]
+
+# EXPENSE_WARMUP=1 runs warmup() in the background as the app starts
+WARMUP_ON_START = os.environ.get("EXPENSE_WARMUP", "0") == "1"
+
+
+def warmup() -> None:
+    """
+    Import the lazily loaded modules and preload the affidavit template and
+    signature font. Worker processes forked afterwards inherit all of it.
+    """
+    for module in LAZY_MODULES:
+        module.load()
+    pdf_module.warmup()
+
+
+# ----------------------------
+# Reconcile result cache
+# ----------------------------
+
+PRICE_TOLERANCE = 1.00
+SIMILARITY_THRESHOLD = 0.75
+
+# Finished /reconcile responses keyed by request content and sheet version
+# (see result_cache.py). EXPENSE_RESULT_CACHE_DIR adds a disk tier shared by
+# workers and restarts; EXPENSE_RESULT_CACHE=0 turns the cache off.
+RESULT_CACHE = (
+    ResultCache(directory=os.environ.get("EXPENSE_RESULT_CACHE_DIR") or None)
+    if os.environ.get("EXPENSE_RESULT_CACHE", "1") != "0" else None
+)
+
+
+def result_cache_stats() -> dict:
+    return RESULT_CACHE.stats() if RESULT_CACHE is not None else {}
+
+
+def fetch_for_reconcile(request: ReconcileRequest, start_date_parser: str, digest: str):
+    """
+    (cached response body, None, ...) when the result for digest against the
+    sheet's current version is cached, else (None, actual items, sheet ID,
+    version of the rows they came from). The cache is checked before the
+    sheet is fetched and again after, since the fetch may only have
+    revalidated the rows already in memory.
+    """
+    sheet = parser_module.source_key(request.sheet_link)
+    version = parser_module.sheet_version(request.sheet_link, start_date_parser)
+    if version is not None:
+        body = RESULT_CACHE.get(sheet, version, digest)
+        if body is not None:
+            return body, None, sheet, version
+
+    actual_items, fetched = parser_module.parse_purchases_versioned(
+        request.sheet_link,
+        request.cardholder_name,
+        start_date_parser
+    )
+    if fetched is not None and fetched != version:
+        body = RESULT_CACHE.get(sheet, fetched, digest)
+        if body is not None:
+            return body, None, sheet, fetched
+    return None, actual_items, sheet, fetched
+
+
+# Work a response doesn't wait for, held until it finishes so its failure is logged
+BACKGROUND_JOBS = set()
+
+
+def in_background(job: asyncio.Future) -> None:
+    BACKGROUND_JOBS.add(job)
+    job.add_done_callback(background_job_done)
+
+
+def background_job_done(job: asyncio.Future) -> None:
+    BACKGROUND_JOBS.discard(job)
+    if not job.cancelled() and job.exception() is not None:
+        logger.error("Background job failed", exc_info=job.exception())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_START:
+        app.state.warmup = asyncio.get_running_loop().run_in_executor(None, warmup)
+    yield
+    shutdown_pools()
+    if parser_module.loaded:
+        parser_module.shutdown_conversion_pool()
+
+
 app = FastAPI(
     title="Expense Reconciliation API",
     description="API for reconciling expected expenses against actual expenses from Google Sheets",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+
+class TimingMiddleware:
+    """
+    Per-request stage collection: feeds the request duration histogram and,
+    when metrics.TIMING_HEADER is on, adds an X-Timing breakdown header
+    (Server-Timing syntax, milliseconds) to the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        collector, token = metrics.begin_request()
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and metrics.TIMING_HEADER:
+                collector.stages.append(("total", time.perf_counter() - started))
+                headers = list(message.get("headers", []))
+                headers.append((b"x-timing", collector.timing_header().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.end_request(token)
+            route = scope.get("route")
+            METRICS.observe(
+                "request_seconds",
+                "route",
+                route.path if route is not None else "unmatched",
+                time.perf_counter() - started
+            )
+
+
+app.add_middleware(TimingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
@@ -36,10 +232,150 @@ app.add_middleware(
 )
 
 
+def sheet_cache_stats() -> dict:
+    """Sheet cache statistics; empty until the parser is first loaded"""
+    return parser_module.SHEET_CACHE.stats() if parser_module.loaded else {}
+
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "sheet_cache": sheet_cache_stats(),
+        "result_cache": result_cache_stats(),
+        "stages": {name: pool_stage.stats() for name, pool_stage in STAGES.items()}
+    }
+
+
+@app.post("/warmup")
+async def warmup_endpoint():
+    """
+    Load the parser, matcher and PDF modules and preload the affidavit
+    template and font ahead of traffic. Safe to call repeatedly.
+    """
+    started = time.perf_counter()
+    await asyncio.to_thread(warmup)
+    return {"status": "ok", "seconds": round(time.perf_counter() - started, 3)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text exposition of stage timings, counters and pool usage"""
+    lines = [METRICS.render()]
+    lines.append("# TYPE expense_pool_active gauge")
+    for name, pool_stage in STAGES.items():
+        lines.append(f'expense_pool_active{{stage="{name}"}} {pool_stage.active}')
+    lines.append("# TYPE expense_pool_rejected_total counter")
+    for name, pool_stage in STAGES.items():
+        lines.append(f'expense_pool_rejected_total{{stage="{name}"}} {pool_stage.rejected}')
+    lines.append("# TYPE expense_sheet_cache gauge")
+    for key, value in sheet_cache_stats().items():
+        lines.append(f'expense_sheet_cache{{stat="{key}"}} {value}')
+    lines.append("# TYPE expense_result_cache gauge")
+    for key, value in result_cache_stats().items():
+        lines.append(f'expense_result_cache{{stat="{key}"}} {value}')
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+
+def stage_busy(e: StageSaturated) -> HTTPException:
+    """429 for a saturated stage; clients should back off and retry"""
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse holding a stage slot (pools.Slot), released when
+    the response ends however it ends: sent, failed, or dropped by a client
+    that disconnected before the body started, when the generator's own
+    finally never runs.
+    """
+
+    def __init__(self, content, slot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+# Compact separators; the C encoder handles the plain dicts directly
+encode_json = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def event_payload(event: tuple) -> dict:
+    """JSON payload of one reconcile_events event (or a stream "error")"""
+    kind = event[0]
+    if kind == "matched":
+        _, phase, exp, act = event
+        return {"phase": phase, "expected": expected_expense_dict(exp), "actual": report_item_dict(act)}
+    if kind == "unmatched_expected":
+        return {
+            "expected": expected_expense_dict(event[1]),
+            "candidates": [match_candidate_dict(c) for c in event[2]]
+        }
+    if kind == "unmatched_actual":
+        return {"actual": report_item_dict(event[1])}
+    if kind == "rejected_line":
+        return {"rejected": rejected_line_dict(event[1])}
+    if kind == "error":
+        return {"detail": event[1]}
+    return {"total_cost": event[1]}
+
+
+def format_events(events, fmt: str) -> str:
+    """
+    Encode events as NDJSON lines ({"event": kind, ...payload}) or SSE
+    messages (event: kind, data: payload).
+    """
+    with stage("serialize"):
+        if fmt == "sse":
+            return "".join(
+                f"event: {event[0]}\ndata: {encode_json(event_payload(event))}\n\n"
+                for event in events
+            )
+        return "".join(
+            encode_json({"event": event[0], **event_payload(event)}) + "\n"
+            for event in events
+        )
+
+
+def reconcile_stream(request: ReconcileRequest, actual_items) -> StreamingResponse:
+    """
+    Streaming /reconcile: expected lines that did not parse come first, then
+    matches as they are found (Phase 1, then Phase 2), then unmatched
+    expected and actual items, then a "done" event with the total cost. A
+    failure mid-stream ends it with an "error" event.
+    """
+    match_stage = STAGES["match"]
+    slot = match_stage.admit()
+
+    async def stream():
+        try:
+            async with aclosing(match_stage.iterate(
+                reconcile_module.reconcile_events,
+                request.expected_expenses,
+                actual_items,
+                PRICE_TOLERANCE,
+                SIMILARITY_THRESHOLD,
+                request.strategy
+            )) as batches:
+                async for events in batches:
+                    yield format_events(events, request.stream)
+        except Exception as e:
+            yield format_events([("error", f"Reconciliation failed: {str(e)}")], request.stream)
+
+    return SlotStreamingResponse(
+        stream(),
+        slot,
+        media_type=STREAM_MEDIA_TYPES[request.stream],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.post("/reconcile", response_model=ReconcileResponse)
@@ -50,44 +386,229 @@ async def reconcile(request: ReconcileRequest):
     - **cardholder_name**: Name to filter transactions by
     - **start_date**: Start date in YYYY-MM-DD format
     - **expected_expenses**: Text block with expected expenses (MM/DD/YY - Vendor - $Price)
+    - **strategy**: "greedy" (default) or "optimal" global assignment
+    - **stream**: "ndjson" or "sse" to stream results as they are produced
 
-    Returns matched pairs, unmatched expected expenses, and unmatched actual expenses.
+    Returns matched pairs, unmatched expected expenses, unmatched actual expenses,
+    and the total match cost of the pairs. In streaming mode each is sent as
+    its own event instead (see reconcile_stream).
+
+    Non-streaming results are cached until the sheet changes, so resubmitting
+    the same request skips the fetch and the matching.
     """
     try:
         start_date_obj = datetime.strptime(request.start_date, "%Y-%m-%d")
         start_date_parser = start_date_obj.strftime("%m/%d/%Y")
 
-        actual_items = parse_purchases(
-            request.sheet_link,
-            request.cardholder_name,
-            start_date_parser
-        )
+        if request.stream or RESULT_CACHE is None:
+            actual_items = await STAGES["fetch"].run(
+                parser_module.parse_purchases,
+                request.sheet_link,
+                request.cardholder_name,
+                start_date_parser
+            )
+            if request.stream:
+                return reconcile_stream(request, actual_items)
+            digest = version = None
+        else:
+            digest = result_key(
+                request.expected_expenses,
+                request.cardholder_name,
+                request.start_date,
+                PRICE_TOLERANCE,
+                SIMILARITY_THRESHOLD,
+                request.strategy
+            )
+            body, actual_items, sheet, version = await STAGES["fetch"].run(
+                fetch_for_reconcile, request, start_date_parser, digest
+            )
+            if body is not None:
+                return Response(content=body, media_type="application/json")
 
-        results = reconcile_expenses(
+        body = await STAGES["match"].run(
+            reconcile_body,
             request.expected_expenses,
             actual_items,
-            price_tolerance=1.00,
-            similarity_threshold=0.75
+            request.strategy
         )
+        if version is not None:
+            # Storing may touch disk; the response doesn't wait for it
+            in_background(asyncio.get_running_loop().run_in_executor(
+                None, RESULT_CACHE.put, sheet, version, digest, body
+            ))
+        return Response(content=body, media_type="application/json")
 
-        return ReconcileResponse(
-            matched=[
-                MatchedPair(
-                    expected=ExpectedExpenseSchema.from_dataclass(exp),
-                    actual=ReportItemSchema.from_dataclass(act)
-                )
-                for exp, act in results["matched"]
-            ],
+    except StageSaturated as e:
+        raise stage_busy(e)
+    except sources_module.SheetLinkError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sheet link: {str(e)}")
+    except parser_module.SheetSchemaError as e:
+        raise HTTPException(status_code=400, detail=f"Unrecognized purchase sheet: {str(e)}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise HTTPException(status_code=502, detail=f"Failed to access Google Sheets: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reconciliation failed: {str(e)}")
+
+
+def reconcile_body(expected_text: str, actual_items, strategy: str) -> bytes:
+    """
+    reconcile_expenses and its JSON response body, as one match-stage job:
+    building and encoding the response for thousands of items is CPU work
+    too, and would otherwise run on the event loop.
+    """
+    results = reconcile_module.reconcile_expenses(
+        expected_text,
+        actual_items,
+        price_tolerance=PRICE_TOLERANCE,
+        similarity_threshold=SIMILARITY_THRESHOLD,
+        strategy=strategy
+    )
+    with stage("serialize"):
+        return encode_json(reconcile_response_dict(results)).encode()
+
+
+def batch_line(cardholder_name: str, expected_text: str, actual_items, strategy: str) -> str:
+    """One cardholder's /reconcile/batch NDJSON line, built like reconcile_body"""
+    results = reconcile_module.reconcile_expenses(
+        expected_text,
+        actual_items,
+        price_tolerance=PRICE_TOLERANCE,
+        similarity_threshold=SIMILARITY_THRESHOLD,
+        strategy=strategy
+    )
+    with stage("serialize"):
+        return encode_json({"cardholder_name": cardholder_name, "result": reconcile_response_dict(results)}) + "\n"
+
+
+def fetch_and_partition(sheet_link: str, names, start_dt):
+    rows = parser_module.fetch_purchase_rows(sheet_link, start_dt)
+    return parser_module.parse_purchase_rows_by_cardholder(rows, names, start_dt)
+
+
+@app.post("/reconcile/batch")
+async def reconcile_batch(request: BatchReconcileRequest):
+    """
+    Reconcile many cardholders against one spreadsheet.
+
+    - **start_date**: Start date in YYYY-MM-DD format
+    - **sheet_link**: Purchase form spreadsheet, fetched and parsed once
+    - **cardholders**: List of {cardholder_name, expected_expenses}
+    - **strategy**: "greedy" (default) or "optimal" global assignment
+
+    Rows are partitioned by P-card holder in a single pass, each cardholder is
+    reconciled on the match stage, and results stream back as NDJSON, one
+    line per cardholder in completion order:
+    {"cardholder_name": ..., "result": {...}} or {"cardholder_name": ..., "error": ...}
+    """
+    try:
+        start_dt = datetime.strptime(request.start_date, "%Y-%m-%d").date()
+        items_by_cardholder = await STAGES["fetch"].run(
+            fetch_and_partition,
+            request.sheet_link,
+            {entry.cardholder_name for entry in request.cardholders},
+            start_dt
+        )
+        match_stage = STAGES["match"]
+        slot = match_stage.admit()
+
+    except StageSaturated as e:
+        raise stage_busy(e)
+    except sources_module.SheetLinkError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sheet link: {str(e)}")
+    except parser_module.SheetSchemaError as e:
+        raise HTTPException(status_code=400, detail=f"Unrecognized purchase sheet: {str(e)}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise HTTPException(status_code=502, detail=f"Failed to access Google Sheets: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reconciliation failed: {str(e)}")
+
+    async def run(entry):
+        try:
+            return await match_stage.submit(
+                batch_line,
+                entry.cardholder_name,
+                entry.expected_expenses,
+                items_by_cardholder[entry.cardholder_name],
+                request.strategy
+            )
+        except Exception as e:
+            line = {"cardholder_name": entry.cardholder_name, "error": f"Reconciliation failed: {str(e)}"}
+            return encode_json(line) + "\n"
+
+    async def stream():
+        for finished in asyncio.as_completed([run(entry) for entry in request.cardholders]):
+            yield await finished
+
+    return SlotStreamingResponse(stream(), slot, media_type="application/x-ndjson")
+
+
+def session_delta_response(session: "ReconcileSession", delta) -> SessionDeltaResponse:
+    """Convert a SessionDelta to its response model"""
+    with stage("serialize"):
+        return SessionDeltaResponse(
+            session_id=session.id,
+            matched=[SessionPairSchema.from_pair(pair) for pair in delta.matched],
+            unmatched=[SessionPairSchema.from_pair(pair) for pair in delta.unmatched],
             unmatched_expected=[
-                ExpectedExpenseSchema.from_dataclass(exp)
-                for exp in results["unmatched_expected"]
+                SessionExpectedSchema(
+                    id=exp_id,
+                    **ExpectedExpenseSchema.from_dataclass(session.expected[exp_id]).model_dump()
+                )
+                for exp_id in delta.unmatched_expected
             ],
             unmatched_actual=[
-                ReportItemSchema.from_dataclass(act)
-                for act in results["unmatched_actual"]
-            ]
+                SessionActualSchema(
+                    id=act_id,
+                    **ReportItemSchema.from_dataclass(session.actual[act_id]).model_dump()
+                )
+                for act_id in delta.unmatched_actual
+            ],
+            removed_expected=delta.removed_expected
         )
 
+
+def get_session(session_id: str) -> "ReconcileSession":
+    try:
+        return session_module.SESSIONS.get(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired session: {session_id}")
+
+
+@app.post("/sessions", response_model=SessionDeltaResponse)
+async def create_session(request: SessionCreateRequest):
+    """
+    Start an incremental reconciliation session.
+
+    Parses the sheet and the initial expected expenses once and keeps them in
+    memory; the response is the full initial state. Later updates only match
+    what changed and only return changed pairs.
+    """
+    try:
+        start_date_obj = datetime.strptime(request.start_date, "%Y-%m-%d")
+
+        session = session_module.ReconcileSession(
+            request.sheet_link,
+            request.cardholder_name,
+            start_date_obj.date(),
+            price_tolerance=PRICE_TOLERANCE,
+            similarity_threshold=SIMILARITY_THRESHOLD
+        )
+        await STAGES["fetch"].run(session.refresh)
+        await STAGES["session"].run(session.add_expected, request.expected_expenses)
+        session_module.SESSIONS.add(session)
+
+        return session_delta_response(session, session.snapshot())
+
+    except StageSaturated as e:
+        raise stage_busy(e)
+    except sources_module.SheetLinkError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sheet link: {str(e)}")
+    except parser_module.SheetSchemaError as e:
+        raise HTTPException(status_code=400, detail=f"Unrecognized purchase sheet: {str(e)}")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
     except requests.exceptions.RequestException as e:
@@ -96,6 +617,96 @@ async def reconcile(request: ReconcileRequest):
         raise HTTPException(status_code=500, detail=f"Reconciliation failed: {str(e)}")
 
 
+@app.get("/sessions/{session_id}", response_model=SessionDeltaResponse)
+async def read_session(session_id: str):
+    """Full current state of a session"""
+    session = get_session(session_id)
+    return session_delta_response(session, session.snapshot())
+
+
+@app.post("/sessions/{session_id}/expected", response_model=SessionDeltaResponse)
+async def update_session_expected(session_id: str, request: SessionExpectedRequest):
+    """
+    Add and/or remove expected expense lines.
+
+    - **add**: Text block of lines to add (MM/DD/YY - Vendor - $Price)
+    - **remove**: Ids of previously added lines to remove
+
+    Returns only the pairs and items this update changed.
+    """
+    session = get_session(session_id)
+
+    try:
+        delta = await STAGES["session"].run(session.update_expected, add=request.add, remove=request.remove)
+        return session_delta_response(session, delta)
+
+    except StageSaturated as e:
+        raise stage_busy(e)
+    except sources_module.SheetLinkError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sheet link: {str(e)}")
+    except parser_module.SheetSchemaError as e:
+        raise HTTPException(status_code=400, detail=f"Unrecognized purchase sheet: {str(e)}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise HTTPException(status_code=502, detail=f"Failed to access Google Sheets: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
+
+
+@app.post("/sessions/{session_id}/refresh", response_model=SessionDeltaResponse)
+async def refresh_session(session_id: str):
+    """
+    Pull sheet rows added since the last refresh and match only those.
+    """
+    session = get_session(session_id)
+
+    try:
+        delta = await STAGES["fetch"].run(session.refresh)
+        return session_delta_response(session, delta)
+
+    except StageSaturated as e:
+        raise stage_busy(e)
+    except sources_module.SheetLinkError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sheet link: {str(e)}")
+    except parser_module.SheetSchemaError as e:
+        raise HTTPException(status_code=400, detail=f"Unrecognized purchase sheet: {str(e)}")
+    except requests.exceptions.RequestException as e:
+        raise HTTPException(status_code=502, detail=f"Failed to access Google Sheets: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Refresh failed: {str(e)}")
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """End a session and free its memory"""
+    session_module.SESSIONS.remove(session_id)
+    return {"status": "ok"}
+
+
+def affidavit_filename(vendor: str, date: str) -> str:
+    return f"affidavit_{vendor.replace(' ', '_')}_{date}.pdf"
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only, unseekable sink so zipfile output can be streamed in pieces"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
 @app.post("/api/generate-affidavit")
 async def generate_affidavit_endpoint(request: AffidavitRequest):
     """
@@ -109,14 +720,15 @@ async def generate_affidavit_endpoint(request: AffidavitRequest):
     Returns PDF binary stream.
     """
     try:
-        pdf_bytes = generate_affidavit(
+        pdf_bytes = io.BytesIO(await STAGES["render"].run(
+            pdf_module.render_affidavit_bytes,
             vendor=request.vendor,
             price=request.price,
             date=request.date,
             cardholder_name=request.cardholder_name
-        )
+        ))
 
-        filename = f"affidavit_{request.vendor.replace(' ', '_')}_{request.date}.pdf"
+        filename = affidavit_filename(request.vendor, request.date)
 
         return StreamingResponse(
             pdf_bytes,
@@ -126,9 +738,132 @@ async def generate_affidavit_endpoint(request: AffidavitRequest):
             }
         )
 
+    except StageSaturated as e:
+        raise stage_busy(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=f"Template file not found: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Affidavit generation failed: {str(e)}")
+
+
+@app.post("/api/generate-affidavits")
+async def generate_affidavits_endpoint(request: BulkAffidavitRequest):
+    """
+    Generate affidavits for many expenses in one request.
+
+    - **expenses**: List of {vendor, price, date (YYYY-MM-DD)}
+    - **cardholder_name**: Full cardholder name with role
+    - **format**: "pdf" for one merged multi-page PDF (default), "zip" for one PDF per expense
+
+    Pages are rendered on the render stage. Zip output streams entry by entry
+    as pages finish; merged PDF output streams once every page is rendered.
+    A merged PDF whose text the fast path can draw is written as one job.
+    """
+    try:
+        for expense in request.expenses:
+            datetime.fromisoformat(expense.date)
+        pdf_module.template_bytes()
+        expense_dicts = [
+            {"vendor": expense.vendor, "price": expense.price, "date": expense.date}
+            for expense in request.expenses
+        ]
+        render_stage = STAGES["render"]
+        slot = render_stage.admit()
+
+    except StageSaturated as e:
+        raise stage_busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(e)}")
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=500, detail=f"Template file not found: {str(e)}")
+
+    try:
+        return affidavits_response(request, expense_dicts, render_stage, slot)
+    except BaseException:
+        slot.release()
+        raise
+
+
+def abandon(renders) -> None:
+    """Cancel the page renders a failed response no longer waits for."""
+    for render in renders:
+        if not render.cancel():
+            render.add_done_callback(retrieve)
+
+
+def affidavits_response(request: BulkAffidavitRequest, expense_dicts, render_stage, slot) -> StreamingResponse:
+    """
+    Start the renders for /api/generate-affidavits and the response that
+    streams them. The response releases slot once it has sent the document.
+    """
+    if request.format == "pdf" and pdf_module.fast_path_expenses(expense_dicts, request.cardholder_name):
+        # The whole document is one incremental update of the prepared
+        # template, cheaper than fanning pages out and merging them
+        async def stream_document():
+            try:
+                document = await render_stage.submit(
+                    pdf_module.render_affidavits_bytes, expense_dicts, request.cardholder_name
+                )
+            finally:
+                slot.release()
+            for start in range(0, len(document), 64 * 1024):
+                yield document[start:start + 64 * 1024]
+
+        return SlotStreamingResponse(
+            stream_document(),
+            slot,
+            media_type="application/pdf",
+            headers={"Content-Disposition": 'attachment; filename="affidavits.pdf"'}
+        )
+
+    renders = [
+        render_stage.submit(
+            pdf_module.render_affidavit_bytes,
+            expense.vendor,
+            expense.price,
+            expense.date,
+            request.cardholder_name
+        )
+        for expense in request.expenses
+    ]
+
+    if request.format == "zip":
+        async def stream_zip():
+            sink = ChunkSink()
+            try:
+                with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+                    for n, (expense, render) in enumerate(zip(request.expenses, renders), start=1):
+                        archive.writestr(f"{n:03d}_{affidavit_filename(expense.vendor, expense.date)}", await render)
+                        yield sink.drain()
+            except BaseException:
+                abandon(renders)
+                raise
+            yield sink.drain()
+
+        return SlotStreamingResponse(
+            stream_zip(),
+            slot,
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="affidavits.zip"'}
+        )
+
+    async def stream_pdf():
+        try:
+            documents = [await render for render in renders]
+            merged = await render_stage.submit(pdf_module.merge_affidavits, documents)
+        except BaseException:
+            abandon(renders)
+            raise
+        finally:
+            slot.release()
+        while chunk := merged.read(64 * 1024):
+            yield chunk
+
+    return SlotStreamingResponse(
+        stream_pdf(),
+        slot,
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="affidavits.pdf"'}
+    )
@@ -1,12 +1,14 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Literal, Optional
 
 
 class ReconcileRequest(BaseModel):
     cardholder_name: str = Field(..., min_length=1, description="Name of cardholder to filter")
     start_date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="Start date in YYYY-MM-DD format")
     expected_expenses: str = Field(..., description="Expected expenses text block (paste from Kristen's email)")
-    sheet_link: str = Field(..., description="Link to the Google Sheets purchase form spreadsheet")
+    sheet_link: str = Field(..., description="Link to the Google Sheets purchase form spreadsheet, or a local .xlsx/.csv export")
+    strategy: Literal["greedy", "optimal"] = Field("greedy", description="Matching strategy: first-come greedy or globally optimal assignment")
+    stream: Optional[Literal["ndjson", "sse"]] = Field(None, description="Stream results as NDJSON lines or server-sent events as they are produced")
 
     class Config:
         json_schema_extra = {
@@ -18,6 +20,18 @@ class ReconcileRequest(BaseModel):
         }
 
 
+class CardholderExpenses(BaseModel):
+    cardholder_name: str = Field(..., min_length=1, description="Name of cardholder to filter")
+    expected_expenses: str = Field(..., description="Expected expenses text block for this cardholder")
+
+
+class BatchReconcileRequest(BaseModel):
+    start_date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="Start date in YYYY-MM-DD format")
+    sheet_link: str = Field(..., description="Link to the Google Sheets purchase form spreadsheet, or a local .xlsx/.csv export")
+    cardholders: List[CardholderExpenses] = Field(..., min_length=1, description="One entry per cardholder")
+    strategy: Literal["greedy", "optimal"] = Field("greedy", description="Matching strategy: first-come greedy or globally optimal assignment")
+
+
 class ExpectedExpenseSchema(BaseModel):
     date: str
     vendor: str
@@ -33,6 +47,27 @@ class ExpectedExpenseSchema(BaseModel):
         )
 
 
+def expected_expense_dict(exp) -> dict:
+    """ExpectedExpenseSchema's JSON fields, without building the model"""
+    return {"date": exp.date.isoformat(), "vendor": exp.vendor, "price": exp.price}
+
+
+class RejectedLineSchema(BaseModel):
+    line: int
+    text: str
+    reason: str
+
+    @classmethod
+    def from_dataclass(cls, rejected):
+        """Convert RejectedLine dataclass to Pydantic model"""
+        return cls(line=rejected.line, text=rejected.text, reason=rejected.reason)
+
+
+def rejected_line_dict(rejected) -> dict:
+    """RejectedLineSchema's JSON fields, without building the model"""
+    return {"line": rejected.line, "text": rejected.text, "reason": rejected.reason}
+
+
 class ReportItemSchema(BaseModel):
     description: str
     activity: str
@@ -58,15 +93,136 @@ class ReportItemSchema(BaseModel):
         )
 
 
+def report_item_dict(item) -> dict:
+    """ReportItemSchema's JSON fields, without building the model"""
+    return {
+        "description": item.description,
+        "activity": item.activity,
+        "date": item.date.isoformat(),
+        "price": item.price,
+        "vendor": item.vendor,
+        "receipts": item.receipts,
+        "flyer": item.flyer,
+        "needsAffidavit": item.needsAffidavit,
+    }
+
+
 class MatchedPair(BaseModel):
     expected: ExpectedExpenseSchema
     actual: ReportItemSchema
 
 
+class MatchCandidateSchema(BaseModel):
+    actual: ReportItemSchema
+    price_diff: float
+    days: int
+    similarity: float
+    distance: float
+    reason: str
+
+    @classmethod
+    def from_dataclass(cls, candidate):
+        """Convert MatchCandidate dataclass to Pydantic model"""
+        return cls(
+            actual=ReportItemSchema.from_dataclass(candidate.actual),
+            price_diff=candidate.price_diff_cents / 100,
+            days=candidate.days,
+            similarity=round(candidate.similarity, 4),
+            distance=round(candidate.distance, 4),
+            reason=candidate.reason
+        )
+
+
+def match_candidate_dict(candidate) -> dict:
+    """MatchCandidateSchema's JSON fields, without building the model"""
+    return {
+        "actual": report_item_dict(candidate.actual),
+        "price_diff": candidate.price_diff_cents / 100,
+        "days": candidate.days,
+        "similarity": round(candidate.similarity, 4),
+        "distance": round(candidate.distance, 4),
+        "reason": candidate.reason,
+    }
+
+
+class UnmatchedDiagnostic(BaseModel):
+    expected: ExpectedExpenseSchema
+    candidates: List[MatchCandidateSchema]
+
+
 class ReconcileResponse(BaseModel):
     matched: List[MatchedPair]
     unmatched_expected: List[ExpectedExpenseSchema]
     unmatched_actual: List[ReportItemSchema]
+    rejected_lines: List[RejectedLineSchema] = []
+    diagnostics: List[UnmatchedDiagnostic] = []
+    total_cost: float
+
+
+def reconcile_response_dict(results: dict) -> dict:
+    """ReconcileResponse's JSON fields for reconcile_expenses output, without building the models"""
+    return {
+        "matched": [
+            {"expected": expected_expense_dict(exp), "actual": report_item_dict(act)}
+            for exp, act in results["matched"]
+        ],
+        "unmatched_expected": [expected_expense_dict(exp) for exp in results["unmatched_expected"]],
+        "unmatched_actual": [report_item_dict(act) for act in results["unmatched_actual"]],
+        "rejected_lines": [rejected_line_dict(line) for line in results["rejected_lines"]],
+        "diagnostics": [
+            {"expected": expected_expense_dict(exp), "candidates": [match_candidate_dict(c) for c in candidates]}
+            for exp, candidates in results["diagnostics"]
+        ],
+        "total_cost": results["total_cost"],
+    }
+
+
+class SessionCreateRequest(BaseModel):
+    cardholder_name: str = Field(..., min_length=1, description="Name of cardholder to filter")
+    start_date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="Start date in YYYY-MM-DD format")
+    expected_expenses: str = Field("", description="Initial expected expenses text block")
+    sheet_link: str = Field(..., description="Link to the Google Sheets purchase form spreadsheet, or a local .xlsx/.csv export")
+
+
+class SessionExpectedRequest(BaseModel):
+    add: str = Field("", description="Expected expense lines to add (same format as /reconcile)")
+    remove: List[int] = Field(default_factory=list, description="Ids of expected lines to remove")
+
+
+class SessionExpectedSchema(ExpectedExpenseSchema):
+    id: int
+
+
+class SessionActualSchema(ReportItemSchema):
+    id: int
+
+
+class SessionPairSchema(BaseModel):
+    expected: SessionExpectedSchema
+    actual: SessionActualSchema
+
+    @classmethod
+    def from_pair(cls, pair):
+        """Convert SessionPair dataclass to Pydantic model"""
+        return cls(
+            expected=SessionExpectedSchema(
+                id=pair.expected_id,
+                **ExpectedExpenseSchema.from_dataclass(pair.expected).model_dump()
+            ),
+            actual=SessionActualSchema(
+                id=pair.actual_id,
+                **ReportItemSchema.from_dataclass(pair.actual).model_dump()
+            )
+        )
+
+
+class SessionDeltaResponse(BaseModel):
+    session_id: str
+    matched: List[SessionPairSchema]
+    unmatched: List[SessionPairSchema]
+    unmatched_expected: List[SessionExpectedSchema]
+    unmatched_actual: List[SessionActualSchema]
+    removed_expected: List[int]
 
 
 class AffidavitRequest(BaseModel):
@@ -74,3 +230,15 @@ class AffidavitRequest(BaseModel):
     price: float = Field(..., gt=0, description="Price from expected expense")
     date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="Date in YYYY-MM-DD format")
     cardholder_name: str = Field(..., min_length=1, description="Full cardholder name with role")
+
+
+class AffidavitExpense(BaseModel):
+    vendor: str = Field(..., min_length=1, description="Vendor name from expected expense")
+    price: float = Field(..., gt=0, description="Price from expected expense")
+    date: str = Field(..., pattern=r"^\d{4}-\d{2}-\d{2}$", description="Date in YYYY-MM-DD format")
+
+
+class BulkAffidavitRequest(BaseModel):
+    expenses: List[AffidavitExpense] = Field(..., min_length=1, description="Expenses needing affidavits")
+    cardholder_name: str = Field(..., min_length=1, description="Full cardholder name with role")
+    format: Literal["pdf", "zip"] = Field("pdf", description="One merged multi-page PDF, or a zip of one PDF per expense")
@@ -1,22 +1,97 @@
 from pypdf import PdfReader, PdfWriter
+from pypdf.generic import NameObject
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from io import BytesIO
 from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Sequence, Tuple
 import os
+import threading
 
-# Register cursive font
-FONT_PATH = os.path.join(os.path.dirname(__file__), "templates", "fonts", "AguafinaScript-Regular.ttf")
-if os.path.exists(FONT_PATH):
-    pdfmetrics.registerFont(TTFont('AguafinaScript', FONT_PATH))
-    SIGNATURE_FONT = 'AguafinaScript'
-else:
-    SIGNATURE_FONT = 'Helvetica-Oblique'  # Fallback
+from metrics import count, stage
+from backend.pdf_overlay import PreparedTemplate
 
+FONT_PATH = os.path.join(os.path.dirname(__file__), "templates", "fonts", "AguafinaScript-Regular.ttf")
 TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), "templates", "blank_affidavit.pdf")
 
+# Overlay text fields in drawing order: receipt details, signature, today's date
+OVERLAY_POSITIONS = [(40, 260), (40, 145), (320, 145)]
+
+# Affidavits whose text is all ASCII skip reportlab and merge_page: the
+# template is serialized once with the overlay fonts, and each document only
+# appends its text fields as an incremental update (backend/pdf_overlay.py).
+# Set EXPENSE_PDF_FAST_PATH=0 to render everything the original way.
+PDF_FAST_PATH = os.environ.get("EXPENSE_PDF_FAST_PATH", "1") != "0"
+
+_local = threading.local()
+
+
+@lru_cache(maxsize=1)
+def signature_font() -> str:
+    """Register the cursive signature font on first use; returns its name."""
+    if os.path.exists(FONT_PATH):
+        pdfmetrics.registerFont(TTFont('AguafinaScript', FONT_PATH))
+        return 'AguafinaScript'
+    return 'Helvetica-Oblique'  # Fallback
+
+
+@lru_cache(maxsize=1)
+def template_bytes() -> bytes:
+    """Raw template PDF, read from disk once per process."""
+    with open(TEMPLATE_PATH, "rb") as f:
+        return f.read()
+
+
+def template_page():
+    """
+    Parsed template page, parsed once per thread.
+
+    Never modified: PdfWriter.add_page clones it into each output document,
+    and the overlay is merged onto that clone.
+    """
+    page = getattr(_local, "template_page", None)
+    if page is None:
+        page = _local.template_page = PdfReader(BytesIO(template_bytes())).pages[0]
+    return page
+
+
+@lru_cache(maxsize=1)
+def prepared_template() -> PreparedTemplate:
+    """
+    The template with the overlay fonts, serialized once per process. The
+    fonts come from a sample overlay: reportlab's first subset of the
+    signature font holds all of ASCII whatever text is drawn.
+    """
+    sample = render_overlay("Sample Vendor", 0.0, "2000-01-01", "Sample Name")
+    return PreparedTemplate.build(template_page(), sample, OVERLAY_POSITIONS)
+
+
+def fast_path_text(texts: Sequence[str]) -> bool:
+    """Whether texts can be drawn with the prepared overlay fonts."""
+    return PDF_FAST_PATH and all(text.isascii() and text.isprintable() for text in texts)
+
+
+def fast_path_expenses(expenses: List[dict], cardholder_name: str) -> bool:
+    """Whether generate_affidavits takes the fast path for these expenses."""
+    return bool(expenses) and all(
+        fast_path_text(overlay_texts(e["vendor"], e["price"], e["date"], cardholder_name))
+        for e in expenses
+    )
+
+
+def warmup() -> None:
+    """
+    Register the signature font, load and parse the template and prepare the
+    fast path now, so the first affidavit request doesn't pay for them.
+    """
+    signature_font()
+    template_page()
+    if PDF_FAST_PATH:
+        prepared_template()
+
 def parse_cardholder_name(full_name: str) -> str:
     """Extract first two words from cardholder name.
     Example: 'Gavin Firestone (Treasurer)' -> 'Gavin Firestone'
@@ -24,6 +99,80 @@ def parse_cardholder_name(full_name: str) -> str:
     words = full_name.strip().split()
     return ' '.join(words[:2]) if len(words) >= 2 else full_name
 
+def overlay_texts(
+    vendor: str,
+    price: float,
+    date: str,
+    cardholder_name: str
+) -> Tuple[str, str, str]:
+    """
+    The overlay's receipt details, signature and date, in OVERLAY_POSITIONS order.
+    """
+    parsed_name = parse_cardholder_name(cardholder_name)
+    expense_date = datetime.fromisoformat(date).strftime("%m/%d/%Y")
+    receipt_details = f"{vendor}, ${price:.2f}, {expense_date}"
+    today_date = datetime.now().strftime("%m/%d/%Y")
+    return receipt_details, parsed_name, today_date
+
+def render_overlay(
+    vendor: str,
+    price: float,
+    date: str,
+    cardholder_name: str
+):
+    """
+    Render the filled-in text fields as a single overlay page.
+    """
+    overlay = BytesIO()
+    c = canvas.Canvas(overlay, pagesize=letter)
+
+    receipt_details, parsed_name, today_date = overlay_texts(vendor, price, date, cardholder_name)
+    receipt_at, signature_at, date_at = OVERLAY_POSITIONS
+
+    # Coordinate mapping (estimated, may need adjustment)
+    # "COPIES ARE NOT AVAILABLE" section (bottom half)
+
+    # Receipt details line (first blank line under "Print receipt detail(s)...")
+    c.setFont("Helvetica", 14)
+    c.drawString(*receipt_at, receipt_details)
+
+    # Signature line
+    c.setFont(signature_font(), 16)
+    c.drawString(*signature_at, parsed_name)
+
+    # Date field (to the right of signature)
+    c.setFont("Helvetica", 14)
+    c.drawString(*date_at, today_date)
+
+    c.save()
+
+    overlay.seek(0)
+    return PdfReader(overlay).pages[0]
+
+
+def add_affidavit_page(
+    output_pdf: PdfWriter,
+    vendor: str,
+    price: float,
+    date: str,
+    cardholder_name: str
+) -> None:
+    """
+    Append one filled affidavit page to output_pdf.
+    """
+    with stage("render_overlay"):
+        overlay_page = render_overlay(vendor, price, date, cardholder_name)
+    with stage("merge_template"):
+        page = output_pdf.add_page(template_page())
+        # add_page reuses the template content it already cloned for earlier
+        # pages, and merge_page rewrites content in place: give each page its own
+        content = page.get_contents()
+        del page[NameObject("/Contents")]
+        page.replace_contents(content)
+        page.merge_page(overlay_page)
+    count("affidavits_rendered")
+
+
 def generate_affidavit(
     vendor: str,
     price: float,
@@ -42,48 +191,90 @@ def generate_affidavit(
     Returns:
         BytesIO object containing the filled PDF
     """
-    # Read template PDF
-    template_pdf = PdfReader(TEMPLATE_PATH)
+    texts = overlay_texts(vendor, price, date, cardholder_name)
+    if fast_path_text(texts):
+        with stage("pdf_update"):
+            output = BytesIO(prepared_template().document([texts]))
+        count("affidavits_rendered")
+        return output
+
     output_pdf = PdfWriter()
+    add_affidavit_page(output_pdf, vendor, price, date, cardholder_name)
 
-    # Create overlay with text
-    overlay = BytesIO()
-    c = canvas.Canvas(overlay, pagesize=letter)
+    # Write to BytesIO
+    output = BytesIO()
+    with stage("pdf_write"):
+        output_pdf.write(output)
+    output.seek(0)
 
-    # Format data
-    parsed_name = parse_cardholder_name(cardholder_name)
-    expense_date = datetime.fromisoformat(date).strftime("%m/%d/%Y")
-    receipt_details = f"{vendor}, ${price:.2f}, {expense_date}"
-    today_date = datetime.now().strftime("%m/%d/%Y")
+    return output
 
-    # Coordinate mapping (estimated, may need adjustment)
-    # "COPIES ARE NOT AVAILABLE" section (bottom half)
 
-    # Receipt details line (first blank line under "Print receipt detail(s)...")
-    c.setFont("Helvetica", 14)
-    c.drawString(40, 260, receipt_details)
+def render_affidavit_bytes(
+    vendor: str,
+    price: float,
+    date: str,
+    cardholder_name: str
+) -> bytes:
+    """
+    generate_affidavit as plain bytes, for use from worker processes.
+    """
+    return generate_affidavit(vendor, price, date, cardholder_name).getvalue()
 
-    # Signature line
-    c.setFont(SIGNATURE_FONT, 16)
-    c.drawString(40, 145, parsed_name)
 
-    # Date field (to the right of signature)
-    c.setFont("Helvetica", 14)
-    c.drawString(320, 145, today_date)
+def merge_affidavits(documents: Iterable[bytes]) -> BytesIO:
+    """
+    Concatenate single-affidavit PDFs into one multi-page PDF, in order.
+    """
+    output_pdf = PdfWriter()
+    output = BytesIO()
+    with stage("merge_affidavits"):
+        for document in documents:
+            output_pdf.append(PdfReader(BytesIO(document)))
+        output_pdf.write(output)
+    output.seek(0)
 
-    c.save()
+    return output
 
-    # Merge overlay with template
-    overlay.seek(0)
-    overlay_pdf = PdfReader(overlay)
 
-    page = template_pdf.pages[0]
-    page.merge_page(overlay_pdf.pages[0])
-    output_pdf.add_page(page)
+def generate_affidavits(expenses: List[dict], cardholder_name: str) -> BytesIO:
+    """
+    Generate one multi-page PDF with an affidavit per expense.
+
+    Args:
+        expenses: Dicts with vendor, price and date (YYYY-MM-DD)
+        cardholder_name: Full cardholder name with role
+    """
+    pages = [
+        overlay_texts(expense["vendor"], expense["price"], expense["date"], cardholder_name)
+        for expense in expenses
+    ]
+    if pages and all(fast_path_text(texts) for texts in pages):
+        with stage("pdf_update"):
+            output = BytesIO(prepared_template().document(pages))
+        count("affidavits_rendered", len(pages))
+        return output
+
+    output_pdf = PdfWriter()
+    for expense in expenses:
+        add_affidavit_page(
+            output_pdf,
+            expense["vendor"],
+            expense["price"],
+            expense["date"],
+            cardholder_name
+        )
 
-    # Write to BytesIO
     output = BytesIO()
-    output_pdf.write(output)
+    with stage("pdf_write"):
+        output_pdf.write(output)
     output.seek(0)
 
     return output
+
+
+def render_affidavits_bytes(expenses: List[dict], cardholder_name: str) -> bytes:
+    """
+    generate_affidavits as plain bytes, for use from worker processes.
+    """
+    return generate_affidavits(expenses, cardholder_name).getvalue()
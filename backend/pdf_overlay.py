@@ -0,0 +1,208 @@
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence, Tuple
+import re
+
+from pypdf import PageObject, PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject
+from reportlab.lib.rl_accel import escapePDF, fp_str
+
+
+def pdf_bytes(obj) -> bytes:
+    """Serialized form of a pypdf object."""
+    buffer = BytesIO()
+    obj.write_to_stream(buffer)
+    return buffer.getvalue()
+
+
+def dict_entries(obj, skip: Sequence[str] = ()) -> bytes:
+    """A dictionary's serialized /Key value pairs, without the << >>."""
+    return b"".join(
+        pdf_bytes(key) + b" " + pdf_bytes(value) + b"\n"
+        for key, value in obj.items()
+        if key not in skip
+    )
+
+
+def overlay_fonts(overlay_page: PageObject) -> List[Tuple[str, float]]:
+    """(font resource name, size) of each text-showing operation, in order."""
+    fonts = []
+    current = None
+    for operands, operator in overlay_page.get_contents().operations:
+        if operator == b"Tf":
+            current = (str(operands[0]), float(operands[1]))
+        elif operator == b"Tj":
+            fonts.append(current)
+    return fonts
+
+
+@dataclass
+class PreparedTemplate:
+    """
+    The affidavit template serialized once, with the overlay fonts already in
+    its page resources. A document is those bytes plus one incremental
+    update holding only what changes: a content stream with the filled-in
+    text fields per page, the page objects pointing at it, and (for more
+    than one page) the page tree.
+
+    Build with PreparedTemplate.build from the template page and an overlay
+    page rendered by reportlab whose fonts cover every text that will be
+    passed to document() (see pdf_generator.fast_path_text).
+    """
+
+    base: bytes                                     # the template document
+    fields: List[Tuple[float, float, str, float]]   # x, y, font resource, size
+    clip: List[float]                               # overlay page box
+    size: int                                       # base trailer /Size
+    startxref: int                                  # base xref offset
+    trailer_entries: bytes
+    page_number: int
+    page_entries: bytes                             # page dict minus Contents/Parent/Annots
+    base_annots: Optional[bytes]
+    annot_entries: List[bytes]                      # each annotation minus /P
+    pages_number: int
+    pages_entries: bytes                            # page tree minus Kids/Count
+    content_refs: bytes                             # the template's content streams
+
+    @classmethod
+    def build(
+        cls,
+        template_page: PageObject,
+        overlay_page: PageObject,
+        positions: Sequence[Tuple[float, float]]
+    ) -> "PreparedTemplate":
+        """
+        positions are the (x, y) of the overlay's text fields in drawing
+        order; their fonts and sizes are read from overlay_page.
+        """
+        writer = PdfWriter()
+        page = writer.add_page(template_page)
+
+        resources = page["/Resources"].get_object()
+        if "/Font" not in resources:
+            resources[NameObject("/Font")] = DictionaryObject()
+        page_fonts = resources["/Font"].get_object()
+        for name, font in overlay_page["/Resources"]["/Font"].items():
+            page_fonts[NameObject(name)] = font.get_object().clone(writer).indirect_reference
+
+        # Object numbers, so look at the references rather than what they resolve to
+        contents = page.raw_get("/Contents")
+        if isinstance(contents.get_object(), ArrayObject):
+            content_refs = [ref.idnum for ref in contents.get_object()]
+        else:
+            content_refs = [contents.idnum]
+        annots = page.raw_get("/Annots") if "/Annots" in page else None
+        annot_dicts = [annot.get_object() for annot in annots.get_object()] if annots else []
+
+        base = BytesIO()
+        writer.write(base)
+        base = base.getvalue()
+        trailer = PdfReader(BytesIO(base)).trailer
+
+        fonts = overlay_fonts(overlay_page)
+        if len(fonts) != len(positions):
+            raise ValueError("Overlay page does not match the overlay field layout")
+
+        pages = writer.root_object.raw_get("/Pages")
+        return cls(
+            base=base,
+            fields=[(x, y, name, size) for (x, y), (name, size) in zip(positions, fonts)],
+            clip=[float(v) for v in overlay_page.mediabox],
+            size=int(trailer["/Size"]),
+            startxref=int(re.findall(rb"startxref\s+(\d+)", base)[-1]),
+            trailer_entries=dict_entries(trailer, skip=("/Size", "/Prev")),
+            page_number=page.indirect_reference.idnum,
+            page_entries=dict_entries(page, skip=("/Contents", "/Parent", "/Annots")),
+            base_annots=pdf_bytes(annots) if annots else None,
+            annot_entries=[dict_entries(annot, skip=("/P",)) for annot in annot_dicts],
+            pages_number=pages.idnum,
+            pages_entries=dict_entries(pages.get_object(), skip=("/Kids", "/Count")),
+            content_refs=b" ".join(b"%d 0 R" % number for number in content_refs),
+        )
+
+    def overlay(self, texts: Sequence[str]) -> bytes:
+        """
+        Content stream drawing texts into the fields. It closes the q opened
+        before the template content, so the overlay starts from the default
+        graphics state, clipped to the overlay page as merge_page would.
+        """
+        x0, y0, x1, y1 = self.clip
+        parts = [b"Q\nq\n%s %s %s %s re W n\n" % tuple(fp_str(v).encode() for v in (x0, y0, x1 - x0, y1 - y0))]
+        for (x, y, font, size), text in zip(self.fields, texts):
+            parts.append(b"BT\n%s %s Tf\n1 0 0 1 %s %s Tm\n(%s) Tj\nET\n" % (
+                font.encode(), fp_str(size).encode(), fp_str(x).encode(), fp_str(y).encode(),
+                escapePDF(text).encode("latin-1")
+            ))
+        parts.append(b"Q\n")
+        return b"".join(parts)
+
+    def document(self, pages: Sequence[Sequence[str]]) -> bytes:
+        """
+        A PDF with one filled affidavit page per entry of pages (the texts
+        of each overlay field). Every text must be ASCII.
+        """
+        chunks = [self.base]
+        offset = len(self.base)
+        xref: Dict[int, int] = {}
+        next_number = self.size
+
+        def add(number: int, body: bytes) -> None:
+            nonlocal offset
+            chunk = b"%d 0 obj\n%s\nendobj\n" % (number, body)
+            xref[number] = offset
+            chunks.append(chunk)
+            offset += len(chunk)
+
+        def stream(number: int, data: bytes) -> None:
+            add(number, b"<</Length %d>>\nstream\n%s\nendstream" % (len(data), data))
+
+        prefix, next_number = next_number, next_number + 1
+        stream(prefix, b"q\n")
+
+        kids = []
+        for i, texts in enumerate(pages):
+            overlay, next_number = next_number, next_number + 1
+            stream(overlay, self.overlay(texts))
+
+            if i == 0:
+                page, annots = self.page_number, self.base_annots
+            else:
+                page, next_number = next_number, next_number + 1
+                refs = []
+                for entries in self.annot_entries:
+                    add(next_number, b"<<%s/P %d 0 R>>" % (entries, page))
+                    refs.append(b"%d 0 R" % next_number)
+                    next_number += 1
+                annots = b"[" + b" ".join(refs) + b"]" if refs else None
+
+            add(page, b"<<%s/Parent %d 0 R\n/Contents [%d 0 R %s %d 0 R]%s>>" % (
+                self.page_entries, self.pages_number, prefix, self.content_refs, overlay,
+                b"\n/Annots " + annots if annots else b""
+            ))
+            kids.append(b"%d 0 R" % page)
+
+        if len(kids) != 1:
+            add(self.pages_number, b"<<%s/Kids [%s]\n/Count %d>>" % (
+                self.pages_entries, b" ".join(kids), len(kids)
+            ))
+
+        chunks.append(self.xref_section(xref, next_number, offset))
+        return b"".join(chunks)
+
+    def xref_section(self, xref: Dict[int, int], size: int, offset: int) -> bytes:
+        """Cross-reference table and trailer of the update, which starts at offset."""
+        # Restating the free-list head keeps the table zero-indexed, as readers expect
+        lines = [b"xref\n0 1\n0000000000 65535 f \n"]
+        numbers = sorted(xref)
+        start = 0
+        while start < len(numbers):
+            end = start
+            while end + 1 < len(numbers) and numbers[end + 1] == numbers[end] + 1:
+                end += 1
+            lines.append(b"%d %d\n" % (numbers[start], end - start + 1))
+            lines.extend(b"%010d 00000 n \n" % xref[n] for n in numbers[start:end + 1])
+            start = end + 1
+        lines.append(b"trailer\n<<%s/Size %d\n/Prev %d>>\nstartxref\n%d\n%%%%EOF\n" % (
+            self.trailer_entries, size, self.startxref, offset
+        ))
+        return b"".join(lines)
@@ -0,0 +1,380 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+import asyncio
+import concurrent.futures
+import contextvars
+import multiprocessing
+import os
+import threading
+import time
+
+from metrics import METRICS_ENABLED, absorb, run_collected
+
+
+# ----------------------------
+# Stage configuration
+# ----------------------------
+
+# Each stage of request handling gets its own executor and admission limit.
+#   kind:    "thread" or "process"
+#   workers: executor size
+#   limit:   max requests inside the stage (running + waiting) before new
+#            ones get 429
+#
+# fetch   - sheet download and xlsx parse (must stay in-process: owns SHEET_CACHE)
+# session - in-memory session updates (must stay in-process: owns SESSIONS)
+# match   - reconcile_expenses
+# render  - affidavit PDF rendering
+#
+# Override with STAGE_<NAME>_KIND / STAGE_<NAME>_WORKERS / STAGE_<NAME>_LIMIT.
+CPU_COUNT = os.cpu_count() or 1
+
+# Worker processes only pay for their pickling on a multi-core host
+CPU_KIND = "process" if CPU_COUNT > 1 else "thread"
+
+STAGE_DEFAULTS = {
+    "fetch": {"kind": "thread", "workers": 8, "limit": 32},
+    "session": {"kind": "thread", "workers": 4, "limit": 32},
+    "match": {"kind": CPU_KIND, "workers": CPU_COUNT, "limit": 4 * CPU_COUNT},
+    "render": {"kind": CPU_KIND, "workers": CPU_COUNT, "limit": 2 * CPU_COUNT},
+}
+
+
+class StageSaturated(Exception):
+    """Raised when a stage is at its admission limit."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Server busy: {stage} stage is at capacity, retry shortly")
+        self.stage = stage
+
+
+def batched(items: Iterable, batch_size: int, flush_seconds: float) -> Iterable[List]:
+    """
+    items in lists of batch_size, or fewer once flush_seconds have passed
+    since the last list.
+    """
+    batch = []
+    flushed = time.monotonic()
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size or time.monotonic() - flushed >= flush_seconds:
+            yield batch
+            batch = []
+            flushed = time.monotonic()
+    if batch:
+        yield batch
+
+
+# Batches an iterate() producer may have made that the consumer hasn't taken
+STREAM_WINDOW = 4
+
+
+def stream_to(conn, fn: Callable[..., Iterable], args, kwargs, batch_size: int, flush_seconds: float) -> None:
+    """
+    Run generator function fn in a worker process, sending its items down
+    conn in batches as ("batch", items), then ("end", None) or ("failed",
+    error). The reader acknowledges each batch it takes with True and asks
+    for a stop with None; at most STREAM_WINDOW batches go unacknowledged.
+
+    The reader can't stop the worker by closing its end: workers forked
+    while the pipe was open hold copies of it.
+    """
+    unacknowledged = 0
+    try:
+        for batch in batched(fn(*args, **kwargs), batch_size, flush_seconds):
+            while unacknowledged >= STREAM_WINDOW or conn.poll():
+                if conn.recv() is None:
+                    return
+                unacknowledged -= 1
+            conn.send(("batch", batch))
+            unacknowledged += 1
+    except Exception as e:
+        try:
+            conn.send(("failed", e))
+        except (TypeError, AttributeError, ValueError):
+            # Unpicklable exception
+            conn.send(("failed", RuntimeError(f"{type(e).__name__}: {e}")))
+        return
+    conn.send(("end", None))
+
+
+def receive(conn, job) -> Optional[tuple]:
+    """The next message from a stream_to job, or None if the job ended without sending one."""
+    while not conn.poll(0.05):
+        if job.done() and not conn.poll(0):
+            return None
+    return conn.recv()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_END = object()
+
+
+def retrieve(future) -> None:
+    """Done callback for an abandoned job: consume its outcome unlogged."""
+    if not future.cancelled():
+        future.exception()
+
+
+class Slot:
+    """
+    One request's hold on a stage, from Stage.admit(). release() may be
+    called from every path that can end the request; only the first counts.
+    """
+
+    def __init__(self, stage: "Stage"):
+        self.stage = stage
+        self.held = True
+
+    def release(self) -> None:
+        with self.stage._lock:
+            if not self.held:
+                return
+            self.held = False
+            self.stage.active -= 1
+
+
+class Stage:
+    """
+    An executor plus a cap on admitted requests, so overload turns into fast
+    429s instead of an ever-growing queue. The executor is created on first use.
+
+    A request holds one slot however many jobs it submits; batch endpoints
+    admit() once and submit() their jobs, single-job endpoints use run().
+    Streaming endpoints hand the Slot to the response, which releases it
+    however the response ends.
+    """
+
+    def __init__(self, name: str, kind: str, workers: int, limit: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind for stage {name}: {kind}")
+
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.limit = limit
+        self.active = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix=f"stage-{self.name}"
+                    )
+            return self._executor
+
+    def admit(self) -> Slot:
+        """
+        Reserve a slot for one request, or raise StageSaturated.
+        """
+        with self._lock:
+            if self.active >= self.limit:
+                self.rejected += 1
+                raise StageSaturated(self.name)
+            self.active += 1
+        return Slot(self)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Awaitable:
+        """
+        Schedule fn(*args, **kwargs) on the executor without admission; the
+        caller must already hold a slot.
+
+        Thread jobs run in a copy of the caller's context, so their stage
+        timings land on the current request. Process jobs collect their own
+        and send them back with the result.
+        """
+        loop = asyncio.get_running_loop()
+        job = partial(fn, *args, **kwargs)
+
+        if self.kind == "thread":
+            return loop.run_in_executor(self.executor, contextvars.copy_context().run, job)
+        if not METRICS_ENABLED:
+            return loop.run_in_executor(self.executor, job)
+        return asyncio.ensure_future(self._collected(loop, job))
+
+    async def _collected(self, loop, job: Callable):
+        result, collector = await loop.run_in_executor(self.executor, partial(run_collected, job))
+        absorb(collector)
+        return result
+
+    async def iterate(
+        self,
+        fn: Callable[..., Iterable],
+        *args,
+        batch_size: int = 256,
+        flush_seconds: float = 0.05,
+        **kwargs
+    ) -> AsyncIterator[List]:
+        """
+        Run generator function fn(*args, **kwargs) on the executor and yield
+        its items in lists as they are produced, without admission; the caller
+        must already hold a slot.
+
+        A batch is handed over once it holds batch_size items or flush_seconds
+        have passed since the last one. At most a few batches wait in between,
+        so a slow consumer pauses the generator instead of buffering its
+        output, and abandoning the iteration stops it at the next batch.
+        Process stages send batches back over a pipe as they are made, under
+        the same limit (see stream_to). Close the iterator when done with it
+        early (contextlib.aclosing).
+        """
+        if self.kind == "process":
+            async for batch in self._iterate_process(fn, args, kwargs, batch_size, flush_seconds):
+                yield batch
+            return
+
+        loop = asyncio.get_running_loop()
+        batches: asyncio.Queue = asyncio.Queue(maxsize=STREAM_WINDOW)
+        stopped = threading.Event()
+
+        def put(item) -> None:
+            if stopped.is_set():
+                return
+            future = asyncio.run_coroutine_threadsafe(batches.put(item), loop)
+            while True:
+                try:
+                    future.result(timeout=0.5)
+                    return
+                except concurrent.futures.TimeoutError:
+                    if stopped.is_set() or loop.is_closed():
+                        future.cancel()
+                        return
+
+        def produce() -> None:
+            try:
+                for batch in batched(fn(*args, **kwargs), batch_size, flush_seconds):
+                    if stopped.is_set():
+                        return
+                    put(batch)
+                put(_END)
+            except BaseException as e:
+                put(_Failed(e))
+
+        producer = loop.run_in_executor(self.executor, contextvars.copy_context().run, produce)
+        try:
+            while True:
+                item = await batches.get()
+                if item is _END:
+                    break
+                if isinstance(item, _Failed):
+                    raise item.error
+                yield item
+            await producer
+        finally:
+            # Unblock a producer waiting on a full queue; it stops at its next put
+            stopped.set()
+            while not batches.empty():
+                batches.get_nowait()
+
+    async def _iterate_process(self, fn, args, kwargs, batch_size: int, flush_seconds: float) -> AsyncIterator[List]:
+        loop = asyncio.get_running_loop()
+        conn, worker_conn = multiprocessing.Pipe()
+        job = self.submit(stream_to, worker_conn, fn, args, kwargs, batch_size, flush_seconds)
+        pending = None
+        finished = False
+        try:
+            while True:
+                pending = STREAM_READERS.submit(receive, conn, job)
+                message = await asyncio.wrap_future(pending, loop=loop)
+                pending = None
+                if message is None:
+                    finished = True
+                    await job
+                    raise RuntimeError(f"{self.name} stage worker stopped before finishing")
+                kind, payload = message
+                if kind != "batch":
+                    finished = True
+                    if kind == "failed":
+                        raise payload
+                    break
+                yield payload
+                conn.send(True)
+            await job
+        finally:
+            def close() -> None:
+                if not finished:
+                    # Stop the worker, reading whatever it sends until it does
+                    try:
+                        conn.send(None)
+                        while receive(conn, job) is not None:
+                            pass
+                    except (OSError, EOFError):
+                        pass
+                conn.close()
+                worker_conn.close()
+
+            # A read in progress (the consumer was cancelled) finishes first
+            if pending is not None:
+                pending.add_done_callback(lambda _: STREAM_READERS.submit(close))
+            else:
+                STREAM_READERS.submit(close)
+            if not job.done():
+                job.add_done_callback(retrieve)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Admit, run fn(*args, **kwargs) on the executor and release.
+        """
+        slot = self.admit()
+        try:
+            return await self.submit(fn, *args, **kwargs)
+        finally:
+            slot.release()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "limit": self.limit,
+            "active": self.active,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+def _stage_from_env(name: str, defaults: dict) -> Stage:
+    prefix = f"STAGE_{name.upper()}_"
+    return Stage(
+        name,
+        kind=os.environ.get(prefix + "KIND", defaults["kind"]),
+        workers=int(os.environ.get(prefix + "WORKERS", defaults["workers"])),
+        limit=int(os.environ.get(prefix + "LIMIT", defaults["limit"]))
+    )
+
+
+STAGES: Dict[str, Stage] = {
+    name: _stage_from_env(name, defaults)
+    for name, defaults in STAGE_DEFAULTS.items()
+}
+
+
+# Threads that wait on process stage streams (see Stage.iterate): one per
+# request a process stage can admit, plus room for abandoned streams that
+# are still being stopped
+STREAM_READERS = ThreadPoolExecutor(
+    max_workers=max(4, 2 * sum(stage.limit for stage in STAGES.values() if stage.kind == "process")),
+    thread_name_prefix="stage-stream"
+)
+
+
+def shutdown_pools() -> None:
+    for stage in STAGES.values():
+        stage.shutdown()
@@ -0,0 +1,180 @@
+"""
+Compare the original per-row cell helpers (extract_date, parse_price) against
+parser's memoized, type-dispatched versions and batch column conversion:
+an equivalence check over synthetic and edge-case cells, then ns per row for
+single cells, whole columns and full report_item_fields rows.
+
+Usage: python benchmarks/bench_convert.py [--rows 100000]
+"""
+import argparse
+import gc
+import time
+from datetime import date, datetime
+from sys import intern
+
+from synthetic import synthetic_rows
+
+from models import price_cents
+from parser import (
+    COL_BUDGET,
+    COL_ENDOWMENT,
+    COL_EVENT,
+    COL_FLYER,
+    COL_ITEMS,
+    COL_NAME,
+    COL_NEEDS_AFFIDAVIT,
+    COL_PRICE,
+    COL_RECEIPTS,
+    COL_TIMESTAMP,
+    COL_VENDOR,
+    PROGRAM_MAP,
+    convert_column,
+    extract_date,
+    parse_price,
+    parse_price_cents,
+    price_cents_column,
+    report_item_field_rows,
+    report_item_fields,
+)
+
+
+def legacy_extract_date(cell_value) -> date:
+    if isinstance(cell_value, datetime):
+        return cell_value.date()
+    if isinstance(cell_value, date):
+        return cell_value
+    return datetime.fromisoformat(str(cell_value).split(" ")[0]).date()
+
+
+def legacy_parse_price(cell_value) -> float:
+    if not cell_value:
+        return 0.0
+    if isinstance(cell_value, (int, float)):
+        return float(cell_value)
+    price_str = str(cell_value).strip().replace("$", "").replace(",", "")
+    try:
+        return float(price_str)
+    except ValueError:
+        return 0.0
+
+
+def legacy_cents(cell_value) -> int:
+    return price_cents(legacy_parse_price(cell_value))
+
+
+def legacy_parse_receipts(cell_value):
+    if not cell_value:
+        return ()
+    return tuple(part.strip() for part in str(cell_value).split(",") if part.strip())
+
+
+def legacy_row_fields(row, row_date) -> tuple:
+    """report_item_fields as it was, one row at a time with the old helpers."""
+    F_budget = row[COL_BUDGET]
+    G_endowment = row[COL_ENDOWMENT]
+    O_vendor = row[COL_VENDOR]
+    L_flyer = row[COL_FLYER]
+    return (
+        str(row[COL_NAME]),
+        str(row[COL_EVENT]),
+        str(row[COL_ITEMS]),
+        str(F_budget),
+        str(G_endowment) if F_budget == "Other" and G_endowment else "",
+        intern(PROGRAM_MAP.get(F_budget, "")),
+        row_date,
+        legacy_cents(row[COL_PRICE]),
+        intern(str(O_vendor)) if O_vendor else "",
+        legacy_parse_receipts(row[COL_RECEIPTS]),
+        str(L_flyer) if L_flyer else "",
+        row[COL_NEEDS_AFFIDAVIT] == "No",
+    )
+
+
+EDGE_DATES = [
+    datetime(2024, 2, 29, 23, 59), date(2024, 3, 1), "2024-03-01", "2024-03-01 08:15:00",
+    "2024-03-01T08:15:00", "2024-13-01", "", "garbage", None, 20240301,
+]
+EDGE_PRICES = [
+    0, 0.0, -0.0, 12, 12.5, True, False, None, "", "  ", "$1,234.56", " $ 7 ", "abc",
+    "12.345", "-4.20", 19.999, 1e-9,
+]
+
+
+def outcome(fn, cell):
+    try:
+        return fn(cell)
+    except ValueError as e:
+        return ("ValueError", type(e))
+
+
+def check_equivalence(rows) -> None:
+    stamps = [row[COL_TIMESTAMP] for row in rows]
+    text_stamps = [str(stamp) for stamp in stamps]
+    prices = [row[COL_PRICE] for row in rows]
+
+    for cells in (stamps, text_stamps, EDGE_DATES):
+        assert [outcome(legacy_extract_date, c) for c in cells] == [outcome(extract_date, c) for c in cells]
+    for cells in (prices, EDGE_PRICES):
+        assert [legacy_parse_price(c) for c in cells] == [parse_price(c) for c in cells]
+        assert [legacy_cents(c) for c in cells] == [parse_price_cents(c) for c in cells]
+        assert [legacy_cents(c) for c in cells] == price_cents_column(cells)
+        assert [legacy_cents(c) for c in cells] == convert_column(cells, parse_price_cents)
+
+    dates = [extract_date(stamp) for stamp in stamps]
+    legacy = [legacy_row_fields(row, d) for row, d in zip(rows, dates)]
+    assert legacy == [report_item_fields(row, d) for row, d in zip(rows, dates)]
+    assert legacy == report_item_field_rows(rows, dates)
+    print(f"equivalence: {len(rows)} synthetic rows plus edge cases identical")
+
+
+def per_row(fn, n: int) -> float:
+    """Best of seven runs of fn(), in ns per row, with GC paused as timeit does."""
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(7):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+    finally:
+        gc.enable()
+    return best * 1e9 / n
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=100_000)
+    args = ap.parse_args()
+
+    rows = [tuple(row) for row in synthetic_rows(args.rows)]
+    check_equivalence(rows)
+
+    stamps = [row[COL_TIMESTAMP] for row in rows]
+    text_stamps = [str(stamp) for stamp in stamps]
+    prices = [row[COL_PRICE] for row in rows]
+    dates = [extract_date(stamp) for stamp in stamps]
+    days = [d.toordinal() for d in dates]
+    n = len(rows)
+
+    cases = [
+        ("date, datetime cells", lambda: [legacy_extract_date(c) for c in stamps],
+         lambda: [extract_date(c) for c in stamps]),
+        ("date, ISO text cells", lambda: [legacy_extract_date(c) for c in text_stamps],
+         lambda: [extract_date(c) for c in text_stamps]),
+        ("price cents, per cell", lambda: [legacy_cents(c) for c in prices],
+         lambda: [parse_price_cents(c) for c in prices]),
+        ("price cents, column", lambda: [legacy_cents(c) for c in prices],
+         lambda: price_cents_column(prices)),
+        ("date from ordinal, column", lambda: [date.fromordinal(day) for day in days],
+         lambda: convert_column(days, date.fromordinal)),
+        ("report item fields", lambda: [legacy_row_fields(row, d) for row, d in zip(rows, dates)],
+         lambda: report_item_field_rows(rows, dates)),
+    ]
+    print(f"rows={n}  (ns per row: legacy / new)")
+    for name, legacy, new in cases:
+        old_ns, new_ns = per_row(legacy, n), per_row(new, n)
+        print(f"  {name:<24} {old_ns:7.0f} / {new_ns:7.0f}   {old_ns / new_ns:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
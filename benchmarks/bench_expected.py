@@ -0,0 +1,136 @@
+"""
+Compare the original split/strptime expected-expense parser against
+reconcile.parse_expected_lines: a randomized equivalence check on lines both
+should accept, the lines only the new parser gets right, and throughput.
+
+Usage: python benchmarks/bench_expected.py [--lines 100000]
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from synthetic import VENDORS
+
+from models import ExpectedExpense, price_cents
+from reconcile import parse_expected_expenses, parse_expected_lines
+
+
+def legacy_parse_expected(text):
+    """The original parser: split on "-", strptime per line, skip failures."""
+    expenses = []
+    for line in text.strip().split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        parts = [p.strip() for p in line.split("-")]
+        if len(parts) != 3:
+            continue
+        date_str, part1, part2 = parts
+        try:
+            expense_date = datetime.strptime(date_str.strip(), "%m/%d/%y").date()
+        except ValueError:
+            continue
+        if part1.startswith("$"):
+            price_str, vendor = part1, part2
+        else:
+            vendor, price_str = part1, part2
+        try:
+            price = float(price_str.replace("$", "").replace(",", "").strip())
+        except ValueError:
+            continue
+        expenses.append(ExpectedExpense(date=expense_date, vendor=vendor, cents=price_cents(price)))
+    return expenses
+
+
+# The legacy parser cannot read hyphenated vendors; those are shown separately
+PLAIN_VENDORS = [vendor for vendor in VENDORS if "-" not in vendor]
+
+
+def random_line(rng: random.Random) -> str:
+    when = date(1990, 1, 1) + timedelta(days=rng.randint(0, 20000))
+    month = f"{when.month:02d}" if rng.random() < 0.5 else str(when.month)
+    day = f"{when.day:02d}" if rng.random() < 0.5 else str(when.day)
+    price = rng.choice([
+        f"${rng.uniform(0, 5000):,.2f}",
+        f"${rng.randint(0, 300)}",
+        f"{rng.uniform(0, 300):.2f}",
+        f"$ {rng.uniform(0, 300):.1f}",
+    ])
+    vendor = rng.choice(PLAIN_VENDORS)
+    sep = rng.choice([" - ", "-", " -", "  -  "])
+    if price.startswith("$") and rng.random() < 0.5:
+        return f"{month}/{day}/{when:%y}{sep}{price}{sep}{vendor}"
+    return f"{month}/{day}/{when:%y}{sep}{vendor}{sep}{price}"
+
+
+def noise_line(rng: random.Random) -> str:
+    return rng.choice([
+        "",
+        "   ",
+        "Thanks!",
+        "13/45/25 - Target - $5.00",
+        "2/30/24 - HEB - $3.10",
+        "11/16/2025 - Target - $9.99",
+        "11/16/25 - Target",
+        "11/16/25 - Target - five dollars",
+    ])
+
+
+def check_equivalence(trials: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for trial in range(trials):
+        lines = [random_line(rng) if rng.random() < 0.8 else noise_line(rng) for _ in range(rng.randint(0, 30))]
+        text = "\n".join(lines)
+        old, new = legacy_parse_expected(text), parse_expected_expenses(text)
+        assert old == new, f"trial {trial}: results differ\n{text}"
+        assert parse_expected_expenses(iter(text.splitlines(True))) == new, f"trial {trial}: iterator input differs"
+    print(f"equivalence: {trials} randomized blocks identical (text and iterator input)")
+
+
+HYPHENATED = """\
+11/16/25 - Chick-fil-A - $12.45
+11/17/25 - $8.10 - 7-Eleven
+11/18/25 – Trader Joe's – $25.25
+11/19/25 - Coca-Cola Bottling - 1,204.00"""
+
+
+def show_hyphenated() -> None:
+    old = legacy_parse_expected(HYPHENATED)
+    new, rejected = parse_expected_lines(HYPHENATED)
+    print(f"hyphenated/dash vendors: legacy parsed {len(old)}/4, new parsed {len(new)}/4")
+    for expense in new:
+        print(f"  {expense.date}  {expense.vendor:<20} ${expense.price:,.2f}")
+    assert not rejected
+
+
+def time_it(fn, *args) -> float:
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--lines", type=int, default=100_000)
+    ap.add_argument("--trials", type=int, default=2000)
+    args = ap.parse_args()
+
+    check_equivalence(args.trials)
+    show_hyphenated()
+
+    rng = random.Random(1)
+    text = "\n".join(random_line(rng) for _ in range(args.lines))
+    old = time_it(legacy_parse_expected, text)
+    new = time_it(parse_expected_expenses, text)
+    print(f"lines={args.lines}")
+    print(f"legacy:  {old:8.3f}s  {args.lines / old:12,.0f} lines/s")
+    print(f"new:     {new:8.3f}s  {args.lines / new:12,.0f} lines/s")
+    print(f"speedup {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
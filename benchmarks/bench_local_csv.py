@@ -0,0 +1,85 @@
+"""
+Local export ingestion: a --rows synthetic CSV read through the memory-mapped
+reader, indexed and reconciled for one cardholder, then --append more rows
+written to it and picked up incrementally. The same first --xlsx-rows rows
+as a local .xlsx check that both kinds give the same report items, and time
+the xlsx read for comparison.
+
+Usage: python benchmarks/bench_local_csv.py [--rows 500000] [--append 1000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+from synthetic import CARDHOLDERS, synthetic_expected_text, write_csv, write_workbook
+
+import parser
+import sources
+from parser import LocalRows, fetch_local_rows, parse_purchase_rows
+from reconcile import reconcile_expenses
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=500_000)
+    ap.add_argument("--append", type=int, default=1_000)
+    ap.add_argument("--xlsx-rows", type=int, default=20_000)
+    ap.add_argument("--start", default="2025-08-01", help="reconcile window start, YYYY-MM-DD")
+    ap.add_argument("--expected", type=int, default=200, help="expected-expense lines to reconcile")
+    args = ap.parse_args()
+
+    cardholder = CARDHOLDERS[0]
+    start_dt = date.fromisoformat(args.start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "purchases.csv")
+        last_ts = write_csv(csv_path, args.rows)
+        print(f"rows={args.rows}  csv {os.path.getsize(csv_path) / 1e6:.0f} MB")
+
+        source = sources.local_source("purchases.csv", root=tmp)
+        rows, read_s = timed(fetch_local_rows, source)
+        _, index_s = timed(lambda: rows.sheet_index)
+        items, select_s = timed(parse_purchase_rows, rows, cardholder, start_dt)
+        expected = synthetic_expected_text(items, args.expected) if items else ""
+        _, match_s = timed(reconcile_expenses, expected, items)
+        print(f"  csv read {read_s:.2f}s, index {index_s:.2f}s, {len(items)} items selected {select_s:.3f}s, "
+              f"reconcile {match_s:.3f}s: {read_s + index_s + select_s + match_s:.2f}s total")
+
+        _, unchanged_s = timed(fetch_local_rows, source)
+        print(f"  unchanged file: {unchanged_s * 1000:.2f} ms")
+
+        write_csv(csv_path, args.append, seed=1, start=last_ts, header=False)
+        grown, append_s = timed(fetch_local_rows, source)
+        assert len(grown) == args.rows + args.append, len(grown)
+        assert grown.version != rows.version
+        print(f"  +{args.append} appended rows: {append_s * 1000:.1f} ms")
+
+        full = LocalRows(source).sync()
+        assert list(grown) == list(full), "incremental read differs from a full read"
+
+        n = min(args.xlsx_rows, args.rows)
+        small_csv = os.path.join(tmp, "small.csv")
+        small_xlsx = os.path.join(tmp, "small.xlsx")
+        write_csv(small_csv, n)
+        write_workbook(small_xlsx, n)
+        csv_rows, small_csv_s = timed(fetch_local_rows, sources.local_source("small.csv", root=tmp))
+        xlsx_rows, small_xlsx_s = timed(fetch_local_rows, sources.local_source("small.xlsx", root=tmp))
+        for name in CARDHOLDERS:
+            assert (parse_purchase_rows(csv_rows, name, date.min)
+                    == parse_purchase_rows(xlsx_rows, name, date.min)), name
+        print(f"  {n} rows: csv {small_csv_s:.2f}s, xlsx {small_xlsx_s:.2f}s "
+              f"({small_xlsx_s / small_csv_s:.0f}x), same report items")
+
+    parser.LOCAL_ROWS.clear()
+
+
+if __name__ == "__main__":
+    main()
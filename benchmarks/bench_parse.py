@@ -0,0 +1,154 @@
+"""
+Compare the legacy full-mode, cell-lookup sheet parse against the streaming
+read-only parse the app uses (read_purchase_rows, then parse_purchase_rows).
+
+Each variant runs once in a fresh interpreter, which reports its wall time
+and peak RSS (see peak_rss), so the XML parser's C allocations count too. An interpreter that only imports the same modules gives the baseline
+RSS that both include.
+
+Usage: python benchmarks/bench_parse.py [--rows 10000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+from openpyxl import load_workbook
+
+from synthetic import CARDHOLDERS, write_workbook
+
+from parser import (
+    PROGRAM_MAP,
+    PURCHASES_SHEET,
+    extract_date,
+    parse_price,
+    parse_purchase_rows,
+    parse_receipts,
+    read_purchase_rows,
+)
+from models import ReportItem, price_cents
+
+
+def legacy_parse(path, cardholder_name, start_dt):
+    """The pre-streaming parse loop: full workbook, one cell lookup per field."""
+    wb = load_workbook(path)
+    ws = wb[PURCHASES_SHEET]
+    report_items = []
+
+    for row in range(ws.max_row, 1, -1):
+        A_timestamp = ws[f"A{row}"].value
+        J_pcard = ws[f"J{row}"].value
+        if not A_timestamp:
+            continue
+        row_date = extract_date(A_timestamp)
+        if row_date < start_dt:
+            break
+        if J_pcard != cardholder_name:
+            continue
+
+        F_budget = ws[f"F{row}"].value
+        G_endowment = ws[f"G{row}"].value
+        O_vendor = ws[f"O{row}"].value
+        L_flyer = ws[f"L{row}"].value
+        report_items.append(ReportItem(
+            name=str(ws[f"E{row}"].value),
+            event=str(ws[f"N{row}"].value),
+            items=str(ws[f"M{row}"].value),
+            budget=str(F_budget),
+            endowment=str(G_endowment) if F_budget == "Other" and G_endowment else "",
+            activity=PROGRAM_MAP.get(F_budget, ""),
+            date=row_date,
+            cents=price_cents(parse_price(ws[f"I{row}"].value)),
+            vendor=str(O_vendor) if O_vendor else "",
+            receipts=parse_receipts(ws[f"D{row}"].value),
+            flyer=str(L_flyer) if L_flyer else "",
+            needsAffidavit=(ws[f"P{row}"].value == "No"),
+        ))
+
+    return report_items
+
+
+def streaming_parse(path, cardholder_name, start_dt):
+    """The app's path: read_purchase_rows on the export, then select and convert."""
+    rows = read_purchase_rows(open(path, "rb"), start_dt)
+    return parse_purchase_rows(rows, cardholder_name, start_dt)
+
+
+VARIANTS = {"baseline": None, "legacy": legacy_parse, "streaming": streaming_parse}
+
+
+def peak_rss() -> int:
+    """
+    This process's peak resident set size, in bytes. On Linux ru_maxrss
+    carries the parent's peak across exec, so VmHWM (reset by exec) is read
+    instead where there is one.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_variant(name: str, path: str, cardholder_name: str, start: str) -> None:
+    """Child side: run one variant and print its time and peak RSS as JSON."""
+    fn = VARIANTS[name]
+    t0 = time.perf_counter()
+    items = fn(path, cardholder_name, date.fromisoformat(start)) if fn else []
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({"seconds": elapsed, "peak_rss": peak_rss(), "items": len(items)}))
+
+
+def measure(name: str, path: str, cardholder_name: str, start: str) -> dict:
+    """Run one variant in a fresh interpreter."""
+    out = subprocess.run(
+        [sys.executable, __file__, "--variant", name, path, cardholder_name, start],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--start", default="2023-08-01", help="start date, YYYY-MM-DD")
+    ap.add_argument("--variant", nargs=4, metavar=("NAME", "PATH", "CARDHOLDER", "START"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.variant:
+        run_variant(*args.variant)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "purchases.xlsx")
+        write_workbook(path, args.rows)
+        start_dt = date.fromisoformat(args.start)
+        cardholder = CARDHOLDERS[0]
+
+        streamed = streaming_parse(path, cardholder, start_dt)
+        assert legacy_parse(path, cardholder, start_dt) == streamed, \
+            "streaming parse output differs from legacy parse"
+
+        results = {name: measure(name, path, cardholder, args.start) for name in VARIANTS}
+
+    base = results["baseline"]["peak_rss"]
+    legacy, stream = results["legacy"], results["streaming"]
+    print(f"rows={args.rows} items={len(streamed)}  baseline RSS {base / 2**20:.1f} MiB")
+    for name in ("legacy", "streaming"):
+        r = results[name]
+        print(f"{name + ':':11}{r['seconds']:8.3f}s  peak RSS {r['peak_rss'] / 2**20:8.1f} MiB "
+              f"(+{(r['peak_rss'] - base) / 2**20:.1f} over baseline)")
+    print(f"speedup {legacy['seconds'] / stream['seconds']:.2f}x, peak RSS over baseline "
+          f"{(legacy['peak_rss'] - base) / max(stream['peak_rss'] - base, 1):.1f}x lower")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Time the indexed reconcile_expenses against the original nested-scan
+matcher. tests/test_reconcile.py checks that the two agree.
+
+Usage: python benchmarks/bench_reconcile.py [--expected 2000] [--actual 5000]
+"""
+import argparse
+import time
+
+from synthetic import synthetic_expected_text, synthetic_report_items
+
+from reconcile import parse_expected_expenses, reconcile_expenses, vendor_similarity
+
+
+def legacy_reconcile(expected_text, actual_items, price_tolerance=1.00, similarity_threshold=0.75):
+    """The original O(E x A) greedy matcher, kept as the reference semantics."""
+    expected_expenses = parse_expected_expenses(expected_text)
+    matched_pairs = []
+    matched_expected = set()
+    matched_actual = set()
+
+    for exp_idx, expected in enumerate(expected_expenses):
+        for act_idx, actual in enumerate(actual_items):
+            if act_idx in matched_actual:
+                continue
+            if expected.price == actual.price and actual.date >= expected.date:
+                matched_pairs.append((expected, actual))
+                matched_expected.add(exp_idx)
+                matched_actual.add(act_idx)
+                break
+
+    for exp_idx, expected in enumerate(expected_expenses):
+        if exp_idx in matched_expected:
+            continue
+        for act_idx, actual in enumerate(actual_items):
+            if act_idx in matched_actual:
+                continue
+            if abs(expected.price - actual.price) > price_tolerance:
+                continue
+            if actual.date < expected.date:
+                continue
+            if vendor_similarity(expected.vendor, actual.vendor) < similarity_threshold:
+                continue
+            matched_pairs.append((expected, actual))
+            matched_expected.add(exp_idx)
+            matched_actual.add(act_idx)
+            break
+
+    return {
+        "matched": matched_pairs,
+        "unmatched_expected": [e for i, e in enumerate(expected_expenses) if i not in matched_expected],
+        "unmatched_actual": [a for i, a in enumerate(actual_items) if i not in matched_actual],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--expected", type=int, default=2000)
+    ap.add_argument("--actual", type=int, default=5000)
+    args = ap.parse_args()
+
+    items = synthetic_report_items(args.actual)
+    text = synthetic_expected_text(items, args.expected)
+
+    t0 = time.perf_counter()
+    old = legacy_reconcile(text, items)
+    legacy_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = reconcile_expenses(text, items)
+    indexed_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    optimal = reconcile_expenses(text, items, strategy="optimal")
+    optimal_s = time.perf_counter() - t0
+
+    print(f"expected={args.expected} actual={args.actual}")
+    print(f"legacy:  {legacy_s:8.3f}s  matched {len(old['matched'])}")
+    print(f"indexed: {indexed_s:8.3f}s  matched {len(new['matched'])}  cost {new['total_cost']:.2f}  ({legacy_s / indexed_s:.1f}x)")
+    print(f"optimal: {optimal_s:8.3f}s  matched {len(optimal['matched'])}  cost {optimal['total_cost']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
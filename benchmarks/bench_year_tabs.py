@@ -0,0 +1,63 @@
+"""
+Multi-year ingestion: the same synthetic rows written to one tab and split
+into fiscal-year tabs. For each start date, checks that reading the year tabs
+gives the same report items as the single tab, and times
+parser.read_purchase_rows on both (best of --runs), serially and, on a
+multi-core host, with tabs scanned in parallel.
+
+Usage: python benchmarks/bench_year_tabs.py [--rows 20000] [--runs 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+from synthetic import CARDHOLDERS, write_workbook
+
+import parser
+from parser import parse_purchase_rows, read_purchase_rows
+
+
+def best_read(path: str, start_dt, runs: int):
+    best, rows = float("inf"), None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        rows = read_purchase_rows(open(path, "rb"), start_dt)
+        best = min(best, time.perf_counter() - t0)
+    return rows, best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rows", type=int, default=20_000)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--starts", default="2023-08-01,2024-10-01,2025-10-01",
+                    help="comma-separated start dates, YYYY-MM-DD")
+    args = ap.parse_args()
+
+    modes = ["serial"] + (["parallel"] if parser.PARALLEL_WORKERS > 1 else [])
+    cardholder = CARDHOLDERS[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        one_tab = os.path.join(tmp, "one_tab.xlsx")
+        year_tabs = os.path.join(tmp, "year_tabs.xlsx")
+        write_workbook(one_tab, args.rows)
+        write_workbook(year_tabs, args.rows, year_tabs=True)
+
+        whole, one_s = best_read(one_tab, None, args.runs)
+        print(f"rows={args.rows}  one tab, everything: {one_s:.3f}s")
+
+        for start in args.starts.split(","):
+            start_dt = date.fromisoformat(start)
+            expected = parse_purchase_rows(whole, cardholder, start_dt)
+            for mode in modes:
+                parser.ROW_CONVERSION = mode
+                rows, year_s = best_read(year_tabs, start_dt, args.runs)
+                assert parse_purchase_rows(rows, cardholder, start_dt) == expected, (start, mode)
+                print(f"  start {start}  year tabs ({mode}): {year_s:.3f}s, {len(rows)} rows read, "
+                      f"{year_s / one_s:.2f}x one tab")
+
+
+if __name__ == "__main__":
+    main()
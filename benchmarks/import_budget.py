@@ -0,0 +1,89 @@
+"""
+Import-time budget for the API process: imports backend.api in a fresh
+interpreter under -X importtime and fails (exit 1) if the best of --runs
+cumulative times exceeds --budget-ms, or if any module that should load
+lazily on first use was imported at startup.
+
+Usage: python benchmarks/import_budget.py [--budget-ms 800] [--runs 5]
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TARGET = "backend.api"
+
+# Loaded on first use by backend.api (see its lazy imports section)
+LAZY = [
+    "openpyxl",
+    "numpy",
+    "requests",
+    "pypdf",
+    "reportlab",
+    "parser",
+    "sources",
+    "reconcile",
+    "session",
+    "snapshot",
+    "backend.pdf_generator",
+]
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_times(target: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every module target imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--budget-ms", type=float, default=800.0)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    best_ms = float("inf")
+    best: List[Tuple[str, int, int]] = []
+    for _ in range(args.runs):
+        rows = import_times(TARGET)
+        total_ms = next(cumulative for name, _, cumulative in rows if name == TARGET) / 1000
+        if total_ms < best_ms:
+            best_ms, best = total_ms, rows
+
+    by_self: Dict[str, int] = {name: self_us for name, self_us, _ in best}
+    print(f"import {TARGET}: {best_ms:.0f} ms (best of {args.runs}), budget {args.budget_ms:.0f} ms")
+    print("slowest modules by self time:")
+    for name, self_us in sorted(by_self.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if best_ms > args.budget_ms:
+        failures.append(f"import time {best_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    eager = [name for name in LAZY if name in by_self]
+    if eager:
+        failures.append(f"imported at startup but should load lazily: {', '.join(eager)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
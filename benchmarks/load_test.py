@@ -0,0 +1,217 @@
+"""
+Concurrent load test for the API: fires requests from many client threads and
+reports latency percentiles, throughput and how many requests were shed with
+429 by the stage admission limits (backend/pools.py).
+
+By default it starts the app in-process with uvicorn, pointed at a local
+stand-in for the Google Sheets export that serves a synthetic workbook after
+an optional delay. Pass --url to load an already running server instead
+(then --sheet-link must name a sheet that server can reach).
+
+Usage:
+  python benchmarks/load_test.py [--endpoint reconcile] [--concurrency 32]
+                                 [--requests 500] [--rows 2000] [--sheet-delay 0.2]
+                                 [--no-sheet-cache]
+"""
+import argparse
+import http.server
+import json
+import socket
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from synthetic import CARDHOLDERS, synthetic_report_items, synthetic_expected_text, write_workbook
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_sheet_standin(workbook: bytes, delay: float) -> str:
+    """
+    Serve the workbook for any export URL; returns the base URL to use in
+    place of GOOGLE_SHEETS_BASE_URL.
+    """
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(workbook)))
+            self.end_headers()
+            self.wfile.write(workbook)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/d/"
+
+
+def start_app(sheet_base_url: str, sheet_cache: bool) -> str:
+    import uvicorn
+    import parser
+    from backend.api import app
+
+    parser.GOOGLE_SHEETS_BASE_URL = sheet_base_url
+    if not sheet_cache:
+        parser.SHEET_CACHE.ttl_seconds = -1
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url + "/health", timeout=1).read()
+            return url
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start")
+
+
+def build_request(endpoint: str, sheet_link: str, expenses: int):
+    """(path, JSON body) for one request of the chosen kind"""
+    items = synthetic_report_items(expenses * 2, seed=1)
+
+    if endpoint == "reconcile":
+        return "/reconcile", {
+            "sheet_link": sheet_link,
+            "cardholder_name": CARDHOLDERS[0],
+            "start_date": "2023-08-01",
+            "expected_expenses": synthetic_expected_text(items, expenses, seed=2),
+        }
+    if endpoint == "affidavit":
+        return "/api/generate-affidavit", {
+            "vendor": "Trader Joe's",
+            "price": 42.17,
+            "date": "2024-03-05",
+            "cardholder_name": CARDHOLDERS[0],
+        }
+    if endpoint == "health":
+        return "/health", None
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+def send(url: str, body) -> tuple:
+    """(status, seconds) for one request"""
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except OSError:
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def run_load(base_url: str, path: str, body, concurrency: int, total: int) -> dict:
+    results = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        for result in clients.map(lambda _: send(base_url + path, body), range(total)):
+            results.append(result)
+    elapsed = time.perf_counter() - started
+
+    ok = [seconds for status, seconds in results if status == 200]
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1),
+        "statuses": statuses,
+        "ok_latency_ms": {
+            "p50": round(percentile(ok, 50) * 1000, 1),
+            "p90": round(percentile(ok, 90) * 1000, 1),
+            "p99": round(percentile(ok, 99) * 1000, 1),
+            "max": round(max(ok, default=0) * 1000, 1),
+            "mean": round(statistics.fmean(ok) * 1000, 1) if ok else 0.0,
+        },
+    }
+
+
+def probe_health_while_loaded(base_url: str, stop: threading.Event) -> list:
+    """/health latencies sampled during the load run: a blocked event loop shows here"""
+    samples = []
+    while not stop.is_set():
+        samples.append(send(base_url + "/health", None)[1])
+        time.sleep(0.05)
+    return samples
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--endpoint", choices=["reconcile", "affidavit", "health"], default="reconcile")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--rows", type=int, default=2000, help="synthetic sheet rows")
+    ap.add_argument("--expenses", type=int, default=40, help="expected expense lines per request")
+    ap.add_argument("--sheet-delay", type=float, default=0.2, help="stand-in export latency (s)")
+    ap.add_argument("--no-sheet-cache", action="store_true", help="download and parse on every request")
+    ap.add_argument("--url", help="load an already running server")
+    ap.add_argument("--sheet-link", default="https://docs.google.com/spreadsheets/d/loadtest/edit")
+    args = ap.parse_args()
+
+    base_url = args.url
+    if base_url is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "sheet.xlsx"
+            write_workbook(path, args.rows)
+            workbook = path.read_bytes()
+        base_url = start_app(start_sheet_standin(workbook, args.sheet_delay), not args.no_sheet_cache)
+
+    path, body = build_request(args.endpoint, args.sheet_link, args.expenses)
+
+    # Warm pools, caches and the template before measuring
+    send(base_url + path, body)
+
+    stop = threading.Event()
+    health = []
+    prober = threading.Thread(target=lambda: health.extend(probe_health_while_loaded(base_url, stop)))
+    prober.start()
+    try:
+        report = run_load(base_url, path, body, args.concurrency, args.requests)
+    finally:
+        stop.set()
+        prober.join()
+
+    report["endpoint"] = path
+    report["health_during_load_ms"] = {
+        "p50": round(percentile(health, 50) * 1000, 1),
+        "p99": round(percentile(health, 99) * 1000, 1),
+    }
+    report["measured_at"] = datetime.now().isoformat(timespec="seconds")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
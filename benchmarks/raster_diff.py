@@ -0,0 +1,118 @@
+"""
+Raster-diff check for the affidavit fast path: renders the same affidavits
+through reportlab + merge_page (EXPENSE_PDF_FAST_PATH=0 behaviour) and through
+the prepared-template incremental update, rasterizes every page with pdfium
+and fails (exit 1) if any pixel differs by more than --tolerance. Also
+prints the per-document render time of both paths.
+
+Needs pypdfium2 (pip install pypdfium2), which the app itself does not use.
+
+Usage: python benchmarks/raster_diff.py [--dpi 150] [--tolerance 0]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pypdfium2 as pdfium
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend import pdf_generator
+
+CARDHOLDER = "Gavin Firestone (Treasurer)"
+
+CASES = [
+    ("Trader Joe's", 25.25, "2025-11-01", CARDHOLDER),
+    ("HEB", 0.0, "2024-02-29", "Jordan Lee (Socials)"),
+    ("Chick-fil-A (Rice Village)", 1204.5, "2023-08-01", "Sam Q. Public"),
+    ("Back\\slash ) and ( parens", 9.99, "2025-01-31", "Ann"),
+    ("Costco Wholesale #1234 - Bulk Snacks & Drinks for Study Break", 312.78, "2025-12-31", CARDHOLDER),
+    ("~`!@#%^&*_+={}[]|:;\"<>?/", 7.0, "2025-06-15", "Zed Zebra-Zulu Extra Words"),
+]
+
+
+def render_both(fn, *args):
+    """(reportlab + merge_page output, fast path output) of fn(*args)."""
+    pdf_generator.PDF_FAST_PATH = False
+    try:
+        slow = fn(*args).getvalue()
+    finally:
+        pdf_generator.PDF_FAST_PATH = True
+    return slow, fn(*args).getvalue()
+
+
+def rasterize(document: bytes, dpi: int):
+    pdf = pdfium.PdfDocument(document)
+    try:
+        return [
+            np.asarray(page.render(scale=dpi / 72, may_draw_forms=True).to_numpy(), dtype=np.int16)
+            for page in pdf
+        ]
+    finally:
+        pdf.close()
+
+
+def compare(name: str, slow: bytes, fast: bytes, dpi: int, tolerance: int) -> bool:
+    slow_pages, fast_pages = rasterize(slow, dpi), rasterize(fast, dpi)
+    if len(slow_pages) != len(fast_pages):
+        print(f"FAIL {name}: {len(slow_pages)} pages vs {len(fast_pages)}")
+        return False
+
+    worst, differing = 0, 0
+    for a, b in zip(slow_pages, fast_pages):
+        if a.shape != b.shape:
+            print(f"FAIL {name}: page size {a.shape} vs {b.shape}")
+            return False
+        diff = np.abs(a - b)
+        worst = max(worst, int(diff.max()))
+        differing += int((diff > tolerance).any(axis=-1).sum())
+
+    ok = worst <= tolerance
+    print(f"{'ok  ' if ok else 'FAIL'} {name}: {len(fast_pages)} page(s), "
+          f"max pixel diff {worst}, {differing} pixels over tolerance, "
+          f"{len(slow):,} -> {len(fast):,} bytes")
+    return ok
+
+
+def per_document_ms(fast: bool, n: int) -> float:
+    pdf_generator.PDF_FAST_PATH = fast
+    try:
+        t0 = time.perf_counter()
+        for i in range(n):
+            pdf_generator.render_affidavit_bytes(*CASES[i % len(CASES)])
+        return (time.perf_counter() - t0) / n * 1000
+    finally:
+        pdf_generator.PDF_FAST_PATH = True
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--dpi", type=int, default=150)
+    ap.add_argument("--tolerance", type=int, default=0)
+    ap.add_argument("--timing-docs", type=int, default=200)
+    args = ap.parse_args()
+
+    pdf_generator.warmup()
+    ok = True
+    for case in CASES:
+        assert pdf_generator.fast_path_text(pdf_generator.overlay_texts(*case)), case
+        slow, fast = render_both(pdf_generator.generate_affidavit, *case)
+        ok &= compare(f"single {case[0]!r}", slow, fast, args.dpi, args.tolerance)
+
+    bulk = [{"vendor": v, "price": p, "date": d} for v, p, d, _ in CASES]
+    slow, fast = render_both(pdf_generator.generate_affidavits, bulk, CARDHOLDER)
+    ok &= compare("bulk", slow, fast, args.dpi, args.tolerance)
+
+    slow_ms = per_document_ms(False, max(1, args.timing_docs // 10))
+    fast_ms = per_document_ms(True, args.timing_docs)
+    print(f"per affidavit: reportlab + merge_page {slow_ms:.2f} ms, fast path {fast_ms:.3f} ms "
+          f"({slow_ms / fast_ms:.0f}x)")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+Benchmark suite for the parse, reconcile and affidavit hot paths.
+
+Generates synthetic "Purchases 2023-2024" workbooks (cached between runs) and
+an expected-expense block at matching scale for each size, then times:
+
+  xlsx_load       open the workbook read-only and find the purchases sheet
+  row_extraction  read_purchase_rows: every row of the sheet as tuples
+  row_selection   parse_purchase_rows for one cardholder over extracted rows
+  row_index_build build the timestamp/cardholder SheetIndex for a sheet version
+  row_selection_indexed  row_selection answered from a built SheetIndex
+  snapshot_open   open the sheet's columnar snapshot from disk (cold)
+  row_selection_snapshot row_selection answered from an open snapshot
+  report_items    build a ReportItem for every dated row (peak memory per item)
+  snapshot_items_serial    ReportItems for every dated snapshot row, serially
+  snapshot_items_parallel  the same, in blocks on the row conversion process pool
+  phase1_exact    Phase 1 (exact price) matching
+  phase2_fuzzy    Phase 2 (price window + vendor similarity) on Phase 1 leftovers
+  reconcile       reconcile_expenses end to end, greedy and optimal
+  affidavit       one affidavit, and a bulk merged PDF
+
+Each scenario reports min/median seconds per call over --repeat samples (fast
+scenarios loop within a sample) and the peak traced allocation of one extra
+run, as JSON. --compare flags scenarios whose best time or peak memory grew
+past --threshold against a stored run, and exits non-zero if any did.
+
+Usage:
+  python benchmarks/suite.py [--sizes 1000,10000,100000] [--output run.json]
+  python benchmarks/suite.py --sizes 1000 --compare baseline.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from openpyxl import load_workbook
+
+from synthetic import CARDHOLDERS, synthetic_expected_text, write_workbook
+
+from parser import (
+    PURCHASES_SHEET, SheetIndex, SheetRows, parse_purchase_rows, read_purchase_rows,
+    row_to_report_item, select_snapshot_rows, snapshot_days, snapshot_report_items
+)
+from snapshot import SnapshotStore
+from reconcile import ActualIndex, parse_expected_expenses, reconcile_expenses
+from vendor import SIMILARITY_CACHE
+from backend.pdf_generator import generate_affidavit, generate_affidavits
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+START_DATE = date(2023, 8, 1)
+PRICE_TOLERANCE = 1.00
+SIMILARITY_THRESHOLD = 0.75
+
+# Optimal assignment is superlinear; skip it above this many actual items
+OPTIMAL_MAX_ITEMS = 5_000
+
+
+@dataclass
+class Scenario:
+    name: str
+    rows: Optional[int]
+    run: Callable[[], object]
+    # Fresh state per run, excluded from timing; its result is passed to run
+    setup: Optional[Callable[[], object]] = None
+    repeat: Optional[int] = None
+    # Objects built per run, to report peak memory per object
+    items: Optional[int] = None
+
+
+# ----------------------------
+# Data
+# ----------------------------
+
+def workbook_path(data_dir: Path, rows: int, seed: int) -> Path:
+    """
+    Synthetic workbook for this size and seed, generated on first use.
+    """
+    path = data_dir / f"purchases_{rows}_{seed}.xlsx"
+    if not path.exists():
+        data_dir.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(".partial")
+        write_workbook(partial, rows, seed)
+        partial.rename(path)
+    return path
+
+
+def extract_rows(path: Path) -> List[tuple]:
+    return list(read_purchase_rows(open(path, "rb")))
+
+
+def open_sheet(path: Path) -> None:
+    wb = load_workbook(path, read_only=True)
+    wb[PURCHASES_SHEET]
+    wb.close()
+
+
+# ----------------------------
+# Scenarios
+# ----------------------------
+
+def phase1(expected, items):
+    index = ActualIndex(items)
+    leftovers = []
+    for exp in expected:
+        act_idx = index.find_exact(exp)
+        if act_idx is None:
+            leftovers.append(exp)
+        else:
+            index.take(act_idx)
+    return index, leftovers
+
+
+def phase2(index, leftovers):
+    SIMILARITY_CACHE.clear()
+    for exp in leftovers:
+        act_idx = index.find_fuzzy(exp, PRICE_TOLERANCE, SIMILARITY_THRESHOLD)
+        if act_idx is not None:
+            index.take(act_idx)
+
+
+def size_scenarios(path: Path, rows: int, seed: int) -> List[Scenario]:
+    cardholder = CARDHOLDERS[0]
+    sheet_rows = extract_rows(path)
+    indexed_rows = SheetRows(sheet_rows)
+    indexed_rows.sheet_index
+    snapshot_dir = path.parent / "snapshots"
+    snapshot_key = path.stem
+    SnapshotStore(str(snapshot_dir)).write(snapshot_key, indexed_rows, snapshot_days(indexed_rows))
+    snapshot = SnapshotStore(str(snapshot_dir)).open(snapshot_key)
+    dated_positions = np.flatnonzero(np.asarray(snapshot.days) >= 0)
+    items = parse_purchase_rows(sheet_rows, cardholder, START_DATE)
+    dated_rows = [
+        (row, row_date)
+        for row, row_date in zip(indexed_rows, indexed_rows.sheet_index.row_dates)
+        if row_date
+    ]
+    # Roughly a quarter of a cardholder's purchases get a typed-out expected line
+    expected_text = synthetic_expected_text(items, max(20, len(items) // 4), seed)
+    expected = parse_expected_expenses(expected_text)
+
+    scenarios = [
+        Scenario("xlsx_load", rows, lambda: open_sheet(path)),
+        Scenario("row_extraction", rows, lambda: extract_rows(path)),
+        Scenario("row_selection", rows, lambda: parse_purchase_rows(sheet_rows, cardholder, START_DATE)),
+        Scenario("row_index_build", rows, lambda: SheetIndex(sheet_rows)),
+        Scenario(
+            "row_selection_indexed", rows,
+            lambda: parse_purchase_rows(indexed_rows, cardholder, START_DATE)
+        ),
+        Scenario("snapshot_open", rows, lambda: SnapshotStore(str(snapshot_dir)).open(snapshot_key)),
+        Scenario(
+            "row_selection_snapshot", rows,
+            lambda: [
+                row_to_report_item(row, row_date)
+                for _, row, row_date in select_snapshot_rows(snapshot, [cardholder], START_DATE)[cardholder]
+            ]
+        ),
+        Scenario(
+            "report_items", rows,
+            lambda: [row_to_report_item(row, row_date) for row, row_date in dated_rows],
+            items=len(dated_rows)
+        ),
+        Scenario(
+            "snapshot_items_serial", rows,
+            lambda: snapshot_report_items(snapshot, dated_positions, parallel=False),
+            items=len(dated_positions)
+        ),
+        Scenario(
+            "snapshot_items_parallel", rows,
+            lambda: snapshot_report_items(snapshot, dated_positions, parallel=True),
+            items=len(dated_positions)
+        ),
+        Scenario("phase1_exact", rows, lambda: phase1(expected, items)),
+        Scenario(
+            "phase2_fuzzy", rows,
+            run=lambda state: phase2(*state),
+            setup=lambda: phase1(expected, items)
+        ),
+        Scenario(
+            "reconcile_greedy", rows,
+            lambda: reconcile_expenses(expected_text, items, PRICE_TOLERANCE, SIMILARITY_THRESHOLD, "greedy")
+        ),
+    ]
+    if len(items) <= OPTIMAL_MAX_ITEMS:
+        scenarios.append(Scenario(
+            "reconcile_optimal", rows,
+            lambda: reconcile_expenses(expected_text, items, PRICE_TOLERANCE, SIMILARITY_THRESHOLD, "optimal")
+        ))
+    return scenarios
+
+
+def pdf_scenarios(bulk: int) -> List[Scenario]:
+    expenses = [
+        {"vendor": f"Vendor {n}", "price": 10.0 + n, "date": f"2024-03-{1 + n % 28:02d}"}
+        for n in range(bulk)
+    ]
+    return [
+        Scenario(
+            "affidavit_single", None,
+            lambda: generate_affidavit("Trader Joe's", 42.17, "2024-03-05", CARDHOLDERS[0])
+        ),
+        Scenario(
+            f"affidavit_bulk_{bulk}", None,
+            lambda: generate_affidavits(expenses, CARDHOLDERS[0]),
+            repeat=3
+        ),
+    ]
+
+
+# ----------------------------
+# Measurement
+# ----------------------------
+
+# Each timed sample loops a fast scenario until it takes at least this long
+MIN_SAMPLE_SECONDS = 0.05
+
+
+def invoke(scenario: Scenario, number: int = 1) -> float:
+    """
+    Seconds per call, averaged over number back-to-back calls.
+    """
+    if scenario.setup:
+        state = scenario.setup()
+        t0 = time.perf_counter()
+        scenario.run(state)
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(number):
+        scenario.run()
+    return (time.perf_counter() - t0) / number
+
+
+def calibrate(scenario: Scenario) -> int:
+    """
+    Calls per sample so one sample lasts MIN_SAMPLE_SECONDS (1 with setup,
+    since state is rebuilt for every call).
+    """
+    elapsed = invoke(scenario)
+    if scenario.setup or elapsed >= MIN_SAMPLE_SECONDS:
+        return 1
+    return max(1, int(MIN_SAMPLE_SECONDS / max(elapsed, 1e-7)))
+
+
+def measure(scenario: Scenario, repeat: int) -> Dict[str, object]:
+    """
+    Timed samples first (the calibration call doubles as warm-up), then one
+    traced run for peak memory so tracemalloc overhead never reaches the
+    timings.
+    """
+    runs = scenario.repeat or repeat
+    number = calibrate(scenario)
+    times = [invoke(scenario, number) for _ in range(runs)]
+
+    state = scenario.setup() if scenario.setup else None
+    tracemalloc.start()
+    try:
+        if scenario.setup:
+            scenario.run(state)
+        else:
+            scenario.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "scenario": scenario.name,
+        "rows": scenario.rows,
+        "repeat": runs,
+        "number": number,
+        "min_s": round(min(times), 6),
+        "median_s": round(statistics.median(times), 6),
+        "peak_bytes": peak,
+        **({"peak_bytes_per_item": round(peak / scenario.items)} if scenario.items else {}),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes: List[int], repeat: int, bulk: int, seed: int, data_dir: Path, only: Optional[str]) -> dict:
+    results = []
+
+    def record(scenario: Scenario):
+        if only and only not in scenario.name:
+            return
+        result = measure(scenario, repeat)
+        results.append(result)
+        print(
+            f"{scenario.name:<20} rows={str(scenario.rows or '-'):>7}  "
+            f"median {result['median_s'] * 1000:10.2f} ms  "
+            f"peak {result['peak_bytes'] / 2**20:8.2f} MiB"
+            + (f"  ({result['peak_bytes_per_item']} B/item)" if scenario.items else ""),
+            file=sys.stderr
+        )
+
+    for rows in sizes:
+        for scenario in size_scenarios(workbook_path(data_dir, rows, seed), rows, seed):
+            record(scenario)
+    for scenario in pdf_scenarios(bulk):
+        record(scenario)
+
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+# ----------------------------
+# Compare mode
+# ----------------------------
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta: float) -> List[str]:
+    """
+    Print a comparison table to stderr; returns the keys of regressed scenarios.
+
+    Times compare by best sample (min_s), the least noisy estimate; a slowdown
+    also has to exceed min_delta seconds to count.
+    """
+    def key(result):
+        return f"{result['scenario']}@{result['rows'] or '-'}"
+
+    base = {key(r): r for r in baseline["results"]}
+    regressions = []
+
+    print(f"{'scenario':<30} {'time':>10} {'memory':>10}", file=sys.stderr)
+    for result in current["results"]:
+        k = key(result)
+        old = base.get(k)
+        if old is None:
+            print(f"{k:<30} {'new':>10} {'new':>10}", file=sys.stderr)
+            continue
+
+        time_ratio = result["min_s"] / old["min_s"] if old["min_s"] else 1.0
+        mem_ratio = result["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else 1.0
+        slower = time_ratio > 1 + threshold and result["min_s"] - old["min_s"] > min_delta
+        regressed = slower or mem_ratio > 1 + threshold
+        if regressed:
+            regressions.append(k)
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{k:<30} {time_ratio:>9.2f}x {mem_ratio:>9.2f}x{flag}", file=sys.stderr)
+
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated row counts")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--bulk", type=int, default=50, help="affidavits in the bulk scenario")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--only", help="run scenarios whose name contains this")
+    ap.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "expense-bench")
+    ap.add_argument("--output", type=Path, help="write JSON here instead of stdout")
+    ap.add_argument("--compare", type=Path, help="baseline JSON from an earlier run")
+    ap.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown/growth, 0.10 = 10%%")
+    ap.add_argument("--min-delta", type=float, default=0.0005, help="ignore slowdowns under this many seconds")
+    args = ap.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    report = run_suite(sizes, args.repeat, args.bulk, args.seed, args.data_dir, args.only)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold, args.min_delta)
+        if regressions:
+            print(f"{len(regressions)} regression(s) past {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
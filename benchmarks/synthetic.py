@@ -0,0 +1,216 @@
+"""
+Synthetic "Purchases 2023-2024"-shaped workbooks for benchmarking.
+"""
+import csv
+import random
+from datetime import datetime, timedelta
+from openpyxl import Workbook
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from parser import FISCAL_YEAR_START_MONTH, PROGRAM_MAP, PURCHASES_SHEET
+
+CARDHOLDERS = [
+    "Gavin Firestone (Treasurer)",
+    "Alex Kim (President)",
+    "Jordan Lee (Socials)",
+    "Sam Patel (Beer Bike)",
+    "Riley Chen (O-Week)",
+]
+
+VENDORS = [
+    "Trader Joe's", "HEB", "Target", "Amazon", "Costco", "Walmart",
+    "Cheesecake Factory", "Burger Chan", "Chick-fil-A", "Kroger",
+    "Home Depot", "Party City", "Michaels", "Domino's", "Papa John's",
+]
+
+HEADER = [
+    "Timestamp", "Email Address", "Role", "Receipts", "Name", "Budget",
+    "Endowment", "Date of Purchase", "Price", "P-Card Holder", "Notes",
+    "Flyer", "Items", "Event", "Vendor", "Receipt Available",
+]
+
+
+# A few stores account for most purchases: Zipf-like weights over VENDORS
+VENDOR_WEIGHTS = [1 / rank for rank in range(1, len(VENDORS) + 1)]
+
+# Prices that recur across many purchases (dues, standard orders)
+COMMON_PRICES = [9.99, 14.50, 25.25, 100.00]
+
+
+def synthetic_vendor(rng: random.Random) -> str:
+    return rng.choices(VENDORS, VENDOR_WEIGHTS)[0]
+
+
+def synthetic_price(rng: random.Random) -> float:
+    """
+    Lognormal around ~$25, with some whole-dollar and recurring prices.
+    """
+    roll = rng.random()
+    if roll < 0.05:
+        return rng.choice(COMMON_PRICES)
+    price = rng.lognormvariate(3.2, 0.9)
+    if roll < 0.20:
+        return float(max(1, round(price)))
+    return round(price, 2)
+
+
+def next_timestamp(rng: random.Random, ts: datetime) -> datetime:
+    """
+    Poisson-ish form submissions: slower overnight and over the summer.
+    """
+    gap = rng.expovariate(1 / 90)
+    if ts.month in (6, 7):
+        gap *= 4
+    if ts.hour < 8:
+        gap *= 3
+    return ts + timedelta(minutes=max(1.0, gap))
+
+
+def synthetic_rows(n_rows: int, seed: int = 0, start: datetime = datetime(2023, 8, 1)):
+    """
+    Yield purchase-form row lists in timestamp order.
+    """
+    rng = random.Random(seed)
+    budgets = list(PROGRAM_MAP) + ["Other"]
+    ts = start
+
+    for i in range(n_rows):
+        ts = next_timestamp(rng, ts).replace(microsecond=0)
+        budget = rng.choice(budgets)
+        price = synthetic_price(rng)
+        yield [
+            ts,
+            f"user{i % 97}@rice.edu",
+            "Member",
+            ", ".join(f"https://drive.google.com/r{i}_{k}" for k in range(rng.randint(0, 3))),
+            f"Student {i % 211}",
+            budget,
+            "Baker Endowment" if budget == "Other" else None,
+            ts.date(),
+            price if rng.random() < 0.8 else f"${price:,.2f}",
+            rng.choice(CARDHOLDERS),
+            None,
+            f"https://drive.google.com/flyer{i}" if rng.random() < 0.3 else None,
+            "snacks, drinks, supplies",
+            f"Event {i % 53}",
+            synthetic_vendor(rng),
+            "No" if rng.random() < 0.1 else "Yes",
+        ]
+
+
+def write_workbook(path, n_rows: int, seed: int = 0, year_tabs: bool = False) -> None:
+    """
+    Write a synthetic purchases workbook with n_rows data rows to path: all
+    in PURCHASES_SHEET, or with year_tabs one "Purchases YYYY-YYYY" tab per
+    fiscal year (July to June), newest tab first as the form adds them.
+    """
+    wb = Workbook(write_only=True)
+    if not year_tabs:
+        ws = wb.create_sheet(PURCHASES_SHEET)
+        ws.append(HEADER)
+        for row in synthetic_rows(n_rows, seed):
+            ws.append(row)
+        wb.save(path)
+        return
+
+    by_year = {}
+    for row in synthetic_rows(n_rows, seed):
+        ts = row[0]
+        by_year.setdefault(ts.year if ts.month >= FISCAL_YEAR_START_MONTH else ts.year - 1, []).append(row)
+    for year in sorted(by_year, reverse=True):
+        ws = wb.create_sheet(f"Purchases {year}-{year + 1}")
+        ws.append(HEADER)
+        for row in by_year[year]:
+            ws.append(row)
+    wb.save(path)
+
+
+def csv_record(row) -> list:
+    """A synthetic row as Google Forms' CSV download writes it."""
+    ts, purchased, price = row[0], row[7], row[8]
+    return (
+        [f"{ts.month}/{ts.day}/{ts.year} {ts.hour}:{ts:%M:%S}"]
+        + ["" if v is None else v for v in row[1:7]]
+        + [f"{purchased.month}/{purchased.day}/{purchased.year}", price]
+        + ["" if v is None else v for v in row[9:]]
+    )
+
+
+def write_csv(path, n_rows: int, seed: int = 0, start: datetime = datetime(2023, 8, 1), header: bool = True) -> datetime:
+    """
+    Write (or with header=False, append) n_rows synthetic rows as CSV;
+    returns the last timestamp, to continue from with another seed.
+    """
+    ts = start
+    with open(path, "w" if header else "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if header:
+            writer.writerow(HEADER)
+        for row in synthetic_rows(n_rows, seed, start):
+            writer.writerow(csv_record(row))
+            ts = row[0]
+    return ts
+
+
+def synthetic_report_items(n_items: int, seed: int = 0):
+    """
+    ReportItems for one cardholder, shaped like parse_purchases output.
+    """
+    from models import ReportItem, price_cents
+
+    rng = random.Random(seed)
+    base = datetime(2025, 8, 1).date()
+    items = []
+    for i in range(n_items):
+        vendor = rng.choice(VENDORS)
+        items.append(ReportItem(
+            name=f"Student {i % 211}",
+            event="...",
+            items="...",
+            budget="...",
+            endowment="",
+            activity=rng.choice(list(PROGRAM_MAP.values())),
+            date=base + timedelta(days=rng.randint(0, 120)),
+            # Few distinct prices so same-price collisions are common
+            cents=price_cents(
+                rng.choice([9.99, 25.25, 14.5, 100.0]) if rng.random() < 0.2
+                else round(rng.lognormvariate(3.2, 0.9), 2)
+            ),
+            vendor=vendor,
+            receipts=(),
+            flyer="",
+            needsAffidavit=rng.random() < 0.1,
+        ))
+    return items
+
+
+def synthetic_expected_text(items, n_lines: int, seed: int = 0) -> str:
+    """
+    Expected-expense text block (MM/DD/YY - Vendor - $Price) derived from
+    items: exact copies, near-price/misspelled-vendor copies and noise lines.
+    """
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(n_lines):
+        roll = rng.random()
+        item = rng.choice(items)
+        when = item.date - timedelta(days=rng.randint(0, 3))
+        vendor, price = item.vendor, item.price
+        if roll < 0.5:
+            pass
+        elif roll < 0.8:
+            price = round(price + rng.uniform(-1.5, 1.5), 2)
+            if rng.random() < 0.5:
+                vendor = vendor.upper() if rng.random() < 0.5 else vendor[:-1]
+        else:
+            vendor = rng.choice(VENDORS)
+            price = round(rng.lognormvariate(3.2, 0.9), 2)
+        if rng.random() < 0.5:
+            lines.append(f"{when.month}/{when.day}/{when:%y} - {vendor} - ${price:,.2f}")
+        else:
+            lines.append(f"{when.month}/{when.day}/{when:%y} - ${price:,.2f} - {vendor}")
+    return "\n".join(lines)
@@ -84,3 +84,32 @@ export async function generateAffidavit(request: AffidavitRequest): Promise<Blob
 
   return await response.blob();
 }
+
+export interface BulkAffidavitRequest {
+  expenses: Omit<AffidavitRequest, 'cardholder_name'>[];
+  cardholder_name: string;
+  format?: 'pdf' | 'zip';
+}
+
+export async function generateAffidavits(request: BulkAffidavitRequest): Promise<Blob> {
+  const response = await fetch(`${API_BASE_URL}/api/generate-affidavits`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(request),
+  });
+
+  if (!response.ok) {
+    let errorMessage = 'Failed to generate affidavits';
+    try {
+      const error = await response.json();
+      errorMessage = error.detail || errorMessage;
+    } catch {
+      errorMessage = `${errorMessage}: ${response.statusText}`;
+    }
+    throw new Error(errorMessage);
+  }
+
+  return await response.blob();
+}
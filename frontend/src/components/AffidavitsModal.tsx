@@ -1,6 +1,6 @@
 import { useState } from 'react';
 import type { ParsedExpense } from '../utils/parseExpenses';
-import { generateAffidavit } from '../api';
+import { generateAffidavit, generateAffidavits } from '../api';
 import '../styles/Modal.css';
 
 interface AffidavitsModalProps {
@@ -9,8 +9,20 @@ interface AffidavitsModalProps {
   onClose: () => void;
 }
 
+function saveBlob(blob: Blob, filename: string) {
+  const url = URL.createObjectURL(blob);
+  const a = document.createElement('a');
+  a.href = url;
+  a.download = filename;
+  document.body.appendChild(a);
+  a.click();
+  document.body.removeChild(a);
+  URL.revokeObjectURL(url);
+}
+
 export default function AffidavitsModal({ expenses, cardholderName, onClose }: AffidavitsModalProps) {
   const [downloading, setDownloading] = useState<Set<number>>(new Set());
+  const [downloadingAll, setDownloadingAll] = useState<'pdf' | 'zip' | null>(null);
 
   const handleDownload = async (expense: ParsedExpense, index: number) => {
     setDownloading(prev => new Set(prev).add(index));
@@ -23,15 +35,7 @@ export default function AffidavitsModal({ expenses, cardholderName, onClose }: A
         cardholder_name: cardholderName,
       });
 
-      // Trigger download
-      const url = URL.createObjectURL(blob);
-      const a = document.createElement('a');
-      a.href = url;
-      a.download = `affidavit_${expense.vendor.replace(/\s+/g, '_')}_${expense.date}.pdf`;
-      document.body.appendChild(a);
-      a.click();
-      document.body.removeChild(a);
-      URL.revokeObjectURL(url);
+      saveBlob(blob, `affidavit_${expense.vendor.replace(/\s+/g, '_')}_${expense.date}.pdf`);
     } catch (error) {
       console.error('Failed to generate affidavit:', error);
       alert(`Failed to generate affidavit for ${expense.vendor}`);
@@ -44,6 +48,25 @@ export default function AffidavitsModal({ expenses, cardholderName, onClose }: A
     }
   };
 
+  // Every affidavit in one request: a merged PDF, or a zip of one PDF each
+  const handleDownloadAll = async (format: 'pdf' | 'zip') => {
+    setDownloadingAll(format);
+
+    try {
+      const blob = await generateAffidavits({
+        expenses: expenses.map(({ vendor, price, date }) => ({ vendor, price, date })),
+        cardholder_name: cardholderName,
+        format,
+      });
+      saveBlob(blob, `affidavits.${format}`);
+    } catch (error) {
+      console.error('Failed to generate affidavits:', error);
+      alert('Failed to generate affidavits');
+    } finally {
+      setDownloadingAll(null);
+    }
+  };
+
   const handleBackdropClick = (e: React.MouseEvent<HTMLDivElement>) => {
     if (e.target === e.currentTarget) {
       onClose();
@@ -59,6 +82,18 @@ export default function AffidavitsModal({ expenses, cardholderName, onClose }: A
         </div>
 
         <div className="modal-body">
+          <div className="download-all">
+            {(['pdf', 'zip'] as const).map(format => (
+              <button
+                key={format}
+                className="download-button"
+                onClick={() => handleDownloadAll(format)}
+                disabled={expenses.length === 0 || downloadingAll !== null}
+              >
+                {downloadingAll === format ? 'Downloading...' : `Download all (${format.toUpperCase()})`}
+              </button>
+            ))}
+          </div>
           <table className="affidavits-table">
             <thead>
               <tr>
@@ -3,7 +3,7 @@ import type { FormEvent } from 'react';
 import { reconcileExpenses } from '../api';
 import type { ReconcileResponse } from '../types';
 import AffidavitsModal from './AffidavitsModal';
-import { parseExpectedExpenses, type ParsedExpense } from '../utils/parseExpenses';
+import { parseExpectedLines, type ParsedExpense } from '../utils/parseExpenses';
 
 interface ExpenseFormProps {
   onSuccess: (response: ReconcileResponse, cardholderName: string) => void;
@@ -54,10 +54,13 @@ export default function ExpenseForm({
     }
 
     // Parse expected expenses
-    const expenses = parseExpectedExpenses(expectedExpenses);
+    const { expenses, rejected } = parseExpectedLines(expectedExpenses);
 
     if (expenses.length === 0) {
-      onError('No valid expected expenses found. Check your formatting.');
+      const first = rejected[0];
+      onError(first
+        ? `No valid expected expenses found. Line ${first.line}: ${first.reason}.`
+        : 'No valid expected expenses found. Check your formatting.');
       return;
     }
 
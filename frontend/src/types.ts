@@ -3,6 +3,7 @@ export interface ReconcileRequest {
   start_date: string;
   expected_expenses: string;
   sheet_link: string;
+  strategy?: 'greedy' | 'optimal';
 }
 
 export interface ExpectedExpense {
@@ -31,6 +32,7 @@ export interface ReconcileResponse {
   matched: MatchedPair[];
   unmatched_expected: ExpectedExpense[];
   unmatched_actual: ReportItem[];
+  total_cost: number;
 }
 
 export type ApiError = {
@@ -4,43 +4,98 @@ export interface ParsedExpense {
   price: number;
 }
 
-export function parseExpectedExpenses(text: string): ParsedExpense[] {
-  const expenses: ParsedExpense[] = [];
+export interface RejectedLine {
+  line: number;  // 1-based line number
+  text: string;
+  reason: string;
+}
 
-  for (const line of text.trim().split('\n')) {
-    const trimmedLine = line.trim();
-    if (!trimmedLine) continue;
+// The same grammar as parse_expected_lines in the backend's reconcile.py, so
+// what is previewed here is what /reconcile parses. One line: date, then
+// "vendor - price" or "$price - vendor". Separators are hyphens or en/em
+// dashes with optional spaces; the vendor may itself contain hyphens
+// ("Chick-fil-A"), since the price anchors the other end. Signed prices
+// (refunds, credits), a missing vendor and a second price are rejected.
+const SEP = String.raw`\s*[-–—]\s*`;
+const SIGN = String.raw`([-+−]?)\s*`;
+const PRICE = String.raw`(\d[\d,]*\.?\d*|\.\d+)`;
+const EXPECTED_LINE = new RegExp(
+  String.raw`^\s*(\d{1,2})/(\d{1,2})/(\d{2})` + SEP
+  + String.raw`(?:` + SIGN + String.raw`\$\s*` + PRICE + SEP + String.raw`(.+?)`
+  + String.raw`|(.+?)` + SEP + SIGN + String.raw`\$?\s*` + PRICE + String.raw`)\s*$`
+);
+const EXPECTED_DATE = /^\s*\d{1,2}\/\d{1,2}\/\d{2}\b/;
 
-    const parts = trimmedLine.split('-').map(p => p.trim());
-    if (parts.length !== 3) continue;
+// A second price inside the vendor ("Amazon - $5.00 - $6.00", "Amazon - 5.00 - 6.00")
+const PRICE_IN_VENDOR = /\$\s*[\d.]|[-–—]\s*\d[\d,]*\.\d{2}\b/;
 
-    const [dateStr, part1, part2] = parts;
+const EXPECTED_FORMAT = 'expected MM/DD/YY - Vendor - $Price or MM/DD/YY - $Price - Vendor';
 
-    // Parse date (MM/DD/YY format)
-    try {
-      const [month, day, year] = dateStr.split('/');
-      const fullYear = parseInt(year) >= 50 ? `19${year}` : `20${year}`;
-      const isoDate = `${fullYear}-${month.padStart(2, '0')}-${day.padStart(2, '0')}`;
+// "1,234.5" -> 123450. Two or fewer decimals are exact; more are rounded
+// half to even, like the backend's round().
+function parseCents(text: string): number {
+  const [whole, fraction = ''] = text.replace(/,/g, '').split('.');
+  if (fraction.length > 2) {
+    const cents = Number(`${whole || 0}.${fraction}`) * 100;
+    const floor = Math.floor(cents);
+    const diff = cents - floor;
+    return diff > 0.5 || (diff === 0.5 && floor % 2 === 1) ? floor + 1 : floor;
+  }
+  return Number(whole || 0) * 100 + Number(fraction.padEnd(2, '0'));
+}
 
-      // Determine which part is price and which is vendor
-      let price: number;
-      let vendor: string;
+export function parseExpectedLines(text: string): { expenses: ParsedExpense[]; rejected: RejectedLine[] } {
+  const expenses: ParsedExpense[] = [];
+  const rejected: RejectedLine[] = [];
 
-      if (part1.startsWith('$')) {
-        price = parseFloat(part1.replace('$', '').replace(',', ''));
-        vendor = part2;
-      } else {
-        vendor = part1;
-        price = parseFloat(part2.replace('$', '').replace(',', ''));
+  text.split(/\r\n|\r|\n/).forEach((line, index) => {
+    const number = index + 1;
+    const m = EXPECTED_LINE.exec(line);
+    if (!m) {
+      if (line.trim()) {
+        const reason = EXPECTED_DATE.test(line) ? EXPECTED_FORMAT : 'no MM/DD/YY date at the start';
+        rejected.push({ line: number, text: line.trim(), reason });
       }
+      return;
+    }
 
-      if (isNaN(price)) continue;
+    const [, month, day, yy, signFirst, priceFirst, vendorAfter, vendorBefore, signLast, priceLast] = m;
 
-      expenses.push({ date: isoDate, vendor, price });
-    } catch {
-      continue;
+    // %y rules: 69-99 are 1900s, 00-68 are 2000s
+    const year = Number(yy) + (Number(yy) >= 69 ? 1900 : 2000);
+    const date = new Date(Date.UTC(year, Number(month) - 1, Number(day)));
+    if (date.getUTCMonth() !== Number(month) - 1 || date.getUTCDate() !== Number(day)) {
+      rejected.push({ line: number, text: line.trim(), reason: `invalid date ${month}/${day}/${yy}` });
+      return;
     }
-  }
 
-  return expenses;
+    const [sign, cents, vendor]: [string, number, string] = priceFirst !== undefined
+      ? [signFirst, parseCents(priceFirst), vendorAfter]
+      : [signLast, parseCents(priceLast), vendorBefore];
+
+    let reason: string | null = null;
+    if (sign) {
+      reason = 'signed price (refunds and credits are not matched)';
+    } else if (!vendor.trim()) {
+      reason = 'missing vendor';
+    } else if (PRICE_IN_VENDOR.test(vendor)) {
+      reason = 'more than one price on the line';
+    }
+    if (reason !== null) {
+      rejected.push({ line: number, text: line.trim(), reason });
+      return;
+    }
+
+    expenses.push({
+      date: `${year}-${month.padStart(2, '0')}-${day.padStart(2, '0')}`,
+      vendor,
+      price: cents / 100,
+    });
+  });
+
+  return { expenses, rejected };
+}
+
+export function parseExpectedExpenses(text: string): ParsedExpense[] {
+  return parseExpectedLines(text).expenses;
 }
@@ -0,0 +1,226 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import threading
+import time
+
+
+# ----------------------------
+# Configuration
+# ----------------------------
+
+# EXPENSE_METRICS=0 turns every timer and counter into a no-op
+METRICS_ENABLED = os.environ.get("EXPENSE_METRICS", "1") != "0"
+
+# EXPENSE_TIMING_HEADER=1 adds a per-request X-Timing breakdown to responses
+TIMING_HEADER = os.environ.get("EXPENSE_TIMING_HEADER", "0") == "1"
+
+# Histogram bucket upper bounds, seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PREFIX = "expense_"
+
+
+# ----------------------------
+# Registry
+# ----------------------------
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)    # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Process-wide stage duration histograms and event counters, rendered in
+    the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, label: str, value: str, seconds: float) -> None:
+        with self._lock:
+            key = (name, label, value)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            by_name: Dict[str, List[Tuple[str, str, Histogram]]] = {}
+            for (name, label, value), histogram in sorted(self._histograms.items()):
+                by_name.setdefault(name, []).append((label, value, histogram))
+
+            for name, series in by_name.items():
+                metric = PREFIX + name
+                lines.append(f"# TYPE {metric} histogram")
+                for label, value, histogram in series:
+                    cumulative = 0
+                    for bound, n in zip(histogram.buckets, histogram.counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{label}="{value}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{{label}="{value}"}} {histogram.total:.6f}')
+                    lines.append(f'{metric}_count{{{label}="{value}"}} {histogram.count}')
+
+            for name, amount in sorted(self._counters.items()):
+                metric = f"{PREFIX}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {amount:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+# ----------------------------
+# Per-request collection
+# ----------------------------
+
+class Collector:
+    """
+    Stage timings and counts for one request (or one worker-process job).
+    Picklable, so worker processes can send theirs back.
+    """
+
+    def __init__(self):
+        self.stages: List[Tuple[str, float]] = []
+        self.counts: Dict[str, float] = {}
+
+    def timing_header(self) -> str:
+        """Server-Timing syntax: "download;dur=12.3, phase1;dur=0.4" (ms)"""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages)
+
+
+_collector: ContextVar[Optional[Collector]] = ContextVar("metrics_collector", default=None)
+
+
+def begin_request() -> Tuple[Collector, object]:
+    """
+    Start collecting for the current context; returns (collector, token)
+    for end_request.
+    """
+    collector = Collector()
+    return collector, _collector.set(collector)
+
+
+def end_request(token) -> None:
+    _collector.reset(token)
+
+
+# ----------------------------
+# Hot-path API
+# ----------------------------
+
+def record_stage(name: str, seconds: float) -> None:
+    METRICS.observe("stage_seconds", "stage", name, seconds)
+    collector = _collector.get()
+    if collector is not None:
+        collector.stages.append((name, seconds))
+
+
+def count(name: str, amount: float = 1) -> None:
+    """
+    Add to an event counter. Call once per batch, not per row.
+    """
+    if not METRICS_ENABLED:
+        return
+    METRICS.increment(name, amount)
+    collector = _collector.get()
+    if collector is not None:
+        collector.counts[name] = collector.counts.get(name, 0) + amount
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def stage(name: str):
+    """
+    Time a block as a named stage:
+
+        with stage("phase1"):
+            ...
+
+    Disabled metrics return a shared no-op context manager.
+    """
+    if not METRICS_ENABLED:
+        return NULL_TIMER
+    return _StageTimer(name)
+
+
+# ----------------------------
+# Worker processes
+# ----------------------------
+
+def run_collected(fn: Callable, *args, **kwargs) -> Tuple[object, Collector]:
+    """
+    Run fn in a worker process under a fresh collector; returns
+    (result, collector) for absorb() in the parent.
+    """
+    collector, token = begin_request()
+    try:
+        return fn(*args, **kwargs), collector
+    finally:
+        end_request(token)
+
+
+def absorb(collector: Collector) -> None:
+    """
+    Fold a worker's timings and counts into this process's registry and the
+    current request.
+    """
+    for name, seconds in collector.stages:
+        record_stage(name, seconds)
+    for name, amount in collector.counts.items():
+        count(name, amount)
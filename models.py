@@ -1,20 +1,107 @@
-from dataclasses import dataclass
+from dataclasses import MISSING, dataclass, fields
 from datetime import date
-from typing import List
+from typing import Callable, Tuple, TypeVar
 
-@dataclass
+T = TypeVar("T")
+
+
+def price_cents(price: float) -> int:
+    """Dollar amount as whole cents."""
+    return round(price * 100)
+
+
+# Prices are stored as whole cents so equality is exact; .price gives dollars.
+# Both classes are frozen and slotted: tens of thousands are built per sheet,
+# through fast_constructor (see below) where that happens in bulk.
+
+@dataclass(frozen=True, slots=True)
 class ReportItem:
-    description: str
+    # Description parts, joined by .description only when serialized
+    name: str
+    event: str
+    items: str
+    budget: str
+    endowment: str          # only set for "Other" budgets
     activity: str
     date: date
-    price: float
+    cents: int
     vendor: str
-    receipts: List[str]
+    receipts: Tuple[str, ...]
     flyer: str
     needsAffidavit: bool = False
 
-@dataclass
+    @property
+    def price(self) -> float:
+        return self.cents / 100
+
+    @property
+    def description(self) -> str:
+        parts = [
+            self.name,
+            "Baker College",
+            f"{self.date.month:02d}/{self.date.day:02d}/{self.date.year}",    # %m/%d/%Y without strftime
+            self.event,
+            self.items,
+            self.budget,
+        ]
+        if self.endowment:
+            parts.append(self.endowment)
+        return " | ".join(parts)
+
+
+@dataclass(frozen=True, slots=True)
 class ExpectedExpense:
     date: date
     vendor: str
-    price: float
+    cents: int
+
+    @property
+    def price(self) -> float:
+        return self.cents / 100
+
+
+def fast_constructor(cls: Callable[..., T]) -> Callable[..., T]:
+    """
+    A constructor for the frozen, slotted dataclass cls that takes the same
+    arguments and gives the same instances, about twice as fast. A frozen
+    __init__ sets every field through object.__setattr__; this one sets the
+    slots directly through their descriptors.
+    """
+    namespace = {"new": object.__new__, "cls": cls}
+    params, body = [], ["    item = new(cls)"]
+    for f in fields(cls):
+        namespace[f"set_{f.name}"] = getattr(cls, f.name).__set__
+        if f.default is MISSING:
+            params.append(f.name)
+        else:
+            namespace[f"default_{f.name}"] = f.default
+            params.append(f"{f.name}=default_{f.name}")
+        body.append(f"    set_{f.name}(item, {f.name})")
+    body.append("    return item")
+    exec(f"def construct({', '.join(params)}):\n" + "\n".join(body), namespace)
+    construct = namespace["construct"]
+    construct.__qualname__ = construct.__name__ = f"new_{cls.__name__}"
+    return construct
+
+
+new_report_item = fast_constructor(ReportItem)
+new_expected_expense = fast_constructor(ExpectedExpense)
+
+
+@dataclass(slots=True)
+class RejectedLine:
+    """An expected-expense line that did not parse."""
+    line: int       # 1-based line number
+    text: str
+    reason: str
+
+
+@dataclass(slots=True)
+class MatchCandidate:
+    """A near miss for an unmatched expected expense, and why it wasn't taken."""
+    actual: ReportItem
+    price_diff_cents: int   # actual minus expected
+    days: int               # actual date minus expected date
+    similarity: float       # vendor similarity
+    distance: float         # match_cost, with the date gap taken either way
+    reason: str
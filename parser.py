@@ -1,11 +1,35 @@
 from dataclasses import dataclass
-from typing import List
+from bisect import bisect_left, bisect_right
+from itertools import repeat
+from math import isfinite
+from functools import lru_cache, partial
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 from openpyxl import load_workbook
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from sys import intern
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import gc
+import hashlib
+import heapq
+import logging
+import numpy as np
+import os
+import re
 import requests
+import shutil
 import tempfile
-import os
-from models import ReportItem
+import threading
+import time
+from models import ReportItem, new_report_item, price_cents
+from sheet_cache import SheetCache
+from snapshot import BLANK, MALFORMED, Snapshot, SnapshotStore
+from sources import CsvReader, LocalSource, LocalSourceError, SheetLinkError, local_source
+from metrics import count, stage
+
+logger = logging.getLogger(__name__)
 
 # ----------------------------
 # Program number mapping
@@ -50,147 +74,1443 @@ PROGRAM_MAP = {
 
 
 # ----------------------------
-# Helpers
+# Sheet layout
+# ----------------------------
+
+# The form writes each fiscal year to its own tab: "Purchases 2023-2024",
+# "Purchases 2024-25", ... Only tabs named exactly that way are purchases
+# tabs; other tabs starting with "Purchases" (copies, backups, old layouts)
+# would double-count rows, so they are skipped and logged. A tab for years
+# Y1-Y2 holds submissions up to FISCAL_YEAR_START_MONTH of Y2, plus
+# TAB_GRACE_DAYS for late ones.
+PURCHASES_SHEET = "Purchases 2023-2024"
+PURCHASES_TAB = re.compile(r"\s*purchases\s+(\d{4})\s*[-\u2013/]\s*(\d{4}|\d{2})\s*", re.IGNORECASE)
+FISCAL_YEAR_START_MONTH = 7
+TAB_GRACE_DAYS = 90
+
+# Purchase form columns A–P, mapped to row-tuple indexes once so the row loop
+# indexes tuples instead of doing a string-keyed cell lookup per field.
+COLUMNS = {letter: idx for idx, letter in enumerate("ABCDEFGHIJKLMNOP")}
+
+# Every tab's rows are projected onto columns A–P above, so the COL_*
+# indexes hold whatever order a tab's columns are in. Columns are found by
+# their header on the purchase form (case, spaces and punctuation ignored).
+# A tab missing a header the parser reads, or with one of these headers
+# twice, is an error rather than a guess; the columns no report item uses
+# (UNUSED_COLUMNS) may be missing.
+HEADERS = {
+    "A": "Timestamp",
+    "B": "Email Address",
+    "C": "Role",
+    "D": "Receipts",
+    "E": "Name",
+    "F": "Budget",
+    "G": "Endowment",
+    "H": "Date of Purchase",
+    "I": "Price",
+    "J": "P-Card Holder",
+    "K": "Notes",
+    "L": "Flyer",
+    "M": "Items",
+    "N": "Event",
+    "O": "Vendor",
+    "P": "Receipt Available",
+}
+
+COL_TIMESTAMP = COLUMNS["A"]
+COL_RECEIPTS = COLUMNS["D"]
+COL_NAME = COLUMNS["E"]
+COL_BUDGET = COLUMNS["F"]
+COL_ENDOWMENT = COLUMNS["G"]
+COL_PRICE = COLUMNS["I"]
+COL_PCARD = COLUMNS["J"]
+COL_FLYER = COLUMNS["L"]
+COL_ITEMS = COLUMNS["M"]
+COL_EVENT = COLUMNS["N"]
+COL_VENDOR = COLUMNS["O"]
+COL_NEEDS_AFFIDAVIT = COLUMNS["P"]
+
+
 # ----------------------------
+# Sheet export
+# ----------------------------
+
+GOOGLE_SHEETS_BASE_URL = "https://docs.google.com/spreadsheets/d/"
+
+EXPORT_TIMEOUT = (5.0, 60.0)              # (connect, read) seconds
+EXPORT_RETRIES = 3
+EXPORT_BACKOFF = 0.5                      # seconds, doubled per retry
+EXPORT_SPOOL_LIMIT = 32 * 1024 * 1024     # bytes kept in memory before spilling to disk
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Parsed purchase rows per spreadsheet ID, shared by every request
+SHEET_CACHE = SheetCache(ttl_seconds=60.0, max_entries=16, max_size=500_000)
+
+# Columnar on-disk snapshots of parsed sheets. Once a sheet has a snapshot,
+# requests read it instead of waiting on Google, and snapshots older than
+# SNAPSHOT_REFRESH_SECONDS are re-exported in the background. They live in
+# the user's cache directory, readable by this user only, and keep only the
+# columns report items are built from. EXPENSE_SNAPSHOT_DIR="" turns
+# snapshots off.
+SNAPSHOT_DIR = os.environ.get(
+    "EXPENSE_SNAPSHOT_DIR",
+    os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "expense-snapshots")
+)
+SNAPSHOT_REFRESH_SECONDS = 60.0
+
+
+def open_snapshot_store(directory: str) -> Optional[SnapshotStore]:
+    """
+    SnapshotStore for directory, or None if snapshots are off. The directory
+    is only created on the first snapshot write, so importing this module
+    leaves the filesystem alone.
+    """
+    return SnapshotStore(directory) if directory else None
+
+
+SNAPSHOTS = open_snapshot_store(SNAPSHOT_DIR)
+SNAPSHOT_REFRESHER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-refresh")
+
+# Row-to-ReportItem conversion for selections read from a snapshot: "serial",
+# "parallel" (blocks of PARALLEL_CHUNK_ROWS converted on a process pool whose
+# workers read the snapshot themselves), or "auto" (parallel for selections of
+# PARALLEL_MIN_ROWS or more on a multi-core host). Rows held only in memory
+# are always converted serially: shipping them to workers costs more than
+# converting them.
+ROW_CONVERSION = os.environ.get("EXPENSE_ROW_CONVERSION", "auto")
+PARALLEL_MIN_ROWS = int(os.environ.get("EXPENSE_PARALLEL_MIN_ROWS", "20000"))
+PARALLEL_CHUNK_ROWS = 4096
+PARALLEL_WORKERS = os.cpu_count() or 1
 
-def export_google_sheet_to_workbook(sheet_url: str):
+if ROW_CONVERSION not in ("serial", "parallel", "auto"):
+    raise ValueError(f"Unknown EXPENSE_ROW_CONVERSION: {ROW_CONVERSION}")
+
+
+def build_export_session(
+    retries: int = EXPORT_RETRIES,
+    backoff: float = EXPORT_BACKOFF
+) -> requests.Session:
     """
-    Converts a public Google Sheet URL to an xlsx workbook via export.
+    Session with a keep-alive connection pool that retries connection errors
+    and transient 429/5xx responses with exponential backoff.
     """
-    spreadsheet_id = sheet_url.split("/d/")[1].split("/")[0]
-    export_url = (
-        f"https://docs.google.com/spreadsheets/d/"
-        f"{spreadsheet_id}/export?format=xlsx"
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False
     )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=16)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+EXPORT_SESSION = build_export_session()
+
+
+def spreadsheet_id_from_url(sheet_url: str) -> str:
+    spreadsheet_id = sheet_url.split("/d/", 1)[1].split("/")[0] if "/d/" in sheet_url else ""
+    if not spreadsheet_id:
+        raise SheetLinkError(f"Not a Google Sheets link or a local export: {sheet_url}")
+    return spreadsheet_id
+
+
+def source_key(sheet_link: str) -> str:
+    """Cache key of a sheet link: the spreadsheet ID, or a local export's key."""
+    source = local_source(sheet_link)
+    return source.key if source is not None else spreadsheet_id_from_url(sheet_link)
+
+
+def export_url_for(spreadsheet_id: str) -> str:
+    return f"{GOOGLE_SHEETS_BASE_URL}{spreadsheet_id}/export?format=xlsx"
+
+
+def download_export(spreadsheet_id: str, headers: Optional[dict] = None):
+    """
+    Stream a sheet's xlsx export into a spooled buffer over the pooled session.
+
+    The body stays in memory up to EXPORT_SPOOL_LIMIT bytes and only spills to
+    a temp file beyond that. Returns (response, buffer); buffer is None when
+    the server answered 304 Not Modified.
+    """
+    with stage("download"):
+        response = EXPORT_SESSION.get(
+            export_url_for(spreadsheet_id),
+            headers=headers,
+            stream=True,
+            timeout=EXPORT_TIMEOUT
+        )
+
+        with response:
+            if response.status_code == 304:
+                return response, None
+
+            response.raise_for_status()
+
+            buffer = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_LIMIT)
+            for chunk in response.iter_content(EXPORT_CHUNK_SIZE):
+                buffer.write(chunk)
+            count("download_bytes", buffer.tell())
+            buffer.seek(0)
+
+    return response, buffer
+
+
+def read_purchase_rows(buffer, start_dt: Optional[date] = None) -> "SheetRows":
+    """
+    Parse an exported xlsx buffer into purchase row tuples (columns A–P,
+    headers excluded), closing the buffer. Only the purchases tabs that can
+    hold rows dated on/after start_dt are read (all of them for None); their
+    rows are merged in timestamp order. The rows have no version yet (see
+    read_export).
+    """
+    with buffer:
+        with stage("load_workbook"):
+            wb = load_workbook(buffer, read_only=True)
+        try:
+            tabs, covers_from = tabs_for_window(purchase_tabs(wb.sheetnames), start_dt)
+            with stage("row_extraction"):
+                if use_parallel_tab_scan(wb, tabs):
+                    streams = scan_tabs_parallel(buffer, [tab.name for tab in tabs])
+                else:
+                    streams = [tab_rows(wb[tab.name]) for tab in tabs]
+                rows = SheetRows(merge_tab_rows(streams))
+        finally:
+            wb.close()
+    rows.covers_from = covers_from
+    count("rows_extracted", len(rows))
+    count("tabs_read", len(tabs))
+    return rows
+
+
+def export_digest(response, buffer) -> str:
+    """
+    Identifies an export's content: its ETag when the server sends one,
+    otherwise a hash of the bytes. buffer is left where it was.
+    """
+    etag = response.headers.get("ETag")
+    if etag:
+        return "etag:" + etag
+
+    digest = hashlib.sha256()
+    position = buffer.tell()
+    buffer.seek(0)
+    for chunk in iter(partial(buffer.read, EXPORT_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    buffer.seek(position)
+    return "sha256:" + digest.hexdigest()
+
+
+def content_version(*parts) -> str:
+    """
+    A rows version derived from what the rows were read from, so every
+    worker process that reads the same content agrees on it (the result
+    cache's disk tier and the snapshot store are shared between them).
+    """
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def read_export(response, buffer, start_dt: Optional[date] = None) -> "SheetRows":
+    """read_purchase_rows for a downloaded export, versioned by its content."""
+    digest = export_digest(response, buffer)
+    rows = read_purchase_rows(buffer, start_dt)
+    rows.version = content_version(digest, rows.covers_from)
+    return rows
+
+
+def store_purchase_rows(spreadsheet_id: str, rows: "SheetRows", response) -> None:
+    """
+    Publish freshly exported rows to SHEET_CACHE and the snapshot store.
+    """
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    SHEET_CACHE.put(spreadsheet_id, rows, size=len(rows), etag=etag, last_modified=last_modified)
+
+    if SNAPSHOTS is None:
+        return
+    try:
+        with stage("snapshot_write"):
+            snapshot = SNAPSHOTS.write(
+                spreadsheet_id, rows, snapshot_days(rows), etag, last_modified,
+                covers_from=rows.covers_from.toordinal() if rows.covers_from else None,
+                version=rows.version,
+                dropped_columns=[COLUMNS[letter] for letter in UNUSED_COLUMNS]
+            )
+        if rows.version is None and snapshot is not None:
+            rows.version = snapshot.version
+    except (OSError, ValueError):
+        # Serving still works from SHEET_CACHE; the next export retries. The
+        # old snapshot is older than these rows, so stop serving it
+        count("snapshot_write_errors")
+        try:
+            SNAPSHOTS.discard(spreadsheet_id)
+        except (OSError, ValueError):
+            pass
+
+
+def fetch_purchase_rows(sheet_url: str, start_dt: Optional[date] = None) -> "SheetRows":
+    """
+    Return purchase row tuples (columns A–P, headers excluded) covering at
+    least every row dated on/after start_dt (all rows for None), served from
+    SHEET_CACHE or the snapshot store when possible.
+
+    Fresh cache entries skip the network entirely, and so does a snapshot of
+    any age (a stale one is refreshed in the background), as long as they
+    cover start_dt. Otherwise stale cache entries are revalidated with
+    If-None-Match/If-Modified-Since so an unchanged sheet is not re-parsed,
+    and a new export reads at least the tabs the previous one did.
+
+    Local exports (see sources.py) are read by fetch_local_rows instead.
+    """
+    source = local_source(sheet_url)
+    if source is not None:
+        return fetch_local_rows(source)
+
+    spreadsheet_id = spreadsheet_id_from_url(sheet_url)
+
+    rows = SHEET_CACHE.get(spreadsheet_id)
+    if rows is not None and rows.covers(start_dt):
+        return rows
+
+    snapshot = current_snapshot(spreadsheet_id)
+    if snapshot is not None and covers(snapshot_covers_from(snapshot), start_dt):
+        with stage("snapshot_decode"):
+            rows = snapshot.rows(SheetRows)
+        rows.version = snapshot.version
+        rows.covers_from = snapshot_covers_from(snapshot)
+        SHEET_CACHE.put(
+            spreadsheet_id,
+            rows,
+            size=len(rows),
+            etag=snapshot.etag,
+            last_modified=snapshot.last_modified
+        )
+        return rows
+
+    previous = SHEET_CACHE.peek(spreadsheet_id)
+    if previous is not None and previous.covers(start_dt):
+        response, buffer = download_export(
+            spreadsheet_id,
+            headers=SHEET_CACHE.validators(spreadsheet_id)
+        )
+        if buffer is None:
+            rows = SHEET_CACHE.revalidated(spreadsheet_id)
+            if rows is not None:
+                return rows
+            # Evicted between lookup and response; fetch unconditionally
+            response, buffer = download_export(spreadsheet_id)
+    else:
+        response, buffer = download_export(spreadsheet_id)
+
+    if previous is not None:
+        start_dt = widest(start_dt, previous.covers_from)
+    if snapshot is not None:
+        start_dt = widest(start_dt, snapshot_covers_from(snapshot))
+
+    rows = read_export(response, buffer, start_dt)
+    store_purchase_rows(spreadsheet_id, rows, response)
+    return rows
+
+
+# ----------------------------
+# Local exports
+# ----------------------------
+#
+# Local .xlsx and .csv exports skip SHEET_CACHE and the snapshot store: a
+# stat() tells whether the file changed, and the rows last read stay in
+# LOCAL_ROWS. A CSV that only grew (same inode, bytes before the last read
+# offset unchanged) has just its appended records parsed; anything else is
+# read again in full. With EXPENSE_LOCAL_WATCH_SECONDS set, a background
+# thread does this for every local export seen so far, so appended rows are
+# ingested before the next request asks for them. The grown rows get the old
+# rows' SheetIndex extended by the new rows rather than a rebuilt one.
+
+LOCAL_WATCH_SECONDS = float(os.environ.get("EXPENSE_LOCAL_WATCH_SECONDS", "0"))
+
+# Columns no ReportItem field comes from; CSV rows leave them empty and
+# snapshots don't store them
+UNUSED_COLUMNS = "BCHK"
+
+def csv_row_projection(header: List[str]) -> Callable[[List[str]], tuple]:
+    """
+    Turns a CSV record into a row tuple for columns A–P, like tab_rows:
+    fields matched by the header, empty cells None, unused columns skipped.
+    """
+    sources = list(schema_for_header(tuple(header)).sources)
+    for letter in UNUSED_COLUMNS:
+        sources[COLUMNS[letter]] = -1       # the "" appended to each record
+    width = max(sources) + 1
+    project = itemgetter(*sources)
+
+    def row(fields: List[str]) -> tuple:
+        if len(fields) < width:
+            fields.extend([""] * (width - len(fields)))
+        fields.append("")
+        values = [value or None for value in project(fields)]
+        if values[COL_TIMESTAMP] is not None:
+            values[COL_TIMESTAMP] = csv_timestamp(values[COL_TIMESTAMP])
+        return tuple(values)
+
+    return row
+
+
+class LocalRows:
+    """The rows last read from one local export, and where reading stopped."""
+
+    def __init__(self, source: LocalSource):
+        self.source = source
+        self.lock = threading.Lock()
+        self.rows: Optional[SheetRows] = None
+        self.stat: Optional[Tuple[int, int, int]] = None    # inode, size, mtime
+        self.reader: Optional[CsvReader] = None
+        self.tail = b""
+        self.project: Optional[Callable[[List[str]], tuple]] = None
+
+    def sync(self) -> "SheetRows":
+        with self.lock:
+            try:
+                st = os.stat(self.source.path)
+            except OSError as e:
+                raise LocalSourceError(f"Cannot read local export {self.source.path}: {e.strerror}")
+            stat = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if self.rows is not None and stat == self.stat:
+                return self.rows
 
-    response = requests.get(export_url)
-    response.raise_for_status()
+            previous = self.rows
+            if not self.appended(stat):
+                self.read_all()
+            else:
+                with stage("local_read"):
+                    new = [self.project(fields) for fields in self.reader.records()]
+                if new:
+                    grown = SheetRows(self.rows + new)
+                    if self.rows._sheet_index is not None:
+                        with stage("row_index_build"):
+                            grown._sheet_index = self.rows._sheet_index.extended(grown)
+                    self.rows = grown
+                    count("local_rows_appended", len(new))
+            if self.rows is not previous:
+                # The file's identity and state stand in for its content
+                self.rows.version = content_version(self.source.key, stat)
+            self.stat = stat
+            self.tail = self.reader.tail() if self.reader is not None else b""
+            return self.rows
+
+    def appended(self, stat: Tuple[int, int, int]) -> bool:
+        """Whether the CSV only grew since it was last read."""
+        return (
+            self.reader is not None
+            and self.stat is not None
+            and stat[0] == self.stat[0]
+            and stat[1] >= self.stat[1]
+            and self.reader.tail() == self.tail
+            and self.reader.continues()
+        )
+
+    def read_all(self) -> None:
+        if self.source.kind == "xlsx":
+            self.rows = read_purchase_rows(open(self.source.path, "rb"))
+            return
+
+        # Rows hold no reference cycles, but allocating millions of them
+        # would set off full collections over and over
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            with stage("local_read"):
+                self.reader = CsvReader(self.source.path)
+                self.project = csv_row_projection(self.reader.header())
+                rows = SheetRows(self.project(fields) for fields in self.reader.records())
+        finally:
+            if collecting:
+                gc.enable()
+        count("rows_extracted", len(rows))
+        self.rows = rows
+
+
+LOCAL_ROWS: Dict[str, LocalRows] = {}
+_local_rows_lock = threading.Lock()
+_local_watcher: Optional[threading.Thread] = None
+
+
+def fetch_local_rows(source: LocalSource) -> "SheetRows":
+    """Every purchase row of a local export, re-read only as far as it changed."""
+    global _local_watcher
+    with _local_rows_lock:
+        local = LOCAL_ROWS.get(source.key)
+        if local is None:
+            local = LOCAL_ROWS[source.key] = LocalRows(source)
+        if LOCAL_WATCH_SECONDS > 0 and _local_watcher is None:
+            _local_watcher = threading.Thread(target=watch_local_sources, name="local-watch", daemon=True)
+            _local_watcher.start()
+    return local.sync()
+
+
+def watch_local_sources() -> None:
+    """Keep every local export seen so far ingested and indexed."""
+    while True:
+        time.sleep(LOCAL_WATCH_SECONDS)
+        with _local_rows_lock:
+            watched = list(LOCAL_ROWS.values())
+        for local in watched:
+            try:
+                local.sync().sheet_index
+            except (LocalSourceError, SheetSchemaError, OSError, ValueError, KeyError):
+                # Moved, half-written or not a purchase form: requests report it
+                count("local_watch_errors")
+
+
+# ----------------------------
+# Purchase tabs
+# ----------------------------
+
+class SheetSchemaError(Exception):
+    """A workbook that doesn't match the purchase form: no purchases tab, or a
+    purchases tab whose header row is missing or repeats a column."""
+
+
+@dataclass(frozen=True)
+class PurchaseTab:
+    name: str
+    ends: date          # no rows dated on/after this
+
+
+@dataclass(frozen=True)
+class SheetSchema:
+    """Where each of columns A–P is in one tab's rows (-1: not there)."""
+
+    sources: Tuple[int, ...]
+
+    @property
+    def width(self) -> int:
+        return max(self.sources) + 1
+
+    @property
+    def identity(self) -> bool:
+        return self.sources == tuple(range(len(COLUMNS)))
+
+    @property
+    def project(self) -> Callable[[Sequence], tuple]:
+        getter = itemgetter(*self.sources)
+        if -1 not in self.sources:
+            return getter
+        return lambda row: getter(tuple(row) + (None,))
+
+
+def covers(covers_from: Optional[date], start_dt: Optional[date]) -> bool:
+    """Whether rows read for covers_from answer start_dt (None: from the start)."""
+    return covers_from is None or (start_dt is not None and start_dt >= covers_from)
+
+
+def widest(a: Optional[date], b: Optional[date]) -> Optional[date]:
+    """The earlier of two start dates, where None is earliest."""
+    return None if a is None or b is None else min(a, b)
+
+
+def header_key(text) -> str:
+    return re.sub(r"[^0-9a-z]", "", str(text).lower()) if text is not None else ""
+
+
+@lru_cache(maxsize=64)
+def schema_for_header(header: Tuple) -> SheetSchema:
+    """
+    Map a tab's header row to columns A–P; cached, so each distinct header
+    (in practice, each workbook) is matched once. Raises SheetSchemaError
+    for a missing or repeated header (see HEADERS).
+    """
+    positions: Dict[str, List[int]] = {}
+    for position, text in enumerate(header):
+        positions.setdefault(header_key(text), []).append(position)
+
+    sources = []
+    missing = []
+    for letter in COLUMNS:
+        found = positions.get(header_key(HEADERS[letter]), [])
+        if len(found) > 1:
+            raise SheetSchemaError(f"Column {HEADERS[letter]!r} appears {len(found)} times in the header row")
+        if not found and letter not in UNUSED_COLUMNS:
+            missing.append(HEADERS[letter])
+        sources.append(found[0] if found else -1)
+    if missing:
+        raise SheetSchemaError(f"Header row is missing {', '.join(map(repr, missing))}")
+    return SheetSchema(tuple(sources))
+
+
+def purchase_tabs(sheet_names: Iterable[str]) -> List[PurchaseTab]:
+    """
+    The workbook's purchases tabs, oldest first. Other tabs named like
+    purchases tabs are logged and skipped.
+    """
+    tabs = []
+    for name in sheet_names:
+        m = PURCHASES_TAB.fullmatch(name)
+        if m is None:
+            if header_key(name).startswith("purchases"):
+                logger.warning("Skipping tab %r: not a year tab like %r", name, PURCHASES_SHEET)
+                count("tabs_skipped")
+            continue
+        last_year = int(m.group(2))
+        if last_year < 100:
+            last_year += int(m.group(1)) // 100 * 100
+        ends = date(last_year, FISCAL_YEAR_START_MONTH, 1) + timedelta(days=TAB_GRACE_DAYS)
+        tabs.append(PurchaseTab(name, ends))
+    tabs.sort(key=lambda tab: tab.ends)
+    return tabs
+
+
+def tabs_for_window(
+    tabs: List[PurchaseTab],
+    start_dt: Optional[date]
+) -> Tuple[List[PurchaseTab], Optional[date]]:
+    """
+    (tabs that can hold rows dated on/after start_dt, covers_from): the rows
+    of those tabs answer any start date on/after covers_from, the end of the
+    newest tab left out (None when every tab is read).
+    """
+    if not tabs:
+        raise SheetSchemaError(f"No purchases tab in workbook (expected e.g. {PURCHASES_SHEET!r})")
+
+    needed = [tab for tab in tabs if start_dt is None or tab.ends > start_dt]
+    skipped = [tab.ends for tab in tabs if tab not in needed]
+    return needed, max(skipped) if skipped else None
+
+
+def tab_rows(ws) -> Iterable[tuple]:
+    """
+    A worksheet's data rows (header excluded) projected onto columns A–P.
+    """
+    header = next(ws.iter_rows(max_row=1, values_only=True), ())
+    if not any(header):
+        return iter(())     # a tab the form hasn't written to yet
+    try:
+        schema = schema_for_header(tuple(header))
+    except SheetSchemaError as e:
+        raise SheetSchemaError(f"Tab {ws.title!r}: {e}") from None
+    rows = ws.iter_rows(min_row=2, max_col=schema.width, values_only=True)
+    return rows if schema.identity else map(schema.project, rows)
+
+
+def timestamp_keyed(rows: Iterable[tuple]) -> Iterable[Tuple[datetime, tuple]]:
+    """
+    (timestamp, row) pairs; a row without a usable timestamp takes the one
+    before it, so it stays next to its neighbours when tabs are merged.
+    """
+    key = datetime.min
+    for row in rows:
+        value = row[COL_TIMESTAMP]
+        if value:
+            try:
+                key = extract_timestamp(value)
+            except ValueError:
+                pass
+        yield key, row
+
+
+def merge_tab_rows(streams: List[Iterable[tuple]]) -> Iterable[tuple]:
+    """
+    Lazily merge per-tab row streams (each in sheet order) into timestamp
+    order; ties keep the older tab's row first.
+    """
+    if len(streams) == 1:
+        return streams[0]
+    return map(itemgetter(1), heapq.merge(*map(timestamp_keyed, streams), key=itemgetter(0)))
+
+
+def use_parallel_tab_scan(wb, tabs: List[PurchaseTab]) -> bool:
+    """
+    Whether to read tabs on the conversion pool: the same policy as row
+    conversion, over the rows the tabs' dimensions claim.
+    """
+    if len(tabs) < 2:
+        return False
+    if ROW_CONVERSION != "auto":
+        return ROW_CONVERSION == "parallel"
+    return PARALLEL_WORKERS > 1 and sum(wb[tab.name].max_row or 0 for tab in tabs) >= PARALLEL_MIN_ROWS
+
+
+def scan_tab(path: str, name: str) -> List[tuple]:
+    """tab_rows of one tab of the workbook at path, for worker processes."""
+    wb = load_workbook(path, read_only=True)
+    try:
+        return list(tab_rows(wb[name]))
+    finally:
+        wb.close()
+
+
+def scan_tabs_parallel(buffer, names: List[str]) -> List[List[tuple]]:
+    """
+    Read each named tab in its own worker. Workers open the workbook from a
+    temporary copy of buffer, so nothing large is pickled on the way in.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as f:
+        buffer.seek(0)
+        shutil.copyfileobj(buffer, f)
+        f.flush()
+        futures = [conversion_pool().submit(scan_tab, f.name, name) for name in names]
+        return [future.result() for future in futures]
+
+
+# ----------------------------
+# Snapshots
+# ----------------------------
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def snapshot_covers_from(snapshot: Snapshot) -> Optional[date]:
+    """SheetRows.covers_from of the rows a snapshot was written from."""
+    return date.fromordinal(snapshot.covers_from) if snapshot.covers_from else None
+
+
+def snapshot_days(rows: "SheetRows") -> List[int]:
+    """
+    Date ordinal per row for the snapshot's days column.
+    """
+    sheet_index = rows.sheet_index
+    days = [row_date.toordinal() if row_date else BLANK for row_date in sheet_index.row_dates]
+    for position in sheet_index.malformed:
+        days[position] = MALFORMED
+    return days
+
+
+def current_snapshot(spreadsheet_id: str) -> Optional[Snapshot]:
+    """
+    The sheet's snapshot, if snapshots are on and one exists. Schedules a
+    background refresh when it is older than SNAPSHOT_REFRESH_SECONDS.
+    """
+    if SNAPSHOTS is None:
+        return None
+    try:
+        snapshot = SNAPSHOTS.open(spreadsheet_id)
+    except PermissionError:
+        # Someone else's directory, or a symlink: serve without snapshots
+        count("snapshot_dir_errors")
+        return None
+    except ValueError:
+        return None
+
+    if snapshot is not None and SNAPSHOTS.age(snapshot) > SNAPSHOT_REFRESH_SECONDS:
+        schedule_snapshot_refresh(spreadsheet_id)
+    return snapshot
+
+
+def refresh_snapshot(spreadsheet_id: str) -> None:
+    """
+    Re-export a sheet conditionally and replace its snapshot if it changed.
+    """
+    snapshot = SNAPSHOTS.open(spreadsheet_id)
+    headers = {}
+    if snapshot is not None:
+        if snapshot.etag:
+            headers["If-None-Match"] = snapshot.etag
+        if snapshot.last_modified:
+            headers["If-Modified-Since"] = snapshot.last_modified
+
+    response, buffer = download_export(spreadsheet_id, headers=headers)
+    if buffer is None:
+        SNAPSHOTS.touch(spreadsheet_id)
+        SHEET_CACHE.revalidated(spreadsheet_id)
+        return
+
+    covers_from = snapshot_covers_from(snapshot) if snapshot is not None else None
+    store_purchase_rows(spreadsheet_id, read_export(response, buffer, covers_from), response)
+
+
+def schedule_snapshot_refresh(spreadsheet_id: str) -> None:
+    """
+    Queue refresh_snapshot on the background refresher, at most once per sheet
+    at a time.
+    """
+    with _refreshing_lock:
+        if spreadsheet_id in _refreshing:
+            return
+        _refreshing.add(spreadsheet_id)
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
-    tmp.write(response.content)
-    tmp.close()
+    def run():
+        try:
+            refresh_snapshot(spreadsheet_id)
+        except Exception:
+            count("snapshot_refresh_errors")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(spreadsheet_id)
 
-    wb = load_workbook(tmp.name)
-    os.unlink(tmp.name)
-    return wb
+    SNAPSHOT_REFRESHER.submit(run)
 
 
+def select_snapshot_positions(
+    snapshot: Snapshot,
+    cardholder_names: Iterable[str],
+    start_dt: date
+) -> Dict[str, np.ndarray]:
+    """
+    Positions select_purchase_rows_by_cardholder would pick, newest first:
+    the date window and cardholder filters are vectorized masks over the days
+    and column J code arrays, and no row is decoded.
+    """
+    with stage("snapshot_select"):
+        in_window, last_older = snapshot.window(start_dt.toordinal())
+
+        malformed = snapshot.malformed_positions()
+        if malformed.size and malformed[-1] > last_older:
+            extract_date(snapshot.row(int(malformed[-1]))[COL_TIMESTAMP])
+
+        return {
+            name: snapshot.matching(in_window, COL_PCARD, name)[::-1]
+            for name in cardholder_names
+        }
+
+
+def select_snapshot_rows(
+    snapshot: Snapshot,
+    cardholder_names: Iterable[str],
+    start_dt: date
+) -> Dict[str, List[Tuple[int, Sequence, date]]]:
+    """
+    select_purchase_rows_by_cardholder over a snapshot; only the selected
+    rows are decoded.
+    """
+    return {
+        name: [
+            (p, row, date.fromordinal(day))
+            for p, row, day in zip(
+                positions.tolist(),
+                snapshot.take(positions),
+                np.asarray(snapshot.days)[positions].tolist()
+            )
+        ]
+        for name, positions in select_snapshot_positions(snapshot, cardholder_names, start_dt).items()
+    }
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+
 def parse_mmddyyyy(date_str: str) -> datetime:
     return datetime.strptime(date_str, "%m/%d/%Y")
 
-def parse_receipts(cell_value) -> List[str]:
+def parse_receipts(cell_value) -> Tuple[str, ...]:
     if not cell_value:
-        return []
+        return ()
 
     # Split on commas, strip whitespace, drop empties
-    return [
-        part.strip()
-        for part in str(cell_value).split(",")
-        if part.strip()
-    ]
+    return tuple(
+        part
+        for part in map(str.strip, str(cell_value).split(","))
+        if part
+    )
+
+# Text cells repeat across rows: every response on a day shares its date
+# part, and recurring purchases share prices. Their parses are memoized in
+# bounded caches, while native openpyxl datetime and float cells take exact
+# type checks ahead of the general isinstance chain.
+CELL_CACHE_SIZE = 16384
+
+# Google Forms' CSV download writes timestamps as M/D/YYYY H:MM:SS
+CSV_DAY = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _date_from_text(day_text: str) -> date:
+    return datetime.fromisoformat(day_text).date()
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _price_from_text(price_text: str) -> float:
+    # Strip whitespace, dollar signs and thousands separators; "nan" and
+    # "inf" parse as floats but are no more a price than "abc"
+    try:
+        price = float(price_text.strip().replace("$", "").replace(",", ""))
+    except ValueError:
+        return 0.0
+    return price if isfinite(price) else 0.0
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _cents_from_text(price_text: str) -> int:
+    return price_cents(_price_from_text.__wrapped__(price_text))
 
 def extract_date(cell_value) -> date:
+    kind = type(cell_value)
+    if kind is datetime:
+        return cell_value.date()
+
+    # Always ISO format: YYYY-MM-DD[ ...]
+    if kind is str:
+        return _date_from_text(cell_value.split(" ", 1)[0])
+
     if isinstance(cell_value, datetime):
         return cell_value.date()
 
     if isinstance(cell_value, date):
         return cell_value
 
-    # Always ISO format: YYYY-MM-DD[ ...]
-    return datetime.fromisoformat(str(cell_value).split(" ")[0]).date()
+    return _date_from_text(str(cell_value).split(" ", 1)[0])
+
+def extract_timestamp(cell_value) -> datetime:
+    if isinstance(cell_value, datetime):
+        return cell_value
+
+    if isinstance(cell_value, date):
+        return datetime.combine(cell_value, datetime.min.time())
+
+    return datetime.fromisoformat(str(cell_value).strip())
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _csv_day(day_text: str) -> Optional[Tuple[int, int, int]]:
+    m = CSV_DAY.fullmatch(day_text)
+    return (int(m.group(3)), int(m.group(1)), int(m.group(2))) if m is not None else None
+
+def csv_timestamp(text: str):
+    """
+    A CSV timestamp cell as a datetime, like the xlsx export's: the
+    M/D/YYYY H:MM:SS that Google Forms exports, or ISO. Anything else is
+    kept as text, to fail where a malformed xlsx cell would.
+    """
+    day_text, _, clock = text.strip().partition(" ")
+    day = _csv_day(day_text)
+    try:
+        if day is None:
+            return datetime.fromisoformat(text.strip())
+        return datetime(*day, *map(int, clock.split(":"))) if clock else datetime(*day)
+    except (TypeError, ValueError):
+        return text
 
 def parse_price(cell_value) -> float:
     """
     Parse price from cell value, handling numeric values with or without decimals.
     """
+    kind = type(cell_value)
+    if kind is float:
+        return cell_value if isfinite(cell_value) else 0.0
+
+    if kind is str:
+        return _price_from_text(cell_value)
+
     if not cell_value:
         return 0.0
 
     # Handle numeric types directly
-    if isinstance(cell_value, (int, float)):
+    if isinstance(cell_value, int):
         return float(cell_value)
+    if isinstance(cell_value, float):
+        return float(cell_value) if isfinite(cell_value) else 0.0
 
-    # Handle string values - strip whitespace and dollar signs
-    price_str = str(cell_value).strip().replace("$", "").replace(",", "")
+    return _price_from_text(str(cell_value))
 
-    try:
-        return float(price_str)
-    except ValueError:
-        return 0.0
+def parse_price_cents(cell_value) -> int:
+    """parse_price in whole cents."""
+    kind = type(cell_value)
+    if kind is float:
+        return round(cell_value * 100) if isfinite(cell_value) else 0
+    if kind is str:
+        return _cents_from_text(cell_value)
+    return price_cents(parse_price(cell_value))
+
+def price_cents_column(cells: Sequence) -> List[int]:
+    """
+    parse_price_cents for a whole column. Finite float cells (openpyxl's
+    numbers) are scaled and rounded in one numpy pass, which rounds half to
+    even exactly like round(); every other cell goes through the per-cell path.
+    """
+    dollars = np.array(
+        [cell if type(cell) is float else np.nan for cell in cells],
+        dtype=np.float64
+    )
+    others = np.flatnonzero(~np.isfinite(dollars))
+    dollars[others] = 0.0
+
+    cents = np.rint(dollars * 100).astype(np.int64).tolist()
+    for i in others.tolist():
+        cents[i] = parse_price_cents(cells[i])
+    return cents
+
+def convert_column(cells: Iterable, convert: Callable[[Any], Any]) -> list:
+    """
+    convert(cell) for a whole column, calling convert once per distinct cell
+    and sharing the result between equal cells.
+    """
+    memo = {}
+    converted = []
+    for cell in cells:
+        try:
+            value = memo[cell]
+        except KeyError:
+            value = memo[cell] = convert(cell)
+        converted.append(value)
+    return converted
+
+
+# ----------------------------
+# Row index
+# ----------------------------
+
+class SheetIndex:
+    """
+    Timestamp (column A) and P-card holder (column J) index over one sheet
+    version's rows, so a date window is a binary search and a cardholder's
+    rows in it are a list slice.
+
+    Form responses are appended in timestamp order, so the dated rows are
+    normally sorted by date. Any out-of-order rows are confined to a prefix:
+    the longest sorted suffix is searched with bisect, and the unsorted
+    prefix gets its own (date, position) list, so rows that a linear
+    bottom-up scan would have skipped past are still found.
+    """
+
+    def __init__(self, rows: Sequence[Sequence]):
+        self.size = 0
+        self.row_dates: List[Optional[date]] = []
+        self.positions: List[int] = []          # dated rows, sheet order
+        self.dates: List[date] = []             # their dates
+        self.malformed: List[int] = []          # positions of unparseable timestamps
+        self.by_cardholder: Dict[str, List[int]] = {}
+        self.scan(rows)
+        self.find_sorted_suffix()
+
+    def extended(self, rows: Sequence[Sequence]) -> "SheetIndex":
+        """
+        Index of rows, which are this index's rows with more appended. Only
+        the new rows are scanned; if they keep the dates sorted, the
+        out-of-order prefix carries over too.
+        """
+        index = SheetIndex.__new__(SheetIndex)
+        index.size = self.size
+        index.row_dates = self.row_dates.copy()
+        index.positions = self.positions.copy()
+        index.dates = self.dates.copy()
+        index.malformed = self.malformed.copy()
+        index.by_cardholder = {name: positions.copy() for name, positions in self.by_cardholder.items()}
+        index.scan(rows[self.size:])
+
+        old = len(self.dates)
+        if self.dates and all(index.dates[i - 1] <= index.dates[i] for i in range(old, len(index.dates))):
+            index.sorted_from = self.sorted_from
+            index.prefix_by_date = self.prefix_by_date
+            index.prefix_max_position = self.prefix_max_position
+            index.out_of_order = self.out_of_order
+        else:
+            index.find_sorted_suffix()
+        return index
+
+    def scan(self, rows: Sequence[Sequence]) -> None:
+        """Index rows as the ones after those already indexed."""
+        start = self.size
+        self.size += len(rows)
+        self.row_dates.extend([None] * len(rows))
+
+        for position, row in enumerate(rows, start):
+            A_timestamp = row[COL_TIMESTAMP]
+            if not A_timestamp:
+                continue
+            try:
+                row_date = extract_date(A_timestamp)
+            except ValueError:
+                self.malformed.append(position)
+                continue
+
+            self.row_dates[position] = row_date
+            self.positions.append(position)
+            self.dates.append(row_date)
+            self.by_cardholder.setdefault(row[COL_PCARD], []).append(position)
+
+    def find_sorted_suffix(self) -> None:
+        # dates[sorted_from:] is non-decreasing
+        self.sorted_from = len(self.dates) - 1 if self.dates else 0
+        while self.sorted_from > 0 and self.dates[self.sorted_from - 1] <= self.dates[self.sorted_from]:
+            self.sorted_from -= 1
+
+        # Unsorted prefix by date, with a running max of positions so the last
+        # row older than a given date is one lookup
+        self.prefix_by_date = sorted(zip(self.dates[:self.sorted_from], self.positions[:self.sorted_from]))
+        self.prefix_max_position: List[int] = []
+        for _, position in self.prefix_by_date:
+            self.prefix_max_position.append(max(position, self.prefix_max_position[-1] if self.prefix_max_position else -1))
+
+        self.out_of_order = sum(
+            1 for i in range(self.sorted_from) if self.dates[i] > self.dates[i + 1]
+        )
+        if self.out_of_order:
+            count("out_of_order_timestamps", self.out_of_order)
+
+    def window(self, start_dt: date) -> Tuple[int, List[int], int]:
+        """
+        Rows dated on/after start_dt: (first position of the window in the
+        sorted suffix, out-of-order prefix positions also in the window in
+        sheet order, position of the last row older than start_dt or -1).
+        """
+        k = bisect_left(self.dates, start_dt, lo=self.sorted_from)
+        window_start = self.positions[k] if k < len(self.positions) else self.size
+
+        j = bisect_left(self.prefix_by_date, (start_dt,))
+        extras = sorted(position for _, position in self.prefix_by_date[j:])
+
+        if k > self.sorted_from:
+            last_older = self.positions[k - 1]
+        else:
+            last_older = self.prefix_max_position[j - 1] if j > 0 else -1
+
+        return window_start, extras, last_older
+
+    def select(
+        self,
+        rows: Sequence[Sequence],
+        cardholder_names: Iterable[str],
+        start_dt: date
+    ) -> Dict[str, List[Tuple[int, Sequence, date]]]:
+        """
+        Same result as select_purchase_rows_by_cardholder's scan.
+        """
+        window_start, extras, last_older = self.window(start_dt)
+
+        # A malformed timestamp below the last older row sits inside the window
+        if bisect_right(self.malformed, last_older) < len(self.malformed):
+            extract_date(rows[self.malformed[-1]][COL_TIMESTAMP])
+
+        selected = {}
+        for name in cardholder_names:
+            positions = self.by_cardholder.get(name, [])
+            picked = [p for p in extras if rows[p][COL_PCARD] == name]
+            picked += positions[bisect_left(positions, window_start):]
+            selected[name] = [(p, rows[p], self.row_dates[p]) for p in reversed(picked)]
+        return selected
+
+
+class SheetRows(list):
+    """
+    Row tuples of one exported sheet version. Its SheetIndex is built on
+    first use and lives as long as the rows do, so each workbook version is
+    indexed once; a new export is a new SheetRows.
+
+    version identifies that export: its snapshot's version once it has one,
+    a fresh ID otherwise. covers_from is the earliest start date the rows
+    answer (see tabs_for_window); None means every tab was read.
+    """
+
+    _sheet_index: Optional[SheetIndex] = None
+    version: Optional[str] = None
+    covers_from: Optional[date] = None
+
+    def covers(self, start_dt: Optional[date]) -> bool:
+        """Whether the rows hold everything dated on/after start_dt (None: everything)."""
+        return covers(self.covers_from, start_dt)
+
+    @property
+    def sheet_index(self) -> SheetIndex:
+        if self._sheet_index is None:
+            with stage("row_index_build"):
+                self._sheet_index = SheetIndex(self)
+        return self._sheet_index
 
 
 # ----------------------------
 # Core parser
 # ----------------------------
 
-def parse_purchases(
-    spreadsheet_link: str,
-    cardholder_name: str,
-    start_date: str
+def row_to_report_item(row: Sequence, row_date: date) -> ReportItem:
+    """
+    Build a ReportItem from one purchase-form row tuple (columns A–P).
+    """
+    return new_report_item(*report_item_fields(row, row_date))
+
+
+def report_item_fields(row: Sequence, row_date: date, cents: Optional[int] = None) -> tuple:
+    """
+    ReportItem's field values, in field order, for one purchase-form row.
+    cents overrides the price cell when it was already converted.
+    """
+    F_budget = row[COL_BUDGET]
+    G_endowment = row[COL_ENDOWMENT]
+    O_vendor = row[COL_VENDOR]
+    L_flyer = row[COL_FLYER]
+
+    # Cell strings are shared with the cached rows; vendor and activity are
+    # interned so every item for a vendor points at one string
+    return (
+        str(row[COL_NAME]),                                                  # name
+        str(row[COL_EVENT]),                                                 # event
+        str(row[COL_ITEMS]),                                                 # items
+        str(F_budget),                                                       # budget
+        str(G_endowment) if F_budget == "Other" and G_endowment else "",     # endowment
+        intern(PROGRAM_MAP.get(F_budget, "")),                               # activity
+        row_date,                                                            # date
+        parse_price_cents(row[COL_PRICE]) if cents is None else cents,       # cents
+        intern(str(O_vendor)) if O_vendor else "",                           # vendor
+        parse_receipts(row[COL_RECEIPTS]),                                   # receipts
+        str(L_flyer) if L_flyer else "",                                     # flyer
+        row[COL_NEEDS_AFFIDAVIT] == "No",                                    # needsAffidavit
+    )
+
+
+def report_item_field_rows(rows: Sequence[Sequence], row_dates: Sequence[date]) -> List[tuple]:
+    """
+    report_item_fields for many rows, with the price column converted as one
+    batch.
+    """
+    cents = price_cents_column([row[COL_PRICE] for row in rows])
+    return [
+        report_item_fields(row, row_date, row_cents)
+        for row, row_date, row_cents in zip(rows, row_dates, cents)
+    ]
+
+
+# ----------------------------
+# Row conversion
+# ----------------------------
+
+_conversion_pool: Optional[ProcessPoolExecutor] = None
+_conversion_pool_lock = threading.Lock()
+
+
+def conversion_pool() -> ProcessPoolExecutor:
+    global _conversion_pool
+    with _conversion_pool_lock:
+        if _conversion_pool is None:
+            _conversion_pool = ProcessPoolExecutor(max_workers=PARALLEL_WORKERS)
+        return _conversion_pool
+
+
+def shutdown_conversion_pool() -> None:
+    global _conversion_pool
+    with _conversion_pool_lock:
+        if _conversion_pool is not None:
+            _conversion_pool.shutdown(cancel_futures=True)
+            _conversion_pool = None
+
+
+def use_parallel_conversion(n_rows: int) -> bool:
+    if ROW_CONVERSION == "auto":
+        return PARALLEL_WORKERS > 1 and n_rows >= PARALLEL_MIN_ROWS
+    return ROW_CONVERSION == "parallel"
+
+
+def report_items_for(picked: Sequence[Tuple[int, Sequence, date]]) -> List[ReportItem]:
+    """
+    ReportItems for selected (position, row, row_date) entries, in order.
+    """
+    with stage("row_loop"):
+        return [
+            new_report_item(*fields)
+            for fields in report_item_field_rows(
+                [row for _, row, _ in picked],
+                [row_date for _, _, row_date in picked]
+            )
+        ]
+
+
+def snapshot_report_items(
+    snapshot: Snapshot,
+    positions: np.ndarray,
+    parallel: Optional[bool] = None
 ) -> List[ReportItem]:
+    """
+    ReportItems for the snapshot rows at positions, in order.
 
-    wb = export_google_sheet_to_workbook(spreadsheet_link)
-    ws = wb["Purchases 2023-2024"]
+    Large selections (see ROW_CONVERSION, or force with parallel) are split
+    into PARALLEL_CHUNK_ROWS blocks of positions. Workers decode and convert
+    their blocks straight from the memory-mapped snapshot and send back field
+    tuples, which are merged in order, so only positions and results cross
+    the process boundary.
+    """
+    with stage("row_loop"):
+        if parallel is None:
+            parallel = use_parallel_conversion(len(positions))
 
-    start_dt = datetime.strptime(start_date, "%m/%d/%Y").date()
-    report_items: List[ReportItem] = []
+        blocks = [
+            positions[start:start + PARALLEL_CHUNK_ROWS]
+            for start in range(0, len(positions), PARALLEL_CHUNK_ROWS)
+        ]
+        if parallel:
+            try:
+                items: List[ReportItem] = []
+                for fields in conversion_pool().map(convert_snapshot_block, repeat(snapshot.path), blocks):
+                    items.extend(new_report_item(*values) for values in fields)
+                return items
+            except OSError:
+                # Version removed by a refresh before a worker opened it
+                pass
 
-    # Iterate bottom → top (skip header)
-    for row in range(ws.max_row, 1, -1):
-        A_timestamp = ws[f"A{row}"].value
-        J_pcard = ws[f"J{row}"].value
+        # Block by block here too, so decoded rows never pile up
+        items = []
+        for block in blocks:
+            items.extend(new_report_item(*values) for values in snapshot_block_fields(snapshot, block))
+        return items
 
+
+def snapshot_block_fields(snapshot: Snapshot, positions: np.ndarray) -> List[tuple]:
+    """
+    report_item_fields for the snapshot rows at positions. Prices are
+    converted once per distinct value of the column's dictionary, and equal
+    days share one date object.
+    """
+    if not len(positions):
+        return []
+    price_codes = np.asarray(snapshot.codes[COL_PRICE])[positions]
+    cents = snapshot.converted(COL_PRICE, parse_price_cents, np.int64)[price_codes].tolist()
+    row_dates = convert_column(np.asarray(snapshot.days)[positions].tolist(), date.fromordinal)
+    return [
+        report_item_fields(row, row_date, row_cents)
+        for row, row_date, row_cents in zip(snapshot.take(positions), row_dates, cents)
+    ]
+
+
+# Snapshot versions opened by this conversion worker
+_worker_snapshots: Dict[str, Snapshot] = {}
+
+
+def convert_snapshot_block(path: str, positions: np.ndarray) -> List[tuple]:
+    """
+    Conversion worker job: report_item_fields for the rows at positions of
+    the snapshot version at path.
+    """
+    snapshot = _worker_snapshots.get(path)
+    if snapshot is None:
+        _worker_snapshots.clear()    # only the newest version stays mapped
+        snapshot = _worker_snapshots[path] = Snapshot.load(path)
+    return snapshot_block_fields(snapshot, positions)
+
+
+def select_purchase_rows_by_cardholder(
+    rows: Iterable[Sequence],
+    cardholder_names: Iterable[str],
+    start_dt: date
+) -> Dict[str, List[Tuple[int, Sequence, date]]]:
+    """
+    Partition purchase-form row tuples (header excluded, sheet order) by
+    P-card holder (column J), keeping rows dated on/after start_dt.
+    Returns {cardholder: [(position, row, row_date), ...]} newest first, where
+    position is the row's offset in rows.
+
+    SheetRows are answered from their cached SheetIndex; any other iterable
+    is streamed once. Rows out of timestamp order are kept if they are in
+    the window. A malformed timestamp raises if it sits below the last row
+    older than start_dt, i.e. where the original bottom-up scan would have
+    hit it.
+    """
+    if isinstance(rows, SheetRows):
+        return rows.sheet_index.select(rows, cardholder_names, start_dt)
+
+    selected = {name: [] for name in cardholder_names}
+    pending_error = None
+    position = -1
+
+    for position, row in enumerate(rows):
+        A_timestamp = row[COL_TIMESTAMP]
         if not A_timestamp:
             continue
 
         # Timestamp is consistently formatted; extract date portion
-        row_date = extract_date(A_timestamp)
+        try:
+            row_date = extract_date(A_timestamp)
+        except ValueError as e:
+            pending_error = e
+            continue
 
-        # Stop once we're before the start date
         if row_date < start_dt:
-            break
+            pending_error = None
+            continue
 
-        if J_pcard != cardholder_name:
+        picked = selected.get(row[COL_PCARD])
+        if picked is None:
             continue
 
-        D_receipts = ws[f"D{row}"].value
-        E_name = ws[f"E{row}"].value
-        F_budget = ws[f"F{row}"].value
-        G_endowment = ws[f"G{row}"].value
-        I_price = ws[f"I{row}"].value
-        L_flyer = ws[f"L{row}"].value
-        M_items = ws[f"M{row}"].value
-        N_event = ws[f"N{row}"].value
-        O_vendor = ws[f"O{row}"].value
-        P_needs_affidavit = ws[f"P{row}"].value
-
-        description_parts = [
-            str(E_name),
-            "Baker College",
-            row_date.strftime("%m/%d/%Y"),
-            str(N_event),
-            str(M_items),
-            str(F_budget),
-        ]
+        picked.append((position, row, row_date))
 
-        if F_budget == "Other" and G_endowment:
-            description_parts.append(str(G_endowment))
+    count("rows_scanned", position + 1)
+    if pending_error is not None:
+        raise pending_error
 
-        description = " | ".join(description_parts)
-        activity = PROGRAM_MAP.get(F_budget, "")
+    for picked in selected.values():
+        picked.reverse()
+    return selected
 
 
-        report_items.append(
-            ReportItem(
-                description=description,
-                activity=activity,
-                date=row_date,
-                price=parse_price(I_price),
-                vendor=str(O_vendor) if O_vendor else "",
-                receipts=parse_receipts(D_receipts),
-                flyer=str(L_flyer) if L_flyer else "",
-                needsAffidavit=(P_needs_affidavit == "No")
-            )
-        )
+def select_purchase_rows(
+    rows: Iterable[Sequence],
+    cardholder_name: str,
+    start_dt: date
+) -> List[Tuple[int, Sequence, date]]:
+    """
+    One cardholder's rows on/after start_dt, as (position, row, row_date)
+    newest first.
+    """
+    return select_purchase_rows_by_cardholder(rows, [cardholder_name], start_dt)[cardholder_name]
+
+
+def parse_purchase_rows_by_cardholder(
+    rows: Iterable[Sequence],
+    cardholder_names: Iterable[str],
+    start_dt: date
+) -> Dict[str, List[ReportItem]]:
+    """
+    ReportItems for several cardholders from a single pass over the rows.
+    """
+    return {
+        name: report_items_for(picked)
+        for name, picked in select_purchase_rows_by_cardholder(rows, cardholder_names, start_dt).items()
+    }
+
 
-    return report_items
+def parse_purchase_rows(
+    rows: Iterable[Sequence],
+    cardholder_name: str,
+    start_dt: date
+) -> List[ReportItem]:
+    """
+    Convert purchase-form row tuples (header excluded, sheet order) into
+    ReportItems for one cardholder, newest first.
+    """
+    return report_items_for(select_purchase_rows(rows, cardholder_name, start_dt))
+
+
+def sheet_version(spreadsheet_link: str, start_date: str) -> Optional[str]:
+    """
+    Version of the rows parse_purchases would read right now for start_date
+    (MM/DD/YYYY), or None if it would have to export the sheet first. Never
+    touches the network.
+    """
+    start_dt = datetime.strptime(start_date, "%m/%d/%Y").date()
+    source = local_source(spreadsheet_link)
+    if source is not None:
+        # Reading a local export is cheap enough to do up front
+        return fetch_local_rows(source).version
+
+    spreadsheet_id = spreadsheet_id_from_url(spreadsheet_link)
+    snapshot = current_snapshot(spreadsheet_id)
+    if snapshot is not None and covers(snapshot_covers_from(snapshot), start_dt):
+        return snapshot.version
+    rows = SHEET_CACHE.get(spreadsheet_id)
+    return rows.version if rows is not None and rows.covers(start_dt) else None
+
+
+def parse_purchases_versioned(
+    spreadsheet_link: str,
+    cardholder_name: str,
+    start_date: str
+) -> Tuple[List[ReportItem], Optional[str]]:
+    """
+    parse_purchases, plus the version of the rows the items came from (see
+    sheet_version).
+    """
+    start_dt = datetime.strptime(start_date, "%m/%d/%Y").date()
+
+    source = local_source(spreadsheet_link)
+    snapshot = current_snapshot(spreadsheet_id_from_url(spreadsheet_link)) if source is None else None
+    if snapshot is not None and covers(snapshot_covers_from(snapshot), start_dt):
+        positions = select_snapshot_positions(snapshot, [cardholder_name], start_dt)[cardholder_name]
+        return snapshot_report_items(snapshot, positions), snapshot.version
+
+    rows = fetch_purchase_rows(spreadsheet_link, start_dt)
+    return parse_purchase_rows(rows, cardholder_name, start_dt), rows.version
+
+
+def parse_purchases(
+    spreadsheet_link: str,
+    cardholder_name: str,
+    start_date: str
+) -> List[ReportItem]:
+    return parse_purchases_versioned(spreadsheet_link, cardholder_name, start_date)[0]
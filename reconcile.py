@@ -1,83 +1,447 @@
-from typing import List, Tuple
-from datetime import datetime
-from difflib import SequenceMatcher
-from models import ExpectedExpense, ReportItem
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from datetime import date
+import heapq
+import math
+import re
+from bisect import bisect_left, bisect_right
+from sys import intern
+from models import ExpectedExpense, MatchCandidate, RejectedLine, ReportItem, new_expected_expense, price_cents
+from assignment import connected_components, min_cost_assignment
+from vendor import vendor_similarities, vendor_similarity
+from metrics import count, stage
 
 
 # ----------------------------
 # Expected expense parser
 # ----------------------------
 
-def parse_expected_expenses(text: str) -> List[ExpectedExpense]:
+# One line: date, then "vendor - price" or "$price - vendor". Separators are
+# hyphens or en/em dashes with optional spaces; the vendor may itself contain
+# hyphens ("Chick-fil-A"), since the price anchors the other end. A sign in
+# front of the price is captured (not left to the vendor) so that refunds
+# and credits are rejected rather than read as charges.
+_SEP = r"\s*[-\u2013\u2014]\s*"
+_SIGN = r"([-+\u2212]?)\s*"
+_PRICE = r"(\d[\d,]*\.?\d*|\.\d+)"
+EXPECTED_LINE = re.compile(
+    r"\s*(\d{1,2})/(\d{1,2})/(\d{2})" + _SEP
+    + r"(?:" + _SIGN + r"\$\s*" + _PRICE + _SEP + r"(.+?)"
+    + r"|(.+?)" + _SEP + _SIGN + r"\$?\s*" + _PRICE + r")\s*$"
+)
+EXPECTED_DATE = re.compile(r"\s*\d{1,2}/\d{1,2}/\d{2}\b")
+
+# A second price inside the vendor ("Amazon - $5.00 - $6.00", "Amazon - 5.00 - 6.00")
+PRICE_IN_VENDOR = re.compile(r"\$\s*[\d.]|[-\u2013\u2014]\s*\d[\d,]*\.\d{2}\b")
+
+EXPECTED_FORMAT = "expected MM/DD/YY - Vendor - $Price or MM/DD/YY - $Price - Vendor"
+
+
+def parse_cents(text: str) -> int:
     """
-    Parse text block with expected expenses.
+    "1,234.5" -> 123450. Two or fewer decimals are exact; more are rounded
+    like price_cents.
+    """
+    whole, _, fraction = text.replace(",", "").partition(".")
+    if len(fraction) > 2:
+        return price_cents(float(f"{whole or 0}.{fraction}"))
+    return int(whole or 0) * 100 + int(fraction.ljust(2, "0"))
+
+
+def parse_expected_lines(
+    lines: Union[str, Iterable[str]]
+) -> Tuple[List[ExpectedExpense], List[RejectedLine]]:
+    """
+    Parse expected expenses from a text block or any iterable of lines (a
+    file, a generator), in one pass.
 
     Supports two formats per line:
       11/16/25 - Cheesecake - $138.36
       11/16/25 - $214.20 - Burger Chan
 
-    Returns list of ExpectedExpense objects.
+    Returns (expenses, rejected): blank lines are skipped, and every other
+    line that does not parse becomes a RejectedLine with its 1-based line
+    number and the reason.
     """
-    expenses = []
-
-    for line in text.strip().split("\n"):
-        line = line.strip()
-        if not line:
-            continue
-
-        parts = [p.strip() for p in line.split("-")]
-        if len(parts) != 3:
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+
+    expenses: List[ExpectedExpense] = []
+    rejected: List[RejectedLine] = []
+    match_line = EXPECTED_LINE.match
+
+    for number, line in enumerate(lines, 1):
+        m = match_line(line)
+        if m is None:
+            if line.strip():
+                reason = EXPECTED_FORMAT if EXPECTED_DATE.match(line) else "no MM/DD/YY date at the start"
+                rejected.append(RejectedLine(number, line.strip(), reason))
             continue
 
-        date_str, part1, part2 = parts
-
-        # Parse date (MM/DD/YY format)
+        (month, day, year, sign_first, price_first, vendor_after,
+         vendor_before, sign_last, price_last) = m.groups()
         try:
-            expense_date = datetime.strptime(date_str.strip(), "%m/%d/%y").date()
+            # %y rules: 69-99 are 1900s, 00-68 are 2000s
+            year = int(year)
+            expense_date = date(year + (1900 if year >= 69 else 2000), int(month), int(day))
         except ValueError:
+            rejected.append(RejectedLine(number, line.strip(), f"invalid date {month}/{day}/{year:02d}"))
             continue
 
-        # Determine which part is price and which is vendor
-        # Price starts with $ sign
-        if part1.startswith("$"):
-            price_str = part1
-            vendor = part2
+        if price_first is not None:
+            sign, cents, vendor = sign_first, parse_cents(price_first), vendor_after
         else:
-            vendor = part1
-            price_str = part2
-
-        # Parse price
-        try:
-            price = float(price_str.replace("$", "").replace(",", "").strip())
-        except ValueError:
+            sign, cents, vendor = sign_last, parse_cents(price_last), vendor_before
+
+        reason = None
+        if sign:
+            reason = "signed price (refunds and credits are not matched)"
+        elif not vendor.strip():
+            reason = "missing vendor"
+        elif PRICE_IN_VENDOR.search(vendor):
+            reason = "more than one price on the line"
+        if reason is not None:
+            rejected.append(RejectedLine(number, line.strip(), reason))
             continue
 
-        expenses.append(ExpectedExpense(
+        expenses.append(new_expected_expense(
             date=expense_date,
-            vendor=vendor,
-            price=price
+            vendor=intern(vendor),
+            cents=cents
         ))
 
-    return expenses
+    return expenses, rejected
+
+
+def parse_expected_expenses(text: Union[str, Iterable[str]]) -> List[ExpectedExpense]:
+    """
+    Parse text block with expected expenses; see parse_expected_lines.
+    Rejected lines are dropped.
+    """
+    return parse_expected_lines(text)[0]
 
 
 # ----------------------------
-# Vendor similarity
+# Actual item index
 # ----------------------------
 
-def vendor_similarity(vendor1: str, vendor2: str) -> float:
+def tolerance_cents(tolerance: float) -> int:
+    """
+    Price tolerance in dollars as the largest whole-cent difference it allows.
+    """
+    return math.floor(round(tolerance * 100, 6))
+
+
+class ActualIndex:
+    """
+    Lookup structure over actual items for the greedy matcher.
+
+    Phase 1 uses buckets of item indices keyed by price in cents; Phase 2 uses
+    items sorted by price so a tolerance window is a bisect range query. Both
+    return the lowest-index eligible item, which is exactly what the original
+    nested scans over actual_items picked.
+    """
+
+    def __init__(self, actual_items: List[ReportItem]):
+        self.items = actual_items
+        self.matched = set()
+        self.compared = 0    # candidates examined, for metrics
+
+        self.by_cents: Dict[int, List[int]] = {}
+        for idx, item in enumerate(actual_items):
+            self.by_cents.setdefault(item.cents, []).append(idx)
+
+        self.by_price = sorted(range(len(actual_items)), key=lambda idx: actual_items[idx].cents)
+        self.sorted_cents = [actual_items[idx].cents for idx in self.by_price]
+
+    def take(self, idx: int) -> ReportItem:
+        self.matched.add(idx)
+        return self.items[idx]
+
+    def find_exact(self, expected: ExpectedExpense) -> Optional[int]:
+        """
+        Lowest unmatched index with an equal price dated on/after expected.
+        """
+        bucket = self.by_cents.get(expected.cents, ())
+        self.compared += len(bucket)
+        for idx in bucket:
+            if idx not in self.matched and self.items[idx].date >= expected.date:
+                return idx
+        return None
+
+    def window(self, cents: int, tolerance: int) -> List[int]:
+        """
+        Unmatched indices priced within tolerance cents, in index order.
+        """
+        lo = bisect_left(self.sorted_cents, cents - tolerance)
+        hi = bisect_right(self.sorted_cents, cents + tolerance)
+        return sorted(idx for idx in self.by_price[lo:hi] if idx not in self.matched)
+
+    def by_price_distance(self, cents: int) -> Iterator[int]:
+        """
+        Every index, matched or not, nearest price to cents first.
+        """
+        sorted_cents, by_price = self.sorted_cents, self.by_price
+        hi = bisect_left(sorted_cents, cents)
+        lo = hi - 1
+        while lo >= 0 or hi < len(sorted_cents):
+            if hi == len(sorted_cents) or (lo >= 0 and cents - sorted_cents[lo] <= sorted_cents[hi] - cents):
+                yield by_price[lo]
+                lo -= 1
+            else:
+                yield by_price[hi]
+                hi += 1
+
+    def find_fuzzy(
+        self,
+        expected: ExpectedExpense,
+        price_tolerance: float,
+        similarity_threshold: float
+    ) -> Optional[int]:
+        """
+        Lowest unmatched index within the price window, dated on/after
+        expected, whose vendor is similar enough. Similarity is only computed
+        for candidates that pass the price and date checks.
+        """
+        candidates = self.window(expected.cents, tolerance_cents(price_tolerance))
+        self.compared += len(candidates)
+        for idx in candidates:
+            actual = self.items[idx]
+            if actual.date < expected.date:
+                continue
+            if vendor_similarity(expected.vendor, actual.vendor) >= similarity_threshold:
+                return idx
+        return None
+
+
+# ----------------------------
+# Matching strategies
+# ----------------------------
+
+STRATEGIES = ("greedy", "optimal")
+
+# Optimal-mode cost weights: per dollar of price difference, per day between
+# the expected date and the sheet date, and per unit of vendor dissimilarity.
+PRICE_COST_WEIGHT = 1.0
+DATE_COST_WEIGHT = 0.1
+VENDOR_COST_WEIGHT = 1.0
+
+
+def match_cost(
+    expected: ExpectedExpense,
+    actual: ReportItem,
+    similarity: Optional[float] = None
+) -> float:
+    """
+    Cost of pairing expected with actual; lower is a better match.
+    """
+    if similarity is None:
+        similarity = vendor_similarity(expected.vendor, actual.vendor)
+
+    return (
+        PRICE_COST_WEIGHT * abs(expected.cents - actual.cents) / 100
+        + DATE_COST_WEIGHT * (actual.date - expected.date).days
+        + VENDOR_COST_WEIGHT * (1.0 - similarity)
+    )
+
+
+def match_greedy(
+    expected_expenses: List[ExpectedExpense],
+    index: ActualIndex,
+    price_tolerance: float,
+    similarity_threshold: float
+) -> List[Tuple[int, int]]:
+    """
+    First-come matching in list order: every expected expense takes the first
+    eligible actual item, exact prices first (Phase 1), then fuzzy (Phase 2).
+    Returns (expected index, actual index) pairs in match order.
+    """
+    return list(iter_greedy(expected_expenses, index, price_tolerance, similarity_threshold))
+
+
+def iter_greedy(
+    expected_expenses: List[ExpectedExpense],
+    index: ActualIndex,
+    price_tolerance: float,
+    similarity_threshold: float
+) -> Iterator[Tuple[int, int]]:
+    """
+    match_greedy as a generator: each (expected index, actual index) pair is
+    yielded as soon as it is found.
+    """
+    matched_expected_indices = set()
+
+    # Phase 1: Exact price matches
+    with stage("phase1"):
+        for exp_idx, expected in enumerate(expected_expenses):
+            act_idx = index.find_exact(expected)
+            if act_idx is None:
+                continue
+
+            index.take(act_idx)
+            matched_expected_indices.add(exp_idx)
+            yield exp_idx, act_idx
+
+    # Phase 2: Fuzzy matches (price tolerance + vendor similarity)
+    with stage("phase2"):
+        for exp_idx, expected in enumerate(expected_expenses):
+            if exp_idx in matched_expected_indices:
+                continue
+
+            act_idx = index.find_fuzzy(expected, price_tolerance, similarity_threshold)
+            if act_idx is None:
+                continue
+
+            index.take(act_idx)
+            matched_expected_indices.add(exp_idx)
+            yield exp_idx, act_idx
+
+    count("pairs_compared", index.compared)
+
+
+def match_optimal(
+    expected_expenses: List[ExpectedExpense],
+    index: ActualIndex,
+    price_tolerance: float,
+    similarity_threshold: float
+) -> List[Tuple[int, int]]:
     """
-    Calculate similarity between two vendor names using difflib.SequenceMatcher.
-    Returns a value between 0.0 and 1.0.
+    Global matching: the largest set of eligible pairs with the lowest total
+    match_cost, found as a minimum-cost bipartite assignment.
+
+    Eligibility is the same as greedy mode (exact price, or within tolerance
+    with a similar vendor, dated on/after expected). The eligibility graph is
+    split into connected components, which are solved independently, so a
+    large batch costs about as much as its biggest cluster of lookalike
+    prices. Returns (expected index, actual index) pairs in expected order.
     """
-    if not vendor1 or not vendor2:
-        return 0.0
+    edges = []
+    tolerance = tolerance_cents(max(price_tolerance, 0.0))
+    with stage("optimal_edges"):
+        for exp_idx, expected in enumerate(expected_expenses):
+            candidates = [
+                act_idx
+                for act_idx in index.window(expected.cents, tolerance)
+                if index.items[act_idx].date >= expected.date
+            ]
+            index.compared += len(candidates)
+            similarities = vendor_similarities(
+                expected.vendor,
+                [index.items[act_idx].vendor for act_idx in candidates]
+            )
+
+            for act_idx, similarity in zip(candidates, similarities):
+                actual = index.items[act_idx]
+                if expected.cents != actual.cents and similarity < similarity_threshold:
+                    continue
+
+                # Integer hundredths: exact ties let the solver batch augmentations
+                cost = round(match_cost(expected, actual, similarity) * 100)
+                edges.append((exp_idx, act_idx, cost))
+
+    pairs: List[Tuple[int, int]] = []
+    with stage("optimal_solve"):
+        for component in connected_components(edges):
+            pairs.extend(min_cost_assignment(component).items())
+
+    count("pairs_compared", index.compared)
+
+    for _, act_idx in pairs:
+        index.take(act_idx)
+
+    return sorted(pairs)
 
-    # Normalize for comparison (lowercase, strip whitespace)
-    v1 = vendor1.lower().strip()
-    v2 = vendor2.lower().strip()
 
-    return SequenceMatcher(None, v1, v2).ratio()
+# ----------------------------
+# Unmatched diagnostics
+# ----------------------------
+#
+# For each expected expense left unmatched, the k actual items nearest to it
+# by match_cost (with the date gap counted either way), and the rule that
+# kept each from matching. Items are visited nearest price first, so the
+# walk stops once the price difference alone costs more than the worst of
+# the k kept in a bounded heap, and after DIAGNOSTIC_SCAN_LIMIT items at
+# most: O(k) memory per unmatched line however many items share a price.
+
+DIAGNOSTIC_CANDIDATES = 3
+DIAGNOSTIC_SCAN_LIMIT = 256
+
+
+def miss_reason(
+    expected: ExpectedExpense,
+    actual: ReportItem,
+    taken: bool,
+    similarity: float,
+    tolerance: int,
+    similarity_threshold: float
+) -> str:
+    """The first matching rule actual fails for expected."""
+    if taken:
+        return "matched to another expected expense"
+    if actual.date < expected.date:
+        return "dated before the expected date"
+    diff = abs(actual.cents - expected.cents)
+    if diff > tolerance:
+        return f"price differs by more than ${tolerance / 100:.2f}"
+    if diff and similarity < similarity_threshold:
+        return f"vendor similarity below {similarity_threshold:g}"
+    return "eligible, but not chosen"
+
+
+def nearest_candidates(
+    expected: ExpectedExpense,
+    index: ActualIndex,
+    k: int,
+    price_tolerance: float,
+    similarity_threshold: float
+) -> List[MatchCandidate]:
+    """
+    The k actual items nearest to expected, nearest first (lowest index on
+    ties), each with why it did not match.
+    """
+    if k <= 0:
+        return []
+
+    # Max-heap of the k nearest so far: the root is the farthest, and on
+    # equal distance the higher index, so it is the one to drop
+    heap: List[Tuple[float, int, float]] = []
+    similarities: Dict[str, float] = {}     # few distinct vendors among many items
+    scanned = 0
+    for act_idx in index.by_price_distance(expected.cents):
+        actual = index.items[act_idx]
+        distance = PRICE_COST_WEIGHT * abs(actual.cents - expected.cents) / 100
+        if scanned == DIAGNOSTIC_SCAN_LIMIT or (len(heap) == k and distance > -heap[0][0]):
+            break
+        scanned += 1
+
+        similarity = similarities.get(actual.vendor)
+        if similarity is None:
+            similarity = similarities[actual.vendor] = vendor_similarity(expected.vendor, actual.vendor)
+        distance += (
+            DATE_COST_WEIGHT * abs((actual.date - expected.date).days)
+            + VENDOR_COST_WEIGHT * (1.0 - similarity)
+        )
+        entry = (-distance, -act_idx, similarity)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    count("diagnostic_candidates", scanned)
+
+    tolerance = tolerance_cents(max(price_tolerance, 0.0))
+    candidates = []
+    for neg_distance, neg_idx, similarity in sorted(heap, reverse=True):
+        actual = index.items[-neg_idx]
+        candidates.append(MatchCandidate(
+            actual=actual,
+            price_diff_cents=actual.cents - expected.cents,
+            days=(actual.date - expected.date).days,
+            similarity=similarity,
+            distance=-neg_distance,
+            reason=miss_reason(
+                expected, actual, -neg_idx in index.matched, similarity, tolerance, similarity_threshold
+            ),
+        ))
+    return candidates
 
 
 # ----------------------------
@@ -88,7 +452,9 @@ def reconcile_expenses(
     expected_text: str,
     actual_items: List[ReportItem],
     price_tolerance: float = 1.00,
-    similarity_threshold: float = 0.75
+    similarity_threshold: float = 0.75,
+    strategy: str = "greedy",
+    candidates: int = DIAGNOSTIC_CANDIDATES
 ) -> dict:
     """
     Match expected expenses against actual parsed expenses.
@@ -98,78 +464,107 @@ def reconcile_expenses(
     2. Fuzzy match: |price_diff| <= tolerance AND parsed_date >= expected_date
                      AND vendor similarity >= threshold
 
+    strategy="greedy" (default) matches in list order: each expected expense
+    takes the first eligible actual item. strategy="optimal" picks the
+    assignment with the most matches and the lowest total match_cost.
+
+    Each unmatched expected expense also gets its nearest candidates (up to
+    candidates of them; see nearest_candidates) in "diagnostics", in the
+    same order as "unmatched_expected".
+
     Returns:
     {
         "matched": [(ExpectedExpense, ReportItem), ...],
         "unmatched_expected": [ExpectedExpense, ...],
-        "unmatched_actual": [ReportItem, ...]
+        "unmatched_actual": [ReportItem, ...],
+        "rejected_lines": [RejectedLine, ...],
+        "diagnostics": [(ExpectedExpense, [MatchCandidate, ...]), ...],
+        "total_cost": float
     }
     """
-    expected_expenses = parse_expected_expenses(expected_text)
-
-    matched_pairs: List[Tuple[ExpectedExpense, ReportItem]] = []
-    matched_expected_indices = set()
-    matched_actual_indices = set()
-
-    # Phase 1: Exact price matches
-    for exp_idx, expected in enumerate(expected_expenses):
-        if exp_idx in matched_expected_indices:
-            continue
-
-        for act_idx, actual in enumerate(actual_items):
-            if act_idx in matched_actual_indices:
-                continue
-
-            # Check exact price match and date constraint
-            if (expected.price == actual.price and
-                actual.date >= expected.date):
+    results = {
+        "matched": [],
+        "unmatched_expected": [],
+        "unmatched_actual": [],
+        "rejected_lines": [],
+        "diagnostics": [],
+        "total_cost": 0.0
+    }
+    for event in reconcile_events(
+        expected_text, actual_items, price_tolerance, similarity_threshold, strategy, candidates
+    ):
+        kind = event[0]
+        if kind == "matched":
+            results["matched"].append(event[2:])
+        elif kind == "unmatched_expected":
+            results["unmatched_expected"].append(event[1])
+            results["diagnostics"].append(event[1:])
+        elif kind == "rejected_line":
+            results["rejected_lines"].append(event[1])
+        elif kind == "done":
+            results["total_cost"] = event[1]
+        else:
+            results[kind].append(event[1])
+    return results
 
-                matched_pairs.append((expected, actual))
-                matched_expected_indices.add(exp_idx)
-                matched_actual_indices.add(act_idx)
-                break
 
-    # Phase 2: Fuzzy matches (price tolerance + vendor similarity)
-    for exp_idx, expected in enumerate(expected_expenses):
-        if exp_idx in matched_expected_indices:
-            continue
+def reconcile_events(
+    expected_text: str,
+    actual_items: List[ReportItem],
+    price_tolerance: float = 1.00,
+    similarity_threshold: float = 0.75,
+    strategy: str = "greedy",
+    candidates: int = DIAGNOSTIC_CANDIDATES
+) -> Iterator[tuple]:
+    """
+    reconcile_expenses as a stream of events, each yielded as soon as it is
+    known:
 
-        for act_idx, actual in enumerate(actual_items):
-            if act_idx in matched_actual_indices:
-                continue
+      ("rejected_line", RejectedLine)                  expected lines that did not parse
+      ("matched", phase, ExpectedExpense, ReportItem)   phase 1 exact, 2 fuzzy
+      ("unmatched_expected", ExpectedExpense, [MatchCandidate, ...])
+      ("unmatched_actual", ReportItem)
+      ("done", total_cost)
 
-            # Check price tolerance
-            price_diff = abs(expected.price - actual.price)
-            if price_diff > price_tolerance:
-                continue
+    Greedy matches arrive while matching runs; optimal ones once the
+    assignment is solved. Unmatched items follow the matches, in list order.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown matching strategy: {strategy}")
 
-            # Check date constraint
-            if actual.date < expected.date:
-                continue
+    with stage("parse_expected"):
+        expected_expenses, rejected = parse_expected_lines(expected_text)
+    for line in rejected:
+        yield ("rejected_line", line)
 
-            # Check vendor similarity
-            similarity = vendor_similarity(expected.vendor, actual.vendor)
-            if similarity < similarity_threshold:
-                continue
+    index = ActualIndex(actual_items)
+    if strategy == "optimal":
+        pairs = match_optimal(expected_expenses, index, price_tolerance, similarity_threshold)
+    else:
+        pairs = iter_greedy(expected_expenses, index, price_tolerance, similarity_threshold)
 
-            matched_pairs.append((expected, actual))
-            matched_expected_indices.add(exp_idx)
-            matched_actual_indices.add(act_idx)
-            break
+    matched_expected_indices = set()
+    total_cost = 0.0
+    for exp_idx, act_idx in pairs:
+        expected, actual = expected_expenses[exp_idx], actual_items[act_idx]
+        matched_expected_indices.add(exp_idx)
+        total_cost += match_cost(expected, actual)
+        # Greedy Phase 1 only takes equal prices, and Phase 2 never can
+        yield ("matched", 1 if expected.cents == actual.cents else 2, expected, actual)
 
-    # Collect unmatched items
     unmatched_expected = [
-        exp for idx, exp in enumerate(expected_expenses)
-        if idx not in matched_expected_indices
-    ]
-
-    unmatched_actual = [
-        act for idx, act in enumerate(actual_items)
-        if idx not in matched_actual_indices
+        exp for idx, exp in enumerate(expected_expenses) if idx not in matched_expected_indices
     ]
-
-    return {
-        "matched": matched_pairs,
-        "unmatched_expected": unmatched_expected,
-        "unmatched_actual": unmatched_actual
-    }
+    with stage("diagnostics"):
+        nearest = [
+            nearest_candidates(exp, index, candidates, price_tolerance, similarity_threshold)
+            for exp in unmatched_expected
+        ]
+    for exp, exp_candidates in zip(unmatched_expected, nearest):
+        yield ("unmatched_expected", exp, exp_candidates)
+
+    for idx, act in enumerate(actual_items):
+        if idx not in index.matched:
+            yield ("unmatched_actual", act)
+
+    yield ("done", total_cost)
@@ -0,0 +1,234 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+
+
+# ----------------------------
+# Reconcile result cache
+# ----------------------------
+#
+# Finished /reconcile responses, addressed by what they were computed from:
+#
+#   sheet    spreadsheet ID
+#   version  version of the sheet rows that were matched, derived from
+#            their content (see parser.content_version), so every worker
+#            process gives the same rows the same version; changed rows
+#            mean a new version
+#   digest   result_key() of the request parameters
+#
+# On disk (optional): <directory>/<sheet>/<version>/<digest>.json
+#
+# Only the latest version seen for a sheet is kept: seeing a new one drops
+# the others from memory, and storing a result for it drops the others from
+# disk, so a changed sheet invalidates its results without any TTL. Reads
+# never delete, so a worker still holding older rows doesn't remove what a
+# worker with newer ones just stored.
+
+# Bump when the cached response format changes, so old disk entries miss
+RESULT_FORMAT = 2
+
+PATH_PART = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def normalized_expected(text: str) -> str:
+    """
+    Expected-expense text with line endings unified, each line stripped and
+    trailing blank lines dropped. Lines that differ only in these ways parse
+    identically, and interior blank lines are kept so rejected line numbers
+    stay the same.
+    """
+    return "\n".join(line.strip() for line in text.splitlines()).rstrip("\n")
+
+
+def result_key(
+    expected_text: str,
+    cardholder_name: str,
+    start_date: str,
+    price_tolerance: float,
+    similarity_threshold: float,
+    strategy: str
+) -> str:
+    """Content hash of everything besides the sheet that a result depends on."""
+    material = json.dumps([
+        RESULT_FORMAT,
+        normalized_expected(expected_text),
+        cardholder_name,
+        start_date,
+        price_tolerance,
+        similarity_threshold,
+        strategy,
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU of serialized reconcile results in memory, bounded by entry count and
+    total bytes, optionally backed by a directory that survives restarts and
+    is shared by workers. Disk hits are promoted into memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+        directory: Optional[str] = None,
+        max_disk_entries: int = 4096
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._versions: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, sheet: str, version: str, digest: str) -> Optional[bytes]:
+        """The cached result, counting a hit or a miss."""
+        self._observe(sheet, version)
+        key = (sheet, version, digest)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+
+        body = self._read(key)
+        with self._lock:
+            if body is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._remember(key, body)
+        return body
+
+    def put(self, sheet: str, version: str, digest: str, body: bytes) -> None:
+        """Store a result computed from the given sheet version."""
+        with self._lock:
+            current = self._versions.setdefault(sheet, version)
+        if current != version:
+            # The sheet moved on while this result was being computed
+            return
+        key = (sheet, version, digest)
+        self._remember(key, body)
+        self._write(key, body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._versions.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+    def _observe(self, sheet: str, version: str) -> None:
+        """Record the sheet's current version, dropping results of older ones from memory."""
+        with self._lock:
+            previous = self._versions.get(sheet)
+            if previous == version:
+                return
+            self._versions[sheet] = version
+            stale = [key for key in self._entries if key[0] == sheet and key[1] != version]
+            for key in stale:
+                self._bytes -= len(self._entries.pop(key))
+            if previous is not None or stale:
+                self.invalidations += 1
+
+    def _remember(self, key: Tuple[str, str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    # ----------------------------
+    # Disk tier
+    # ----------------------------
+
+    def _sheet_dir(self, sheet: str) -> Optional[str]:
+        if self.directory is None or not PATH_PART.fullmatch(sheet):
+            return None
+        return os.path.join(self.directory, sheet)
+
+    def _path(self, key: Tuple[str, str, str]) -> Optional[str]:
+        sheet, version, digest = key
+        sheet_dir = self._sheet_dir(sheet)
+        if sheet_dir is None or not PATH_PART.fullmatch(version):
+            return None
+        return os.path.join(sheet_dir, version, f"{digest}.json")
+
+    def _read(self, key: Tuple[str, str, str]) -> Optional[bytes]:
+        path = self._path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write(self, key: Tuple[str, str, str], body: bytes) -> None:
+        """Best effort: a failed write only costs a future miss."""
+        path = self._path(key)
+        if path is None:
+            return
+        version_dir = os.path.dirname(path)
+        sheet_dir = os.path.dirname(version_dir)
+        try:
+            for name in os.listdir(sheet_dir):
+                if name != key[1]:
+                    shutil.rmtree(os.path.join(sheet_dir, name), ignore_errors=True)
+        except FileNotFoundError:
+            pass
+        try:
+            os.makedirs(version_dir, exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, path)
+            self._prune(version_dir)
+        except OSError:
+            pass
+
+    def _prune(self, version_dir: str) -> None:
+        """Remove the least recently written files over max_disk_entries."""
+        entries = [entry for entry in os.scandir(version_dir) if entry.name.endswith(".json")]
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
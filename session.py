@@ -0,0 +1,280 @@
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+import threading
+import time
+import uuid
+
+from models import ExpectedExpense, ReportItem
+from parser import (
+    COL_TIMESTAMP,
+    extract_timestamp,
+    fetch_purchase_rows,
+    row_to_report_item,
+    select_purchase_rows,
+)
+from reconcile import ActualIndex, match_greedy, parse_expected_expenses
+
+
+# ----------------------------
+# Session deltas
+# ----------------------------
+
+@dataclass
+class SessionPair:
+    expected_id: int
+    expected: ExpectedExpense
+    actual_id: int
+    actual: ReportItem
+
+
+@dataclass
+class SessionDelta:
+    """
+    What one session update changed; unchanged pairs are not repeated.
+
+    matched: pairs created by this update
+    unmatched: pairs broken by this update (their expected line was removed)
+    unmatched_expected / unmatched_actual: ids of lines/rows that entered the
+        session, or were freed, and are still unmatched after the update
+    removed_expected: ids of expected lines deleted by this update
+    """
+    matched: List[SessionPair] = field(default_factory=list)
+    unmatched: List[SessionPair] = field(default_factory=list)
+    unmatched_expected: List[int] = field(default_factory=list)
+    unmatched_actual: List[int] = field(default_factory=list)
+    removed_expected: List[int] = field(default_factory=list)
+
+
+# ----------------------------
+# Incremental reconciliation
+# ----------------------------
+
+class ReconcileSession:
+    """
+    In-memory reconciliation state for one cardholder and sheet.
+
+    Keeps the parsed expected lines and sheet rows plus the current pairs, and
+    only matches what changed: new expected lines against unmatched rows, new
+    sheet rows (timestamped after the last one seen) against unmatched lines,
+    and rows freed by a removed line against unmatched lines. Matching within
+    a delta uses the same greedy rules as reconcile_expenses; existing pairs
+    are never reshuffled.
+
+    Expected ids count up from 1 in the order lines were added; actual ids
+    count up from 1 in sheet (timestamp) order, so a newer row has a larger
+    id. Rows may come from several year tabs, so ids are not row numbers.
+    """
+
+    def __init__(
+        self,
+        sheet_link: str,
+        cardholder_name: str,
+        start_dt: date,
+        price_tolerance: float = 1.00,
+        similarity_threshold: float = 0.75
+    ):
+        self.id = uuid.uuid4().hex
+        self.sheet_link = sheet_link
+        self.cardholder_name = cardholder_name
+        self.start_dt = start_dt
+        self.price_tolerance = price_tolerance
+        self.similarity_threshold = similarity_threshold
+
+        self.expected: Dict[int, ExpectedExpense] = {}
+        self.actual: Dict[int, ReportItem] = {}
+        self.matches: Dict[int, int] = {}            # expected id -> actual id
+        self.matched_actual: Dict[int, int] = {}     # actual id -> expected id
+        self.last_seen: Optional[datetime] = None
+        self.touched_at = time.monotonic()
+
+        self._next_expected_id = 1
+        self._next_actual_id = 1
+        self._lock = threading.Lock()
+
+    # ---- updates ----
+
+    def add_expected(self, text: str) -> SessionDelta:
+        return self.update_expected(add=text)
+
+    def remove_expected(self, expected_ids: Iterable[int]) -> SessionDelta:
+        return self.update_expected(remove=expected_ids)
+
+    def update_expected(self, add: str = "", remove: Iterable[int] = ()) -> SessionDelta:
+        """
+        Remove expected lines by id, then add new ones from a text block.
+
+        Rows freed by removed lines are offered to the still-unmatched lines
+        first, then the new lines are matched against every unmatched row.
+        """
+        with self._lock:
+            delta = SessionDelta()
+            freed = []
+
+            for exp_id in remove:
+                expected = self.expected.pop(exp_id, None)
+                if expected is None:
+                    continue
+                delta.removed_expected.append(exp_id)
+
+                act_id = self.matches.pop(exp_id, None)
+                if act_id is not None:
+                    del self.matched_actual[act_id]
+                    delta.unmatched.append(SessionPair(exp_id, expected, act_id, self.actual[act_id]))
+                    freed.append(act_id)
+
+            delta.matched += self._match(self._unmatched_expected_ids(), freed)
+
+            new_ids = self._add_expected_lines(add)
+            delta.matched += self._match(new_ids, self._unmatched_actual_ids())
+
+            delta.unmatched_expected = [i for i in new_ids if i not in self.matches]
+            delta.unmatched_actual = [i for i in freed if i not in self.matched_actual]
+            return delta
+
+    def refresh(self, rows: Optional[Sequence[Sequence]] = None) -> SessionDelta:
+        """
+        Pull sheet rows newer than the last seen timestamp and match them.
+        """
+        if rows is None:
+            rows = fetch_purchase_rows(self.sheet_link, self.start_dt)
+
+        with self._lock:
+            new_ids = self._ingest_rows(rows)
+            return SessionDelta(
+                matched=self._match(self._unmatched_expected_ids(), new_ids),
+                unmatched_actual=[i for i in new_ids if i not in self.matched_actual]
+            )
+
+    # ---- internals ----
+
+    def _add_expected_lines(self, text: str) -> List[int]:
+        new_ids = []
+        for expected in parse_expected_expenses(text):
+            exp_id = self._next_expected_id
+            self._next_expected_id += 1
+            self.expected[exp_id] = expected
+            new_ids.append(exp_id)
+        return new_ids
+
+    def _ingest_rows(self, rows: Sequence[Sequence]) -> List[int]:
+        """
+        Add rows timestamped after last_seen; returns their ids, newest first.
+        Assumes the sheet is appended in timestamp order, like parse_purchases.
+        """
+        start = 0
+        if self.last_seen is not None:
+            start = len(rows)
+            while start > 0:
+                value = rows[start - 1][COL_TIMESTAMP]
+                if value and extract_timestamp(value) <= self.last_seen:
+                    break
+                start -= 1
+
+        # Newest timestamp in the sheet, whoever the cardholder is
+        for row in reversed(rows[start:]):
+            if row[COL_TIMESTAMP]:
+                self.last_seen = extract_timestamp(row[COL_TIMESTAMP])
+                break
+
+        new_ids = []
+        for _, row, row_date in reversed(select_purchase_rows(rows[start:], self.cardholder_name, self.start_dt)):
+            act_id = self._next_actual_id
+            self._next_actual_id += 1
+            self.actual[act_id] = row_to_report_item(row, row_date)
+            new_ids.append(act_id)
+        new_ids.reverse()
+        return new_ids
+
+    def _unmatched_expected_ids(self) -> List[int]:
+        return [i for i in self.expected if i not in self.matches]
+
+    def _unmatched_actual_ids(self) -> List[int]:
+        # Newest row first, the order parse_purchases returns
+        return sorted((i for i in self.actual if i not in self.matched_actual), reverse=True)
+
+    def _match(self, expected_ids: List[int], actual_ids: List[int]) -> List[SessionPair]:
+        """
+        Greedily pair the given unmatched lines and rows; returns new pairs.
+        """
+        new_pairs: List[SessionPair] = []
+        if not expected_ids or not actual_ids:
+            return new_pairs
+
+        actual_ids = sorted(actual_ids, reverse=True)
+        pairs = match_greedy(
+            [self.expected[i] for i in expected_ids],
+            ActualIndex([self.actual[i] for i in actual_ids]),
+            self.price_tolerance,
+            self.similarity_threshold
+        )
+
+        for exp_idx, act_idx in pairs:
+            exp_id, act_id = expected_ids[exp_idx], actual_ids[act_idx]
+            self.matches[exp_id] = act_id
+            self.matched_actual[act_id] = exp_id
+            new_pairs.append(SessionPair(exp_id, self.expected[exp_id], act_id, self.actual[act_id]))
+
+        return new_pairs
+
+    def snapshot(self) -> SessionDelta:
+        """
+        Full current state, expressed as a delta from an empty session.
+        """
+        with self._lock:
+            return SessionDelta(
+                matched=[
+                    SessionPair(exp_id, self.expected[exp_id], act_id, self.actual[act_id])
+                    for exp_id, act_id in self.matches.items()
+                ],
+                unmatched_expected=self._unmatched_expected_ids(),
+                unmatched_actual=self._unmatched_actual_ids()
+            )
+
+
+# ----------------------------
+# Session store
+# ----------------------------
+
+class SessionStore:
+    """
+    Bounded in-memory registry of sessions; idle sessions expire and the
+    least recently used one is dropped when full.
+    """
+
+    def __init__(self, max_sessions: int = 64, idle_seconds: float = 3600.0):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[str, ReconcileSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session: ReconcileSession) -> None:
+        with self._lock:
+            self._expire()
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, session_id: str) -> ReconcileSession:
+        """
+        Raises KeyError for unknown or expired sessions.
+        """
+        with self._lock:
+            self._expire()
+            session = self._sessions[session_id]
+            session.touched_at = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.idle_seconds
+        for session_id in [k for k, s in self._sessions.items() if s.touched_at < cutoff]:
+            del self._sessions[session_id]
+
+
+SESSIONS = SessionStore()
@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import threading
+import time
+
+
+# ----------------------------
+# Exported sheet cache
+# ----------------------------
+
+@dataclass
+class CacheEntry:
+    value: Any
+    size: int
+    stored_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class SheetCache:
+    """
+    LRU cache of parsed sheet exports keyed by spreadsheet ID.
+
+    Entries younger than ttl_seconds are served without touching the network.
+    Stale entries are kept around so their ETag/Last-Modified validators can be
+    sent with the next export request; a 304 answer refreshes them in place.
+    The cache is bounded both by entry count and by total size (rows).
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 60.0,
+        max_entries: int = 16,
+        max_size: int = 500_000,
+        clock=time.monotonic
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value if it is still fresh, counting a hit.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry.stored_at > self.ttl_seconds:
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """
+        The cached value, fresh or stale, without counting or reordering.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def validators(self, key: str) -> Dict[str, str]:
+        """
+        Conditional request headers for a (possibly stale) cached entry.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            headers = {}
+            if entry is not None:
+                if entry.etag:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified:
+                    headers["If-Modified-Since"] = entry.last_modified
+            return headers
+
+    def revalidated(self, key: str) -> Optional[Any]:
+        """
+        Mark a stale entry fresh again after a 304 Not Modified response.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            entry.stored_at = self._clock()
+            self._entries.move_to_end(key)
+            self.revalidations += 1
+            return entry.value
+
+    def put(
+        self,
+        key: str,
+        value: Any,
+        size: int,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> None:
+        """
+        Store a freshly downloaded value, counting a miss and evicting
+        least-recently-used entries until both caps are respected.
+        """
+        with self._lock:
+            self.misses += 1
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+
+            if size > self.max_size:
+                return
+
+            self._entries[key] = CacheEntry(
+                value=value,
+                size=size,
+                stored_at=self._clock(),
+                etag=etag,
+                last_modified=last_modified
+            )
+            self._size += size
+
+            while len(self._entries) > self.max_entries or self._size > self.max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,405 @@
+from datetime import date, datetime, time as dtime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import os
+import re
+import shutil
+import stat
+import threading
+import time
+import uuid
+
+import numpy as np
+
+
+# ----------------------------
+# Columnar snapshot format
+# ----------------------------
+#
+# <directory>/<key>/CURRENT          name of the live version directory
+# <directory>/<key>/<version>/
+#     codes.npy    int32 (columns, rows): per-column dictionary codes
+#     days.npy     int32 (rows,): date ordinal of each row, or BLANK/MALFORMED
+#     values.json  per-column dictionaries (typed JSON, see encode_value)
+#     meta.json    rows, etag, last_modified, written_at, checked_at,
+#                  covers_from (earliest start date served, as an ordinal)
+#
+# Versions are written to a temp directory and renamed into place, then
+# CURRENT is swapped atomically, so readers never see a partial snapshot.
+#
+# Snapshots hold sheet contents, so the directory must be private: it is
+# created 0700, and a directory that another user owns (or a symlink, in a
+# shared temp dir) is refused.
+
+BLANK = -1
+MALFORMED = -2
+
+KEY_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def encode_value(value: Any) -> Any:
+    """JSON form of a cell value; dates and times become tagged objects."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, datetime):
+        return {"t": "datetime", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {"t": "date", "v": value.isoformat()}
+    if isinstance(value, dtime):
+        return {"t": "time", "v": value.isoformat()}
+    return str(value)
+
+
+def decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        kind, text = value["t"], value["v"]
+        if kind == "datetime":
+            return datetime.fromisoformat(text)
+        if kind == "date":
+            return date.fromisoformat(text)
+        return dtime.fromisoformat(text)
+    return value
+
+
+class Snapshot:
+    """
+    One memory-mapped snapshot version. Codes and days stay on disk until
+    touched; column dictionaries are decoded once on open.
+    """
+
+    def __init__(self, path: str, meta: dict):
+        self.path = path
+        self.version = os.path.basename(path)
+        self.size = meta["rows"]
+        self.etag: Optional[str] = meta.get("etag")
+        self.last_modified: Optional[str] = meta.get("last_modified")
+        self.written_at: float = meta["written_at"]
+        self.checked_at: float = meta.get("checked_at", self.written_at)
+        self.covers_from: Optional[int] = meta.get("covers_from")
+
+        self.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode="r")
+        self.days = np.load(os.path.join(path, "days.npy"), mmap_mode="r")
+        with open(os.path.join(path, "values.json"), encoding="utf-8") as f:
+            self.values: List[List[Any]] = [
+                [decode_value(value) for value in column]
+                for column in json.load(f)
+            ]
+        self._lookup: Dict[int, Dict[Tuple[type, Any], int]] = {}
+        self._converted: Dict[Tuple[int, Callable], np.ndarray] = {}
+        self._rows = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "Snapshot":
+        """Open the snapshot version stored at path."""
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return cls(path, json.load(f))
+
+    def row(self, position: int) -> tuple:
+        return tuple(
+            values[code]
+            for values, code in zip(self.values, self.codes[:, position].tolist())
+        )
+
+    def take(self, positions: Sequence[int]) -> List[tuple]:
+        """
+        The rows at positions, decoded with one gather per column.
+        """
+        if not len(positions):
+            return []
+        codes = np.asarray(self.codes)[:, positions].tolist()
+        columns = [
+            [values[code] for code in column_codes]
+            for values, column_codes in zip(self.values, codes)
+        ]
+        return list(zip(*columns))
+
+    def rows(self, factory: Callable[[Iterable[tuple]], Sequence] = list) -> Sequence:
+        """
+        Every row decoded, built once per snapshot with factory.
+        """
+        with self._lock:
+            if self._rows is None:
+                columns = [
+                    [values[code] for code in codes]
+                    for values, codes in zip(self.values, self.codes.tolist())
+                ]
+                self._rows = factory(zip(*columns))
+            return self._rows
+
+    def code(self, column: int, value: Any) -> Optional[int]:
+        """Dictionary code of value in column, or None if it never occurs."""
+        if column >= len(self.values):
+            return None
+        with self._lock:
+            lookup = self._lookup.get(column)
+            if lookup is None:
+                lookup = self._lookup[column] = {
+                    (type(v), v): code for code, v in enumerate(self.values[column])
+                }
+        return lookup.get((type(value), value))
+
+    def converted(self, column: int, convert: Callable[[Any], Any], dtype=object) -> np.ndarray:
+        """
+        convert applied once to each distinct value of column, as an array
+        indexed by code (gather it with the column's codes). Cached per
+        snapshot and convert.
+        """
+        with self._lock:
+            converted = self._converted.get((column, convert))
+            if converted is None:
+                converted = self._converted[(column, convert)] = np.array(
+                    [convert(value) for value in self.values[column]], dtype=dtype
+                )
+        return converted
+
+    def window(self, start_day: int) -> Tuple[np.ndarray, int]:
+        """
+        Mask of rows dated on/after start_day, and the position of the last
+        dated row before it (-1 if none).
+        """
+        days = np.asarray(self.days)
+        older = np.flatnonzero((days >= 0) & (days < start_day))
+        return days >= start_day, int(older[-1]) if older.size else -1
+
+    def malformed_positions(self) -> np.ndarray:
+        return np.flatnonzero(np.asarray(self.days) == MALFORMED)
+
+    def matching(self, mask: np.ndarray, column: int, value: Any) -> np.ndarray:
+        """Positions (sheet order) where mask holds and column equals value."""
+        code = self.code(column, value)
+        if code is None:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(mask & (np.asarray(self.codes[column]) == code))
+
+
+# ----------------------------
+# Store
+# ----------------------------
+
+def private_directory(path: str) -> str:
+    """
+    Create path (mode 0700) if needed and make sure only this user can read
+    it. Raises PermissionError if it is a symlink or belongs to someone else.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"Snapshot directory is not a directory: {path}")
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"Snapshot directory belongs to another user: {path}")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+class SnapshotStore:
+    """
+    Directory of per-key snapshots (one key per spreadsheet). Open snapshots
+    are kept per process and reused until CURRENT points elsewhere.
+
+    Nothing is touched on construction: the directory is created on the
+    first write, and checked (see private_directory) before it is first
+    read or written.
+    """
+
+    def __init__(self, directory: str, clock=time.time):
+        self.directory = directory
+        self._private = False
+        self._clock = clock
+        self._open: Dict[str, Snapshot] = {}
+        self._discarded = set()     # keys whose CURRENT couldn't be removed
+        self._lock = threading.Lock()
+
+    def _ready(self, create: bool) -> bool:
+        """
+        Whether the directory exists and is private, creating it if create.
+        Raises PermissionError if it can't be used (see private_directory).
+        """
+        if not self._private:
+            if not create and not os.path.lexists(self.directory):
+                return False
+            private_directory(self.directory)
+            self._private = True
+        return True
+
+    def _key_dir(self, key: str) -> str:
+        if not KEY_PATTERN.fullmatch(key):
+            raise ValueError(f"Invalid snapshot key: {key}")
+        return os.path.join(self.directory, key)
+
+    def open(self, key: str) -> Optional[Snapshot]:
+        """
+        Current snapshot for key, or None if there is none (or it is unreadable).
+        """
+        key_dir = self._key_dir(key)
+        if key in self._discarded or not self._ready(create=False):
+            return None
+        try:
+            with open(os.path.join(key_dir, "CURRENT"), encoding="utf-8") as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            snapshot = self._open.get(key)
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+
+        try:
+            snapshot = Snapshot.load(os.path.join(key_dir, version))
+        except (OSError, ValueError, KeyError):
+            return None
+
+        with self._lock:
+            self._open[key] = snapshot
+        return snapshot
+
+    def write(
+        self,
+        key: str,
+        rows: Sequence[Sequence],
+        days: Sequence[int],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        covers_from: Optional[int] = None,
+        version: Optional[str] = None,
+        dropped_columns: Iterable[int] = ()
+    ) -> Snapshot:
+        """
+        Dictionary-encode rows column by column and publish them as the new
+        current snapshot. days holds each row's date ordinal, BLANK or MALFORMED;
+        covers_from is passed through to the snapshot's meta.
+
+        version names the snapshot (a fresh name by default). Rows whose
+        version is already stored, by this process or another, are not
+        written again; that version just becomes current.
+
+        dropped_columns are not stored: they read back as None.
+        """
+        key_dir = self._key_dir(key)
+        self._ready(create=True)
+        os.makedirs(key_dir, exist_ok=True)
+        if version is not None and not KEY_PATTERN.fullmatch(version):
+            raise ValueError(f"Invalid snapshot version: {version}")
+        if version is not None and os.path.isdir(os.path.join(key_dir, version)):
+            return self._republish(key, key_dir, version)
+
+        n_columns = max((len(row) for row in rows), default=0)
+        codes = np.empty((n_columns, len(rows)), dtype=np.int32)
+        dictionaries = []
+        dropped = set(dropped_columns)
+        for column in range(n_columns):
+            if column in dropped:
+                codes[column] = 0
+                dictionaries.append([None])
+                continue
+            lookup: Dict[Tuple[type, Any], int] = {}
+            values: List[Any] = []
+            column_codes = []
+            for row in rows:
+                value = row[column]
+                code = lookup.get((type(value), value))
+                if code is None:
+                    code = lookup[(type(value), value)] = len(values)
+                    values.append(value)
+                column_codes.append(code)
+            codes[column] = column_codes
+            dictionaries.append([encode_value(value) for value in values])
+
+        now = self._clock()
+        if version is None:
+            version = f"{time.time_ns():x}-{uuid.uuid4().hex[:8]}"
+        staging = os.path.join(key_dir, f".{version}.{uuid.uuid4().hex[:8]}.tmp")
+        os.makedirs(staging)
+        try:
+            np.save(os.path.join(staging, "codes.npy"), codes)
+            np.save(os.path.join(staging, "days.npy"), np.asarray(days, dtype=np.int32))
+            with open(os.path.join(staging, "values.json"), "w", encoding="utf-8") as f:
+                json.dump(dictionaries, f)
+            self._write_meta(staging, {
+                "rows": len(rows),
+                "etag": etag,
+                "last_modified": last_modified,
+                "written_at": now,
+                "checked_at": now,
+                "covers_from": covers_from,
+            })
+            os.rename(staging, os.path.join(key_dir, version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            if os.path.isdir(os.path.join(key_dir, version)):
+                # Another process stored the same version first
+                return self._republish(key, key_dir, version)
+            raise
+
+        return self._publish(key, key_dir, version)
+
+    def _publish(self, key: str, key_dir: str, version: str) -> Snapshot:
+        """Make a stored version current and drop the others."""
+        self._replace(os.path.join(key_dir, "CURRENT"), version)
+        self._discarded.discard(key)
+        self._remove_old_versions(key_dir, version)
+        return self.open(key)
+
+    def discard(self, key: str) -> None:
+        """
+        Stop serving key's current snapshot, e.g. once a newer export failed
+        to be written, until a new version is published. Raises OSError if
+        CURRENT can't be removed; this process stops serving it either way.
+        """
+        key_dir = self._key_dir(key)
+        with self._lock:
+            self._open.pop(key, None)
+            self._discarded.add(key)
+        try:
+            if self._ready(create=False):
+                os.unlink(os.path.join(key_dir, "CURRENT"))
+        except FileNotFoundError:
+            pass
+        self._discarded.discard(key)
+
+    def _republish(self, key: str, key_dir: str, version: str) -> Snapshot:
+        """_publish for a version stored earlier, which was just confirmed."""
+        self._publish(key, key_dir, version)
+        self.touch(key)
+        return self.open(key)
+
+    def touch(self, key: str) -> None:
+        """
+        Record that the current snapshot was just confirmed unchanged (304).
+        """
+        snapshot = self.open(key)
+        if snapshot is None:
+            return
+
+        snapshot.checked_at = self._clock()
+        self._write_meta(snapshot.path, {
+            "rows": snapshot.size,
+            "etag": snapshot.etag,
+            "last_modified": snapshot.last_modified,
+            "written_at": snapshot.written_at,
+            "checked_at": snapshot.checked_at,
+            "covers_from": snapshot.covers_from,
+        })
+
+    def age(self, snapshot: Snapshot) -> float:
+        """Seconds since the snapshot was last written or confirmed."""
+        return self._clock() - snapshot.checked_at
+
+    def _write_meta(self, path: str, meta: dict) -> None:
+        self._replace(os.path.join(path, "meta.json"), json.dumps(meta))
+
+    @staticmethod
+    def _replace(path: str, text: str) -> None:
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _remove_old_versions(key_dir: str, keep: str) -> None:
+        # Open memory maps of removed versions stay valid until released
+        for name in os.listdir(key_dir):
+            if name not in (keep, "CURRENT") and not name.endswith(".tmp"):
+                shutil.rmtree(os.path.join(key_dir, name), ignore_errors=True)
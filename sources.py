@@ -0,0 +1,225 @@
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+from urllib.parse import unquote, urlparse
+import csv
+import hashlib
+import io
+import mmap
+import os
+
+
+# ----------------------------
+# Local sources
+# ----------------------------
+#
+# A sheet link is either a Google Sheets URL or, for deployments that can't
+# reach Google, a local export: an .xlsx workbook or a .csv file, named by a
+# file:// URL or a path ending in one of those extensions. Anything else,
+# and any link with a /d/<spreadsheet id> in it, is a Google Sheets link.
+# Local exports must sit under LOCAL_SOURCE_DIR (EXPENSE_LOCAL_SOURCE_DIR;
+# unset means local exports are refused, since the link comes from the
+# client). Relative paths are taken from that directory.
+
+LOCAL_SOURCE_DIR = os.environ.get("EXPENSE_LOCAL_SOURCE_DIR") or None
+
+LOCAL_KINDS = {".xlsx": "xlsx", ".xlsm": "xlsx", ".csv": "csv"}
+
+
+class SheetLinkError(Exception):
+    """A sheet link that names neither a Google sheet nor a usable local export."""
+
+
+class LocalSourceError(SheetLinkError):
+    """A local export link that can't be read: disabled, outside
+    LOCAL_SOURCE_DIR, of an unsupported type, or missing."""
+
+
+@dataclass(frozen=True)
+class LocalSource:
+    path: str       # resolved, inside LOCAL_SOURCE_DIR
+    kind: str       # "xlsx" or "csv"
+
+    @property
+    def key(self) -> str:
+        """Cache and snapshot key, in the same alphabet as spreadsheet IDs."""
+        return "local-" + hashlib.sha256(self.path.encode("utf-8")).hexdigest()[:24]
+
+
+def is_local_link(link: str) -> bool:
+    if link.startswith("file://"):
+        return True
+    if link.startswith(("http://", "https://")) or "/d/" in link:
+        return False
+    return os.path.splitext(link)[1].lower() in LOCAL_KINDS
+
+
+def local_source(link: str, root: Optional[str] = None) -> Optional[LocalSource]:
+    """
+    The local export named by link, or None for a Google Sheets link.
+    Raises LocalSourceError for a local export outside root
+    (LOCAL_SOURCE_DIR by default) or of an unsupported type.
+    """
+    if not is_local_link(link):
+        return None
+
+    root = root if root is not None else LOCAL_SOURCE_DIR
+    if root is None:
+        raise LocalSourceError("Local exports are disabled; set EXPENSE_LOCAL_SOURCE_DIR to enable them")
+
+    path = unquote(urlparse(link).path) if link.startswith("file://") else link
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, path]) != root:
+        raise LocalSourceError(f"Local exports must be under {root}")
+
+    kind = LOCAL_KINDS.get(os.path.splitext(path)[1].lower())
+    if kind is None:
+        raise LocalSourceError(f"Unsupported local export (expected {', '.join(LOCAL_KINDS)}): {link}")
+    return LocalSource(path, kind)
+
+
+# ----------------------------
+# Memory-mapped CSV reading
+# ----------------------------
+
+CSV_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+class CsvReader:
+    """
+    Streams the records of a CSV file through a memory map, a chunk at a
+    time, starting at a byte offset. Only complete records are returned:
+    after records() is exhausted, offset is where the next unread record
+    starts, so a file that is being appended to can be read again from
+    there later.
+
+    Each chunk is cut back to the last newline outside quotes and parsed
+    by one csv.reader, so quoted fields may span lines.
+
+    A file that doesn't end in a newline (Google Sheets' CSV downloads
+    don't) still has its last record read, provided the file didn't grow
+    while it was read. offset then sits after that record, and unterminated
+    is set until a line ending follows it (see continues).
+    """
+
+    def __init__(self, path: str, offset: int = 0, chunk_bytes: int = CSV_CHUNK_BYTES):
+        self.path = path
+        self.offset = offset
+        self.chunk_bytes = chunk_bytes
+        self.unterminated = False
+
+    def header(self) -> List[str]:
+        """The first record; moves offset past it."""
+        for record in self.records(limit=1):
+            return record
+        return []
+
+    def tail(self, n: int = 64) -> bytes:
+        """
+        The n bytes before offset as the file is now. Unchanged since the
+        last read means the file was appended to rather than rewritten.
+        """
+        start = max(0, self.offset - n)
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(self.offset - start)
+
+    def continues(self) -> bool:
+        """
+        Whether the file as it is now goes on from offset with a new record:
+        false only when the last record read had no line ending and has
+        since been extended, rather than followed by a newline.
+        """
+        if not self.unterminated:
+            return True
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            return f.read(1) in (b"", b"\n", b"\r")
+
+    def records(self, limit: Optional[int] = None) -> Iterable[List[str]]:
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= self.offset:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if self.offset == 0 and mm[:3] == b"\xef\xbb\xbf":
+                    self.offset = 3
+                if self.unterminated:
+                    # The line ending of the record read last time
+                    if mm[self.offset:self.offset + 2] == b"\r\n":
+                        self.offset += 2
+                    elif mm[self.offset:self.offset + 1] in (b"\n", b"\r"):
+                        self.offset += 1
+                    self.unterminated = False
+                at_end = yield from self._records(mm, size, limit)
+                if at_end and os.fstat(f.fileno()).st_size == size:
+                    yield from self._last_record(mm, size)
+
+    def _last_record(self, mm: mmap.mmap, size: int) -> Iterable[List[str]]:
+        """The record between offset and the end of a file that doesn't end in a newline."""
+        chunk = mm[self.offset:size]
+        if chunk.count(b'"') % 2:
+            return      # inside a quoted field: the record isn't finished
+        self.offset = size
+        self.unterminated = True
+        yield from csv.reader(io.StringIO(chunk.decode("utf-8"), newline=""))
+
+    def _records(self, mm: mmap.mmap, size: int, limit: Optional[int]) -> Iterable[List[str]]:
+        """
+        Complete records from offset on. Returns True if what is left
+        after them is one last line without a newline.
+        """
+        produced = 0
+        while self.offset < size:
+            end = mm.rfind(b"\n", self.offset, min(size, self.offset + self.chunk_bytes))
+            if end < 0:
+                # A line longer than a chunk, or the last line, with no newline
+                end = mm.find(b"\n", self.offset)
+                if end < 0:
+                    return True
+            chunk = mm[self.offset:end + 1]
+            cut = record_boundary(chunk)
+            if cut == 0:
+                if self.offset + self.chunk_bytes < size:
+                    # One quoted record fills the chunk: retry with a bigger one
+                    self.chunk_bytes = 2 * max(self.chunk_bytes, len(chunk))
+                    continue
+                if end + 1 < size:
+                    # The last record, with quoted newlines: finished only
+                    # if its quotes balance (see _last_record)
+                    return True
+                # Unbalanced quotes up to a final newline: a stray quote
+                # (which csv reads as a literal), not an unfinished record
+                cut = len(chunk)
+
+            if limit is None:
+                self.offset += cut
+                yield from csv.reader(io.StringIO(chunk[:cut].decode("utf-8"), newline=""))
+                continue
+
+            lines = chunk[:cut].split(b"\n")[:-1]
+            reader = csv.reader(line.decode("utf-8") + "\n" for line in lines)
+            for record in reader:
+                produced += 1
+                if produced >= limit:
+                    # Before the yield: the caller may stop iterating right there
+                    self.offset += sum(len(line) + 1 for line in lines[:reader.line_num])
+                    yield record
+                    return
+                yield record
+            self.offset += cut
+
+
+def record_boundary(chunk: bytes) -> int:
+    """
+    Length of the longest prefix of chunk (which ends in a newline) that
+    ends in a newline outside quotes, i.e. holds only complete records:
+    balanced quotes, counting the escaped "" as two.
+    """
+    quotes = chunk.count(b'"')
+    cut = len(chunk)
+    while quotes % 2 and cut > 0:
+        start = chunk.rfind(b"\n", 0, cut - 1) + 1
+        quotes -= chunk.count(b'"', start, cut)
+        cut = start
+    return cut
@@ -0,0 +1,89 @@
+import http.server
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Root modules (parser, reconcile, ...) and the backend package import the
+# way the app and benchmarks do; the benchmarks' synthetic data helpers too
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+SHEET_LINK = "https://docs.google.com/spreadsheets/d/test-sheet/edit"
+
+
+class SheetServer:
+    """
+    Stands in for Google's export endpoint: every spreadsheet ID gets the
+    same workbook, with an ETag. Answers 304 to a matching If-None-Match and
+    the next `failures` requests with `failure_status`.
+    """
+
+    def __init__(self, workbook: bytes):
+        self.workbook = workbook
+        self.etag = '"v1"'
+        self.failures = 0
+        self.failure_status = 503
+        self.requests = []      # (path, If-None-Match) per request
+        self.connections = set()    # client addresses
+
+    def handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get("If-None-Match")))
+                server.connections.add(self.client_address)
+                if server.failures > 0:
+                    server.failures -= 1
+                    self.reply(server.failure_status)
+                elif self.headers.get("If-None-Match") == server.etag:
+                    self.reply(304)
+                else:
+                    self.reply(200, server.workbook)
+
+            def reply(self, status: int, body: bytes = b""):
+                self.send_response(status)
+                if status == 200:
+                    self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def sheet_server(tmp_path, monkeypatch):
+    """
+    A SheetServer with a 300-row synthetic workbook, and parser pointed at
+    it with an empty SHEET_CACHE, no snapshots and no retry backoff.
+    """
+    import parser
+    from sheet_cache import SheetCache
+    from synthetic import write_workbook
+
+    path = tmp_path / "export.xlsx"
+    write_workbook(path, 300)
+    sheet = SheetServer(path.read_bytes())
+
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), sheet.handler())
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(parser, "GOOGLE_SHEETS_BASE_URL", f"http://127.0.0.1:{httpd.server_port}/d/")
+    monkeypatch.setattr(parser, "SHEET_CACHE", SheetCache(ttl_seconds=60.0))
+    monkeypatch.setattr(parser, "SNAPSHOTS", None)
+    monkeypatch.setattr(parser, "EXPORT_SESSION", parser.build_export_session(backoff=0))
+    try:
+        yield sheet
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,113 @@
+import itertools
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from assignment import connected_components, min_cost_assignment
+from models import ReportItem
+from reconcile import match_cost, parse_expected_lines, reconcile_expenses
+from vendor import vendor_similarity
+
+
+def brute_force(edges):
+    """(size, cost) of the largest, then cheapest, matching over edges."""
+    best = (0, 0)
+    for size in range(1, len(edges) + 1):
+        found = False
+        for chosen in itertools.combinations(edges, size):
+            lefts = {left for left, _, _ in chosen}
+            rights = {right for _, right, _ in chosen}
+            if len(lefts) == size and len(rights) == size:
+                cost = sum(c for _, _, c in chosen)
+                if not found or cost < best[1]:
+                    best = (size, cost)
+                found = True
+        if not found:
+            break
+    return best
+
+
+def random_edges(rng, lefts, rights, density):
+    return [
+        (left, right, rng.randint(0, 20))
+        for left in range(lefts)
+        for right in range(rights)
+        if rng.random() < density
+    ]
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_min_cost_assignment_matches_brute_force(seed):
+    rng = random.Random(seed)
+    edges = random_edges(rng, rng.randint(1, 5), rng.randint(1, 5), rng.choice([0.3, 0.6, 0.9]))
+
+    assignment = min_cost_assignment(edges)
+
+    costs = {(left, right): c for left, right, c in edges}
+    assert all(pair in costs for pair in assignment.items())
+    assert len(set(assignment.values())) == len(assignment)
+    assert (len(assignment), sum(costs[pair] for pair in assignment.items())) == brute_force(edges)
+
+
+def test_connected_components():
+    edges = [(0, "a", 1), (1, "a", 1), (1, "b", 1), (2, "c", 1), (3, "d", 1), (3, "c", 1)]
+    components = sorted(sorted(component) for component in connected_components(edges))
+    assert components == [
+        [(0, "a", 1), (1, "a", 1), (1, "b", 1)],
+        [(2, "c", 1), (3, "c", 1), (3, "d", 1)],
+    ]
+
+
+def item(vendor, day, cents):
+    return ReportItem(
+        name="n", event="e", items="i", budget="b", endowment="", activity="",
+        date=date(2024, 1, 1) + timedelta(days=day), cents=cents, vendor=vendor,
+        receipts=(), flyer=""
+    )
+
+
+def line(vendor, day, cents):
+    d = date(2024, 1, 1) + timedelta(days=day)
+    return f"{d:%m/%d/%y} - {vendor} - ${cents / 100:.2f}"
+
+
+def test_optimal_matches_what_greedy_strands():
+    # Greedy gives the first expense the only item the second could take
+    expected = "\n".join([line("HEB", 0, 1000), line("HEB", 5, 1000)])
+    actual = [item("HEB", 6, 1000), item("HEB", 1, 1000)]
+
+    greedy = reconcile_expenses(expected, actual)
+    optimal = reconcile_expenses(expected, actual, strategy="optimal")
+    assert len(greedy["matched"]) == 1
+    assert len(optimal["matched"]) == 2
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_optimal_reconcile_matches_brute_force(seed):
+    rng = random.Random(seed)
+    vendors = ["HEB", "H-E-B", "Target", "Walmart", "Walgreens"]
+    prices = [1000, 1050, 1099, 2000]
+    text = "\n".join(
+        line(rng.choice(vendors), rng.randint(0, 5), rng.choice(prices)) for _ in range(rng.randint(1, 5))
+    )
+    actual = [item(rng.choice(vendors), rng.randint(0, 8), rng.choice(prices)) for _ in range(rng.randint(1, 5))]
+    expected, _ = parse_expected_lines(text)
+
+    def eligible(exp, act):
+        if act.date < exp.date:
+            return False
+        if exp.cents == act.cents:
+            return True
+        return abs(exp.cents - act.cents) <= 100 and vendor_similarity(exp.vendor, act.vendor) >= 0.75
+
+    edges = [
+        (i, j, round(match_cost(exp, act) * 100))
+        for i, exp in enumerate(expected)
+        for j, act in enumerate(actual)
+        if eligible(exp, act)
+    ]
+    result = reconcile_expenses(text, actual, strategy="optimal")
+    found = sum(round(match_cost(exp, act) * 100) for exp, act in result["matched"])
+    assert (len(result["matched"]), found) == brute_force(edges)
+    assert len(result["matched"]) >= len(reconcile_expenses(text, actual)["matched"])
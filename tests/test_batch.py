@@ -0,0 +1,73 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+
+import parser
+from backend import api
+from backend.models import BatchReconcileRequest
+from conftest import SHEET_LINK
+from synthetic import CARDHOLDERS, synthetic_expected_text
+
+START = date(2023, 8, 1)
+
+
+@pytest.fixture
+def rows(sheet_server):
+    return parser.fetch_purchase_rows(SHEET_LINK)
+
+
+@pytest.mark.parametrize("start", [date(2023, 8, 1), date(2023, 12, 15), date(2030, 1, 1)])
+def test_partition_matches_per_cardholder_parsing(rows, start):
+    names = CARDHOLDERS + ["Nobody (Nothing)"]
+    partitioned = parser.parse_purchase_rows_by_cardholder(rows, names, start)
+    assert set(partitioned) == set(names)
+    for name in names:
+        assert partitioned[name] == parser.parse_purchase_rows(rows, name, start)
+
+
+def run_batch(request: BatchReconcileRequest):
+    """NDJSON lines of /reconcile/batch, with the response sent as the server would"""
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    async def collect():
+        response = await api.reconcile_batch(request)
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+
+    asyncio.run(collect())
+    body = b"".join(message.get("body", b"") for message in sent)
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+
+@pytest.mark.parametrize("strategy", ["greedy", "optimal"])
+def test_batch_lines_match_single_reconciles(sheet_server, rows, strategy):
+    entries = []
+    for n, name in enumerate(CARDHOLDERS[:3]):
+        items = parser.parse_purchase_rows(rows, name, START)
+        entries.append({"cardholder_name": name, "expected_expenses": synthetic_expected_text(items, 15, seed=n)})
+    entries.append({"cardholder_name": "Nobody (Nothing)", "expected_expenses": "1/2/24 - HEB - $5.00"})
+
+    lines = run_batch(BatchReconcileRequest(
+        start_date=START.isoformat(), sheet_link=SHEET_LINK, cardholders=entries, strategy=strategy
+    ))
+
+    assert sorted(line["cardholder_name"] for line in lines) == sorted(e["cardholder_name"] for e in entries)
+    by_name = {line["cardholder_name"]: line["result"] for line in lines}
+    for entry in entries:
+        single = api.reconcile_body(
+            entry["expected_expenses"],
+            parser.parse_purchase_rows(rows, entry["cardholder_name"], START),
+            strategy
+        )
+        assert by_name[entry["cardholder_name"]] == json.loads(single)
+    assert by_name["Nobody (Nothing)"]["matched"] == []
+    # One export for the fixture and the whole batch
+    assert len(sheet_server.requests) == 1
+    assert api.STAGES["match"].active == 0
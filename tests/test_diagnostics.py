@@ -0,0 +1,91 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from models import ExpectedExpense, ReportItem
+from reconcile import (
+    DATE_COST_WEIGHT,
+    PRICE_COST_WEIGHT,
+    VENDOR_COST_WEIGHT,
+    ActualIndex,
+    nearest_candidates,
+    reconcile_expenses,
+)
+from vendor import vendor_similarity
+
+VENDORS = ["HEB", "H-E-B", "Target", "Walmart", "Walgreens", "Costco"]
+
+
+def item(vendor, day, cents):
+    return ReportItem(
+        name="n", event="e", items="i", budget="b", endowment="", activity="",
+        date=date(2024, 1, 1) + timedelta(days=day), cents=cents, vendor=vendor,
+        receipts=(), flyer=""
+    )
+
+
+def expected(vendor, day, cents):
+    return ExpectedExpense(date(2024, 1, 1) + timedelta(days=day), vendor, cents)
+
+
+def distance(exp, act):
+    return PRICE_COST_WEIGHT * abs(act.cents - exp.cents) / 100 + (
+        DATE_COST_WEIGHT * abs((act.date - exp.date).days)
+        + VENDOR_COST_WEIGHT * (1.0 - vendor_similarity(exp.vendor, act.vendor))
+    )
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_nearest_candidates_match_a_full_sort(seed):
+    rng = random.Random(seed)
+    items = [
+        item(rng.choice(VENDORS), rng.randint(0, 30), rng.choice([999, 1000, 1500, 2525, rng.randint(100, 5000)]))
+        for _ in range(rng.randint(0, 60))
+    ]
+    exp = expected(rng.choice(VENDORS), rng.randint(0, 30), rng.choice([1000, rng.randint(100, 5000)]))
+    k = rng.choice([1, 3, 5])
+
+    found = nearest_candidates(exp, ActualIndex(items), k, 1.00, 0.75)
+
+    ranked = sorted(range(len(items)), key=lambda i: (distance(exp, items[i]), i))[:k]
+    assert [c.actual for c in found] == [items[i] for i in ranked]
+    for candidate in found:
+        assert candidate.distance == pytest.approx(distance(exp, candidate.actual))
+        assert candidate.price_diff_cents == candidate.actual.cents - exp.cents
+        assert candidate.days == (candidate.actual.date - exp.date).days
+
+
+def test_reasons():
+    exp = expected("Target", 5, 1000)
+    items = [
+        item("Target", 4, 1000),        # dated before
+        item("Target", 6, 1250),        # price too far
+        item("Walgreens", 6, 1050),     # vendor too different
+        item("Target", 6, 1000),        # taken below
+    ]
+    index = ActualIndex(items)
+    index.take(3)
+    reasons = [c.reason for c in sorted(nearest_candidates(exp, index, 4, 1.00, 0.75), key=lambda c: items.index(c.actual))]
+    assert reasons == [
+        "dated before the expected date",
+        "price differs by more than $1.00",
+        "vendor similarity below 0.75",
+        "matched to another expected expense",
+    ]
+
+def test_diagnostics_follow_unmatched_expected():
+    actual = [item("Target", 6, 1000), item("HEB", 2, 525)]
+    text = "\n".join([
+        "01/06/24 - Target - $10.00",       # matched
+        "01/20/24 - HEB - $5.25",           # the HEB item is dated before
+        "01/04/24 - Target - $10.00",       # the Target item is taken
+    ])
+    result = reconcile_expenses(text, actual)
+
+    assert [exp for exp, _ in result["diagnostics"]] == result["unmatched_expected"]
+    [(_, heb), (_, target)] = result["diagnostics"]
+    assert (heb[0].actual.vendor, heb[0].reason) == ("HEB", "dated before the expected date")
+    assert (target[0].actual.vendor, target[0].reason) == ("Target", "matched to another expected expense")
+
+    assert all(candidates == [] for _, candidates in reconcile_expenses(text, actual, candidates=0)["diagnostics"])
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+from reconcile import parse_expected_lines
+
+
+@pytest.mark.parametrize("line, vendor, cents", [
+    ("11/16/25 - Cheesecake - $138.36", "Cheesecake", 13836),
+    ("11/16/25 - $214.20 - Burger Chan", "Burger Chan", 21420),
+    ("11/16/25 - Chick-fil-A - $5.00", "Chick-fil-A", 500),
+    ("11/16/25 – $1,204.50 — Costco", "Costco", 120450),
+    ("11/16/25 - 7-Eleven - 5", "7-Eleven", 500),
+])
+def test_parses_valid_lines(line, vendor, cents):
+    expenses, rejected = parse_expected_lines(line)
+    assert rejected == []
+    assert [(e.date, e.vendor, e.cents) for e in expenses] == [(date(2025, 11, 16), vendor, cents)]
+
+
+@pytest.mark.parametrize("line, reason", [
+    # A refund must not be matched as a charge
+    ("11/16/25 - Amazon - -$5.00", "signed price"),
+    ("11/16/25 - -$5.00 - Amazon", "signed price"),
+    ("11/16/25 - Amazon - +5", "signed price"),
+    ("11/16/25 - $5 - ", "missing vendor"),
+    ("11/16/25 - Amazon - $5.00 - $6.00", "more than one price"),
+    ("11/16/25 - Amazon - 5.00 - 6.00", "more than one price"),
+    ("11/16/25 - Amazon", "expected MM/DD/YY"),
+    ("Amazon - $5.00", "no MM/DD/YY date"),
+    ("02/30/25 - Amazon - $5.00", "invalid date"),
+])
+def test_rejects_malformed_lines(line, reason):
+    expenses, rejected = parse_expected_lines(line)
+    assert expenses == []
+    assert len(rejected) == 1
+    assert rejected[0].line == 1
+    assert rejected[0].reason.startswith(reason)
+
+
+def test_blank_lines_are_skipped_and_numbering_kept():
+    expenses, rejected = parse_expected_lines("\n11/16/25 - HEB - $3\n\nbad line\n")
+    assert [e.vendor for e in expenses] == ["HEB"]
+    assert [r.line for r in rejected] == [4]
@@ -0,0 +1,45 @@
+import pytest
+import requests
+
+import parser
+from conftest import SHEET_LINK
+
+
+def test_download_spools_the_export(sheet_server):
+    response, buffer = parser.download_export("test-sheet")
+    with buffer:
+        assert buffer.read() == sheet_server.workbook
+    assert response.headers["ETag"] == '"v1"'
+    assert sheet_server.requests[0][0] == "/d/test-sheet/export?format=xlsx"
+
+
+def test_transient_failures_are_retried(sheet_server):
+    sheet_server.failures = parser.EXPORT_RETRIES
+    rows = parser.fetch_purchase_rows(SHEET_LINK)
+    assert len(rows) == 300
+    assert len(sheet_server.requests) == parser.EXPORT_RETRIES + 1
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retries_run_out(sheet_server, status):
+    sheet_server.failures = parser.EXPORT_RETRIES + 1
+    sheet_server.failure_status = status
+    with pytest.raises(requests.HTTPError) as raised:
+        parser.fetch_purchase_rows(SHEET_LINK)
+    assert raised.value.response.status_code == status
+    assert len(sheet_server.requests) == parser.EXPORT_RETRIES + 1
+    assert parser.SHEET_CACHE.peek("test-sheet") is None
+
+
+def test_client_errors_are_not_retried(sheet_server):
+    sheet_server.failures = 1
+    sheet_server.failure_status = 404
+    with pytest.raises(requests.HTTPError):
+        parser.fetch_purchase_rows(SHEET_LINK)
+    assert len(sheet_server.requests) == 1
+
+
+def test_connections_are_reused(sheet_server):
+    parser.download_export("test-sheet")[1].close()
+    parser.download_export("test-sheet")[1].close()
+    assert len(sheet_server.connections) == 1
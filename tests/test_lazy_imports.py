@@ -0,0 +1,16 @@
+import json
+import subprocess
+import sys
+
+from import_budget import LAZY, ROOT, TARGET
+
+
+def test_api_import_leaves_heavy_modules_unloaded():
+    """The startup import check of benchmarks/import_budget.py, without its timing budget."""
+    code = f"import {TARGET}, json, sys; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    loaded = set(json.loads(result.stdout.splitlines()[-1]))
+    assert TARGET in loaded
+    assert [name for name in LAZY if name in loaded] == []
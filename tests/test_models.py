@@ -0,0 +1,38 @@
+import dataclasses
+import pickle
+from datetime import date
+
+import pytest
+
+from models import ExpectedExpense, ReportItem, new_expected_expense, new_report_item
+
+FIELDS = ("Sam", "Retreat", "Snacks", "Cab Retreat", "", "6100", date(2025, 9, 1), 1250, "HEB", ("r1",), "")
+
+
+def test_fast_constructor_builds_the_same_frozen_items():
+    item = new_report_item(*FIELDS)
+    assert type(item) is ReportItem
+    assert item == ReportItem(*FIELDS) and hash(item) == hash(ReportItem(*FIELDS))
+    assert item.needsAffidavit is False
+    assert new_report_item(*FIELDS, needsAffidavit=True).needsAffidavit is True
+    assert repr(item) == repr(ReportItem(*FIELDS))
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        item.cents = 0
+    assert dataclasses.replace(item, cents=0).cents == 0
+    assert pickle.loads(pickle.dumps(item)) == item
+
+    names = [f.name for f in dataclasses.fields(ReportItem)]
+    assert new_report_item(**dict(zip(names, FIELDS))) == item
+    with pytest.raises(TypeError):
+        new_report_item(*FIELDS, colour="red")
+
+
+def test_fast_expected_expense():
+    expense = new_expected_expense(date=date(2025, 9, 1), vendor="HEB", cents=1250)
+    assert type(expense) is ExpectedExpense
+    assert expense == ExpectedExpense(date(2025, 9, 1), "HEB", 1250)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        expense.vendor = "Target"
+    with pytest.raises(TypeError):
+        new_expected_expense(date(2025, 9, 1), "HEB")
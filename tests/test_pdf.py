@@ -0,0 +1,158 @@
+import asyncio
+import zipfile
+from io import BytesIO
+
+import pytest
+from pypdf import PdfReader
+
+from backend import pdf_generator
+
+CARDHOLDER = "Gavin Firestone (Treasurer)"
+
+CASES = [
+    ("Trader Joe's", 25.25, "2025-11-01", CARDHOLDER),
+    ("Back\\slash ) and ( parens", 9.99, "2025-01-31", "Ann"),
+    ("~`!@#%^&*_+={}[]|:;\"<>?/", 7.0, "2025-06-15", "Zed Zebra-Zulu Extra Words"),
+]
+
+BULK = [{"vendor": v, "price": p, "date": d} for v, p, d, _ in CASES]
+
+
+def render_both(monkeypatch, fn, *args):
+    """(reportlab + merge_page output, fast path output) of fn(*args)."""
+    monkeypatch.setattr(pdf_generator, "PDF_FAST_PATH", False)
+    slow = fn(*args).getvalue()
+    monkeypatch.setattr(pdf_generator, "PDF_FAST_PATH", True)
+    return slow, fn(*args).getvalue()
+
+
+def page_texts(document: bytes):
+    """Each page's text, whitespace normalized: pypdf's line breaks depend on the operators used."""
+    return [" ".join(page.extract_text().split()) for page in PdfReader(BytesIO(document)).pages]
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: case[0])
+def test_fast_path_matches_reportlab(monkeypatch, case):
+    assert pdf_generator.fast_path_text(pdf_generator.overlay_texts(*case))
+    slow, fast = render_both(monkeypatch, pdf_generator.generate_affidavit, *case)
+    assert slow != fast
+    assert page_texts(fast) == page_texts(slow)
+    assert len(page_texts(fast)) == 1
+    assert case[0] in page_texts(fast)[0]
+
+
+def test_non_ascii_falls_back_to_reportlab(monkeypatch):
+    case = ("Café Brasil – Montrose", 12.5, "2025-03-04", "José Núñez (Member)")
+    assert not pdf_generator.fast_path_text(pdf_generator.overlay_texts(*case))
+    (text,) = page_texts(pdf_generator.generate_affidavit(*case).getvalue())
+    assert "Café Brasil" in text and "José Núñez" in text
+
+    # One non-ASCII expense sends the whole bulk document the original way
+    bulk = BULK + [{"vendor": case[0], "price": case[1], "date": case[2]}]
+    assert not pdf_generator.fast_path_expenses(bulk, CARDHOLDER)
+    slow, fast = render_both(monkeypatch, pdf_generator.generate_affidavits, bulk, CARDHOLDER)
+    assert page_texts(fast) == page_texts(slow)
+
+
+def test_bulk_pages_are_separate(monkeypatch):
+    slow, fast = render_both(monkeypatch, pdf_generator.generate_affidavits, BULK, CARDHOLDER)
+    texts = page_texts(fast)
+    assert texts == page_texts(slow)
+    assert len(texts) == len(BULK)
+    for i, text in enumerate(texts):
+        for j, expense in enumerate(BULK):
+            assert (expense["vendor"] in text) == (i == j)
+
+    pages = PdfReader(BytesIO(fast)).pages
+    overlays = [page["/Contents"][-1].idnum for page in pages]
+    assert len(set(overlays)) == len(pages)
+
+
+def test_fast_path_is_pixel_identical(monkeypatch):
+    pytest.importorskip("pypdfium2")
+    import numpy as np
+    from raster_diff import rasterize
+
+    for fn, args in [(pdf_generator.generate_affidavit, CASES[1]),
+                     (pdf_generator.generate_affidavits, (BULK, CARDHOLDER))]:
+        slow, fast = render_both(monkeypatch, fn, *args)
+        slow_pages, fast_pages = rasterize(slow, 72), rasterize(fast, 72)
+        assert len(slow_pages) == len(fast_pages)
+        for a, b in zip(slow_pages, fast_pages):
+            assert a.shape == b.shape
+            assert int(np.abs(a - b).max()) == 0
+
+
+@pytest.fixture
+def render_stage(monkeypatch):
+    """A thread render stage, so the endpoint runs the (patchable) module in process."""
+    from backend import api
+    from backend.pools import Stage
+
+    stage = Stage("render", "thread", 2, 2)
+    monkeypatch.setitem(api.STAGES, "render", stage)
+    yield stage
+    stage.shutdown()
+
+
+def run_bulk(**fields):
+    """(headers, body) of /api/generate-affidavits, with the response sent as the server would."""
+    from backend import api
+    from backend.models import BulkAffidavitRequest
+
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    async def collect():
+        request = BulkAffidavitRequest(expenses=BULK, cardholder_name=CARDHOLDER, **fields)
+        response = await api.generate_affidavits_endpoint(request)
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+
+    asyncio.run(collect())
+    headers = {key.decode(): value.decode() for key, value in sent[0]["headers"]}
+    return headers, b"".join(message.get("body", b"") for message in sent)
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_bulk_endpoint_pdf(render_stage, monkeypatch, fast):
+    monkeypatch.setattr(pdf_generator, "PDF_FAST_PATH", fast)
+    headers, body = run_bulk(format="pdf")
+    assert headers["content-type"] == "application/pdf"
+    assert headers["content-disposition"] == 'attachment; filename="affidavits.pdf"'
+    texts = page_texts(body)
+    assert len(texts) == len(BULK)
+    assert all(expense["vendor"] in text for expense, text in zip(BULK, texts))
+    assert render_stage.active == 0
+
+
+def test_bulk_endpoint_zip(render_stage):
+    headers, body = run_bulk(format="zip")
+    assert headers["content-type"] == "application/zip"
+    assert headers["content-disposition"] == 'attachment; filename="affidavits.zip"'
+    with zipfile.ZipFile(BytesIO(body)) as archive:
+        names = archive.namelist()
+        assert names == ["001_affidavit_Trader_Joe's_2025-11-01.pdf",
+                         "002_affidavit_Back\\slash_)_and_(_parens_2025-01-31.pdf",
+                         '003_affidavit_~`!@#%^&*_+={}[]|:;"<>?/_2025-06-15.pdf']
+        for name, expense in zip(names, BULK):
+            (text,) = page_texts(archive.read(name))
+            assert expense["vendor"] in text
+    assert render_stage.active == 0
+
+
+@pytest.mark.parametrize("format, fast", [("pdf", True), ("pdf", False), ("zip", True)])
+def test_bulk_endpoint_releases_the_slot_on_error(render_stage, monkeypatch, format, fast):
+    def fail(*args, **kwargs):
+        raise RuntimeError("render failed")
+
+    monkeypatch.setattr(pdf_generator, "PDF_FAST_PATH", fast)
+    monkeypatch.setattr(pdf_generator, "render_affidavit_bytes", fail)
+    monkeypatch.setattr(pdf_generator, "render_affidavits_bytes", fail)
+    with pytest.raises(RuntimeError, match="render failed"):
+        run_bulk(format=format)
+    assert render_stage.active == 0
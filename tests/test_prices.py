@@ -0,0 +1,39 @@
+import math
+from datetime import date, datetime
+
+import pytest
+
+from parser import (
+    COL_NAME, COL_PCARD, COL_PRICE, COL_TIMESTAMP, parse_price, parse_price_cents,
+    parse_purchase_rows, price_cents_column
+)
+
+
+@pytest.mark.parametrize("cell", [
+    "nan", "NaN", "inf", "-inf", "$Infinity", "1e400", " $ nan ",
+    math.nan, math.inf, -math.inf,
+])
+def test_non_finite_prices_are_unparseable(cell):
+    assert parse_price(cell) == 0.0
+    assert parse_price_cents(cell) == 0
+    assert price_cents_column([12.5, cell]) == [1250, 0]
+
+
+@pytest.mark.parametrize("cell, cents", [
+    ("$1,234.50", 123450), ("abc", 0), (None, 0), (7, 700), (19.99, 1999),
+])
+def test_prices(cell, cents):
+    assert parse_price_cents(cell) == cents
+
+
+def test_non_finite_price_cell_does_not_fail_the_sheet():
+    rows = []
+    for price in ("nan", math.inf, "$5.00"):
+        row = [None] * 16
+        row[COL_TIMESTAMP] = datetime(2025, 9, 1, 12)
+        row[COL_NAME] = "Sam"
+        row[COL_PCARD] = "Card Holder"
+        row[COL_PRICE] = price
+        rows.append(tuple(row))
+    items = parse_purchase_rows(rows, "Card Holder", date(2025, 1, 1))
+    assert sorted(item.cents for item in items) == [0, 0, 500]
@@ -0,0 +1,29 @@
+import random
+
+import pytest
+
+from bench_reconcile import legacy_reconcile
+from reconcile import reconcile_expenses
+from synthetic import synthetic_expected_text, synthetic_report_items
+
+
+def result_key(result):
+    """Actual items compare by identity so duplicate-looking rows must pair up the same way."""
+    return (
+        [(e, id(a)) for e, a in result["matched"]],
+        result["unmatched_expected"],
+        [id(a) for a in result["unmatched_actual"]],
+    )
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_indexed_matches_legacy(seed):
+    rng = random.Random(seed)
+    items = synthetic_report_items(rng.randint(1, 80), seed=seed)
+    text = synthetic_expected_text(items, rng.randint(0, 60), seed=seed)
+    tolerance = rng.choice([0.0, 0.5, 1.0, 2.5])
+    threshold = rng.choice([0.5, 0.75, 0.9])
+
+    old = legacy_reconcile(text, items, tolerance, threshold)
+    new = reconcile_expenses(text, items, tolerance, threshold)
+    assert result_key(new) == result_key(old)
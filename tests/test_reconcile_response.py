@@ -0,0 +1,96 @@
+import asyncio
+import json
+import logging
+from datetime import date
+
+import parser
+from backend import api
+from backend.models import (
+    ExpectedExpenseSchema, MatchCandidateSchema, MatchedPair, ReconcileRequest, ReconcileResponse,
+    RejectedLineSchema, ReportItemSchema, UnmatchedDiagnostic
+)
+from conftest import SHEET_LINK
+from reconcile import reconcile_expenses
+from synthetic import CARDHOLDERS, synthetic_expected_text
+
+START = date(2023, 8, 1)
+
+
+def pydantic_response(results: dict) -> ReconcileResponse:
+    """The response built through the schema models, as /reconcile used to"""
+    return ReconcileResponse(
+        matched=[
+            MatchedPair(expected=ExpectedExpenseSchema.from_dataclass(exp), actual=ReportItemSchema.from_dataclass(act))
+            for exp, act in results["matched"]
+        ],
+        unmatched_expected=[ExpectedExpenseSchema.from_dataclass(exp) for exp in results["unmatched_expected"]],
+        unmatched_actual=[ReportItemSchema.from_dataclass(act) for act in results["unmatched_actual"]],
+        rejected_lines=[RejectedLineSchema.from_dataclass(line) for line in results["rejected_lines"]],
+        diagnostics=[
+            UnmatchedDiagnostic(
+                expected=ExpectedExpenseSchema.from_dataclass(exp),
+                candidates=[MatchCandidateSchema.from_dataclass(c) for c in candidates]
+            )
+            for exp, candidates in results["diagnostics"]
+        ],
+        total_cost=results["total_cost"]
+    )
+
+
+def test_body_matches_the_schema_models(sheet_server):
+    rows = parser.fetch_purchase_rows(SHEET_LINK)
+    items = parser.parse_purchase_rows(rows, CARDHOLDERS[0], START)
+    expected = synthetic_expected_text(items, 20) + "\n1/2/24 - Café Olé - $5.00\nnot a line\n1/2/24 - HEB - -$3"
+    for strategy in ("greedy", "optimal"):
+        results = reconcile_expenses(expected, items, api.PRICE_TOLERANCE, api.SIMILARITY_THRESHOLD, strategy)
+        assert results["matched"] and results["rejected_lines"] and results["diagnostics"]
+        body = api.reconcile_body(expected, items, strategy)
+        assert json.loads(body) == json.loads(pydantic_response(results).model_dump_json())
+        ReconcileResponse.model_validate_json(body)
+
+
+def test_endpoint_serializes_on_the_match_stage(sheet_server, monkeypatch):
+    jobs = []
+    run = api.STAGES["match"].run
+
+    async def recording_run(fn, *args, **kwargs):
+        jobs.append(fn)
+        return await run(fn, *args, **kwargs)
+
+    monkeypatch.setattr(api.STAGES["match"], "run", recording_run)
+    monkeypatch.setattr(api, "RESULT_CACHE", None)
+    request = ReconcileRequest(
+        cardholder_name=CARDHOLDERS[0], start_date=START.isoformat(),
+        expected_expenses="1/2/24 - HEB - $5.00", sheet_link=SHEET_LINK
+    )
+    response = asyncio.run(api.reconcile(request))
+    assert jobs == [api.reconcile_body]
+    assert ReconcileResponse.model_validate_json(response.body).rejected_lines == []
+
+
+def test_failed_cache_write_is_logged(sheet_server, monkeypatch, caplog):
+    class FailingCache:
+        def get(self, *args):
+            return None
+
+        def put(self, *args):
+            raise OSError("disk full")
+
+    monkeypatch.setattr(api, "RESULT_CACHE", FailingCache())
+    request = ReconcileRequest(
+        cardholder_name=CARDHOLDERS[0], start_date=START.isoformat(),
+        expected_expenses="1/2/24 - HEB - $5.00", sheet_link=SHEET_LINK
+    )
+
+    async def reconcile_and_store():
+        response = await api.reconcile(request)
+        await asyncio.wait(set(api.BACKGROUND_JOBS))
+        await asyncio.sleep(0)
+        return response
+
+    with caplog.at_level(logging.ERROR, logger="backend.api"):
+        response = asyncio.run(reconcile_and_store())
+    assert response.status_code == 200
+    assert not api.BACKGROUND_JOBS
+    (record,) = caplog.records
+    assert record.exc_info[1].args == ("disk full",)
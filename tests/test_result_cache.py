@@ -0,0 +1,123 @@
+import io
+import os
+
+import pytest
+
+import parser
+import sources
+from conftest import SHEET_LINK
+from result_cache import ResultCache, result_key
+from synthetic import write_csv
+
+
+def key(text="1/2/24 - HEB - $5.00", **changes):
+    params = dict(cardholder_name="A (x)", start_date="2024-01-01", price_tolerance=1.0,
+                  similarity_threshold=0.75, strategy="greedy")
+    params.update(changes)
+    return result_key(text, **params)
+
+
+def test_result_key():
+    assert key("1/2/24 - HEB - $5.00\r\n\r\n") == key("  1/2/24 - HEB - $5.00\n")
+    # Interior blank lines shift rejected line numbers
+    assert key("a\n\nb") != key("a\nb")
+    assert key(strategy="optimal") != key()
+    assert key(cardholder_name="B (y)") != key()
+
+
+def test_new_version_invalidates():
+    cache = ResultCache()
+    cache.put("sheet", "v1", "d", b"one")
+    assert cache.get("sheet", "v1", "d") == b"one"
+
+    assert cache.get("sheet", "v2", "d") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["invalidations"] == 1
+    cache.put("sheet", "v2", "d", b"two")
+    assert cache.get("sheet", "v2", "d") == b"two"
+    assert cache.stats()["entries"] == 1
+
+
+def test_result_of_an_outdated_version_is_not_stored():
+    cache = ResultCache()
+    cache.get("sheet", "v2", "d")
+    cache.put("sheet", "v1", "d", b"late")
+    assert cache.stats()["entries"] == 0
+
+
+def test_workers_share_the_disk_tier(tmp_path):
+    a, b = ResultCache(directory=str(tmp_path)), ResultCache(directory=str(tmp_path))
+    a.put("sheet", "v1", "d", b"one")
+    assert b.get("sheet", "v1", "d") == b"one"
+    assert b.stats()["disk_hits"] == 1
+
+    # A worker that saw a newer version doesn't delete on reads...
+    assert b.get("sheet", "v2", "d") is None
+    assert a.get("sheet", "v1", "d") == b"one"
+    assert os.listdir(tmp_path / "sheet") == ["v1"]
+
+    # ...only once it stores a result for it
+    b.put("sheet", "v2", "d", b"two")
+    assert os.listdir(tmp_path / "sheet") == ["v2"]
+    assert a.get("sheet", "v2", "d") == b"two"
+
+
+def test_exports_of_the_same_content_get_the_same_version(sheet_server):
+    first = parser.fetch_purchase_rows(SHEET_LINK)
+    parser.SHEET_CACHE.clear()
+    again = parser.fetch_purchase_rows(SHEET_LINK)
+    assert again is not first and again.version == first.version
+
+    parser.SHEET_CACHE.clear()
+    sheet_server.etag = '"v2"'
+    assert parser.fetch_purchase_rows(SHEET_LINK).version != first.version
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_export_digest_without_an_etag():
+    buffer = io.BytesIO(b"x" * 200_000)
+    buffer.seek(10)
+    digest = parser.export_digest(Response({}), buffer)
+    assert buffer.tell() == 10
+    assert digest == parser.export_digest(Response({}), io.BytesIO(b"x" * 200_000))
+    assert digest != parser.export_digest(Response({}), io.BytesIO(b"y" * 200_000))
+    assert parser.export_digest(Response({"ETag": '"e"'}), buffer) == 'etag:"e"'
+
+
+def test_local_rows_version_follows_the_file(tmp_path):
+    write_csv(tmp_path / "p.csv", 50)
+    source = sources.local_source("p.csv", root=str(tmp_path))
+    first = parser.LocalRows(source).sync()
+    assert parser.LocalRows(source).sync().version == first.version
+
+    local = parser.LocalRows(source)
+    rows = local.sync()
+    with open(source.path, "a") as f:
+        f.write('"partial')
+    assert local.sync().version == rows.version     # no new complete record
+    with open(source.path, "a") as f:
+        f.write('"\r\n')
+    write_csv(tmp_path / "p.csv", 5, seed=1, header=False)
+    assert local.sync().version != rows.version
+
+
+def test_snapshot_of_a_stored_version_is_not_rewritten(tmp_path):
+    from snapshot import SnapshotStore
+
+    rows = [(1, "a"), (2, "b")]
+    store = SnapshotStore(str(tmp_path))
+    first = store.write("sheet", rows, [1, 2], version="c0ffee")
+    codes = os.stat(os.path.join(first.path, "codes.npy")).st_ino
+
+    # Another worker, same content
+    again = SnapshotStore(str(tmp_path)).write("sheet", rows, [1, 2], version="c0ffee")
+    assert again.version == first.version == "c0ffee"
+    assert os.stat(os.path.join(again.path, "codes.npy")).st_ino == codes
+    assert sorted(os.listdir(tmp_path / "sheet")) == ["CURRENT", "c0ffee"]
+
+    with pytest.raises(ValueError):
+        store.write("sheet", rows, [1, 2], version="../x")
@@ -0,0 +1,158 @@
+import random
+from datetime import date
+
+import pytest
+
+import parser
+from conftest import SHEET_LINK
+from reconcile import reconcile_expenses
+from session import ReconcileSession
+from synthetic import CARDHOLDERS, synthetic_expected_text
+
+CARDHOLDER = CARDHOLDERS[0]
+START = date(2023, 8, 1)
+
+
+@pytest.fixture
+def rows(sheet_server):
+    return parser.fetch_purchase_rows(SHEET_LINK)
+
+
+@pytest.fixture
+def items(rows):
+    return parser.parse_purchase_rows(rows, CARDHOLDER, START)
+
+
+def new_session():
+    return ReconcileSession(SHEET_LINK, CARDHOLDER, START)
+
+
+class Client:
+    """What a client holds by applying every delta in turn."""
+
+    def __init__(self):
+        self.matches = {}
+        self.unmatched_expected = set()
+        self.unmatched_actual = set()
+
+    def apply(self, delta):
+        for pair in delta.unmatched:
+            del self.matches[pair.expected_id]
+            self.unmatched_actual.add(pair.actual_id)
+        for exp_id in delta.removed_expected:
+            self.matches.pop(exp_id, None)
+            self.unmatched_expected.discard(exp_id)
+        for pair in delta.matched:
+            self.matches[pair.expected_id] = pair.actual_id
+            self.unmatched_expected.discard(pair.expected_id)
+            self.unmatched_actual.discard(pair.actual_id)
+        self.unmatched_expected.update(delta.unmatched_expected)
+        self.unmatched_actual.update(delta.unmatched_actual)
+        self.unmatched_actual -= set(self.matches.values())
+
+    def state(self):
+        return self.matches, self.unmatched_expected, self.unmatched_actual
+
+
+def state_of(session):
+    snapshot = session.snapshot()
+    return (
+        {pair.expected_id: pair.actual_id for pair in snapshot.matched},
+        set(snapshot.unmatched_expected),
+        set(snapshot.unmatched_actual),
+    )
+
+
+def test_initial_state_matches_a_full_reconcile(rows, items):
+    text = synthetic_expected_text(items, 40)
+    session = new_session()
+    session.refresh(rows)
+    session.add_expected(text)
+
+    full = reconcile_expenses(text, items)
+    snapshot = session.snapshot()
+    assert [(p.expected, p.actual) for p in snapshot.matched] == full["matched"]
+    assert len(snapshot.unmatched_expected) == len(full["unmatched_expected"])
+    assert len(snapshot.unmatched_actual) == len(full["unmatched_actual"])
+
+
+def test_refresh_only_reports_new_rows(rows, items):
+    session = new_session()
+    session.refresh(rows[:200])
+    session.add_expected(synthetic_expected_text(items, 30))
+    before = state_of(session)
+
+    delta = session.refresh(rows)
+    new_ids = {pair.actual_id for pair in delta.matched} | set(delta.unmatched_actual)
+    assert new_ids == set(session.actual) - set(before[2]) - set(before[0].values())
+    # Existing pairs are never reshuffled
+    assert all(session.matches[exp_id] == act_id for exp_id, act_id in before[0].items())
+    assert session.refresh(rows).matched == []
+
+
+def test_removing_a_line_frees_its_row_for_a_waiting_line(rows, items):
+    item = items[0]
+    line = f"{item.date:%m/%d/%y} - {item.vendor} - ${item.price:.2f}"
+    session = new_session()
+    session.refresh(rows)
+    first = session.add_expected(line)
+    second = session.add_expected(line)
+    assert [p.actual_id for p in first.matched] != [] and second.matched == []
+
+    [pair] = first.matched
+    delta = session.remove_expected([pair.expected_id])
+    assert [p.expected_id for p in delta.unmatched] == [pair.expected_id]
+    assert [(p.expected_id, p.actual_id) for p in delta.matched] == [(second.unmatched_expected[0], pair.actual_id)]
+    assert delta.removed_expected == [pair.expected_id]
+    assert delta.unmatched_actual == []
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_deltas_replay_to_the_session_state(rows, items, seed):
+    rng = random.Random(seed)
+    session = new_session()
+    client = Client()
+    cut = 100
+
+    client.apply(session.refresh(rows[:cut]))
+    for step in range(12):
+        roll = rng.random()
+        if roll < 0.2 and cut < len(rows):
+            cut = min(len(rows), cut + rng.randint(1, 60))
+            delta = session.refresh(rows[:cut])
+        else:
+            remove = rng.sample(sorted(session.expected), min(len(session.expected), rng.randint(0, 3)))
+            add = synthetic_expected_text(items, rng.randint(0, 6), seed=seed * 100 + step) if rng.random() < 0.7 else ""
+            delta = session.update_expected(add=add, remove=remove)
+        client.apply(delta)
+        assert client.state() == state_of(session)
+
+        # Every pair is one-to-one
+        assert len(set(session.matches.values())) == len(session.matches)
+
+
+@pytest.mark.parametrize("error, status, detail", [
+    (ValueError("bad date"), 400, "Invalid date format: bad date"),
+    (RuntimeError("boom"), 500, "Update failed: boom"),
+])
+def test_update_errors_are_http_errors(rows, monkeypatch, error, status, detail):
+    import asyncio
+    from fastapi import HTTPException
+    from backend import api
+    from backend.models import SessionExpectedRequest
+    import session as session_module
+
+    session = new_session()
+    session.refresh(rows)
+    session_module.SESSIONS.add(session)
+
+    def fail(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(session, "update_expected", fail)
+    try:
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(api.update_session_expected(session.id, SessionExpectedRequest(add="x")))
+    finally:
+        session_module.SESSIONS.remove(session.id)
+    assert (raised.value.status_code, raised.value.detail) == (status, detail)
@@ -0,0 +1,84 @@
+from datetime import date
+
+import parser
+from conftest import SHEET_LINK
+from sheet_cache import SheetCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fresh_entries_are_hits_and_stale_ones_misses():
+    clock = Clock()
+    cache = SheetCache(ttl_seconds=60, clock=clock)
+    cache.put("a", "rows", size=1, etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    assert cache.get("a") == "rows"
+
+    clock.now = 61
+    assert cache.get("a") is None
+    assert cache.peek("a") == "rows"
+    assert cache.validators("a") == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    assert cache.revalidated("a") == "rows"
+    assert cache.get("a") == "rows"
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["revalidations"] == 1
+
+
+def test_bounded_by_entries_and_size():
+    cache = SheetCache(max_entries=2, max_size=10)
+    cache.put("a", "a", size=4)
+    cache.put("b", "b", size=4)
+    cache.get("a")
+    cache.put("c", "c", size=4)             # over both caps: evicts b, the least recent
+    assert cache.peek("b") is None
+    assert cache.peek("a") == "a" and cache.peek("c") == "c"
+
+    cache.put("big", "big", size=11)         # larger than the cache: not stored
+    assert cache.peek("big") is None
+    assert cache.stats()["size"] == 8
+
+
+def test_fresh_entry_skips_the_network(sheet_server):
+    rows = parser.fetch_purchase_rows(SHEET_LINK)
+    assert parser.fetch_purchase_rows(SHEET_LINK) is rows
+    assert len(sheet_server.requests) == 1
+    assert len(rows) == 300
+
+
+def test_stale_entry_is_revalidated_not_reparsed(sheet_server, monkeypatch):
+    rows = parser.fetch_purchase_rows(SHEET_LINK)
+    monkeypatch.setattr(parser.SHEET_CACHE, "ttl_seconds", -1)
+
+    assert parser.fetch_purchase_rows(SHEET_LINK) is rows
+    assert sheet_server.requests[-1][1] == '"v1"'
+    assert parser.SHEET_CACHE.stats()["revalidations"] == 1
+
+
+def test_changed_sheet_is_exported_again(sheet_server, monkeypatch):
+    rows = parser.fetch_purchase_rows(SHEET_LINK)
+    monkeypatch.setattr(parser.SHEET_CACHE, "ttl_seconds", -1)
+    sheet_server.etag = '"v2"'
+
+    changed = parser.fetch_purchase_rows(SHEET_LINK)
+    assert changed is not rows
+    assert changed.version != rows.version
+    assert list(changed) == list(rows)
+    assert parser.SHEET_CACHE.validators("test-sheet")["If-None-Match"] == '"v2"'
+
+
+def test_cached_rows_not_covering_the_window_are_exported_again(sheet_server):
+    parser.fetch_purchase_rows(SHEET_LINK, date(2024, 1, 1))
+    rows = parser.SHEET_CACHE.peek("test-sheet")
+    rows.covers_from = date(2024, 1, 1)
+
+    parser.fetch_purchase_rows(SHEET_LINK, date(2023, 8, 1))
+    # Not a conditional request: a 304 would not bring the missing rows
+    assert sheet_server.requests[-1][1] is None
@@ -0,0 +1,91 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from parser import COL_PCARD, COL_TIMESTAMP, SheetRows, select_purchase_rows_by_cardholder
+
+NAMES = ["A (x)", "B (y)", "C (z)"]
+
+
+def row(timestamp, name):
+    values = [None] * 16
+    values[COL_TIMESTAMP] = timestamp
+    values[COL_PCARD] = name
+    return tuple(values)
+
+
+def random_rows(rng, n, shuffled=0, blanks=0, malformed=0):
+    ts = datetime(2024, 1, 1)
+    rows = []
+    for _ in range(n):
+        ts += timedelta(hours=rng.randint(1, 40))
+        rows.append(row(ts, rng.choice(NAMES)))
+    # Late-submitted or re-sorted responses near the top of the sheet
+    for _ in range(shuffled):
+        i, j = rng.randrange(min(n, 30)), rng.randrange(n)
+        rows[i], rows[j] = rows[j], rows[i]
+    for _ in range(blanks):
+        rows[rng.randrange(n)] = row(None, rng.choice(NAMES))
+    for _ in range(malformed):
+        rows[rng.randrange(n)] = row("not a date", rng.choice(NAMES))
+    return rows
+
+
+def select(rows, start):
+    """(result, None) or (None, error type) of a selection"""
+    try:
+        return select_purchase_rows_by_cardholder(rows, NAMES, start), None
+    except ValueError as e:
+        return None, type(e)
+
+
+def starts(rows):
+    dated = [r[COL_TIMESTAMP].date() for r in rows if isinstance(r[COL_TIMESTAMP], datetime)]
+    lo, hi = min(dated), max(dated)
+    return [lo - timedelta(days=1), lo, hi, hi + timedelta(days=1)] + [
+        lo + timedelta(days=k) for k in range(0, (hi - lo).days, 5)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_index_matches_the_scan(seed):
+    rng = random.Random(seed)
+    rows = random_rows(
+        rng, rng.randint(5, 200),
+        shuffled=rng.choice([0, 0, 3, 10]),
+        blanks=rng.choice([0, 2]),
+        malformed=rng.choice([0, 0, 1])
+    )
+    indexed = SheetRows(rows)
+    for start in starts(rows):
+        assert select(indexed, start) == select(iter(rows), start)
+
+
+def test_out_of_order_rows_in_the_window_are_kept():
+    rows = [row(datetime(2024, 3, 1), "A (x)"), row(datetime(2024, 1, 1), "A (x)"), row(datetime(2024, 2, 1), "A (x)")]
+    picked = select_purchase_rows_by_cardholder(SheetRows(rows), ["A (x)"], date(2024, 1, 15))["A (x)"]
+    assert [position for position, _, _ in picked] == [2, 0]
+
+
+def test_malformed_timestamp_raises_only_inside_the_window():
+    rows = [row("not a date", "A (x)"), row(datetime(2024, 1, 1), "A (x)"), row(datetime(2024, 2, 1), "A (x)")]
+    assert len(select_purchase_rows_by_cardholder(SheetRows(rows), NAMES, date(2024, 1, 15))["A (x)"]) == 1
+    with pytest.raises(ValueError):
+        select_purchase_rows_by_cardholder(SheetRows(rows[1:] + rows[:1]), NAMES, date(2024, 1, 15))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_extended_index_matches_a_fresh_one(seed):
+    rng = random.Random(seed)
+    rows = random_rows(rng, 150, shuffled=rng.choice([0, 5]), blanks=2)
+    cut = rng.randint(1, 149)
+    if rng.random() < 0.3:
+        # Appended rows that are out of order themselves
+        rows[cut:] = rows[cut:][::-1]
+
+    old = SheetRows(rows[:cut])
+    grown = SheetRows(rows)
+    grown._sheet_index = old.sheet_index.extended(grown)
+    for start in starts(rows):
+        assert select(grown, start) == select(SheetRows(rows), start)
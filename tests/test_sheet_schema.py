@@ -0,0 +1,145 @@
+import logging
+import re
+from datetime import date
+
+import pytest
+from openpyxl import Workbook
+
+import parser
+from parser import SheetSchemaError, purchase_tabs, read_purchase_rows, schema_for_header
+from synthetic import HEADER, synthetic_rows, write_workbook
+
+
+def test_only_year_tabs_are_read(caplog):
+    names = [
+        "Purchases 2024-25", "Purchases (old)", "Purchases backup", "Summary",
+        "Purchases 2023-2024", "Purchases 2023-2024 copy", "purchases 2022–2023",
+    ]
+    with caplog.at_level(logging.WARNING, logger="parser"):
+        tabs = purchase_tabs(names)
+    assert [tab.name for tab in tabs] == ["purchases 2022–2023", "Purchases 2023-2024", "Purchases 2024-25"]
+    assert tabs[-1].ends == date(2025, 9, 29)
+    skipped = [record.args[0] for record in caplog.records]
+    assert skipped == ["Purchases (old)", "Purchases backup", "Purchases 2023-2024 copy"]
+
+
+def test_copied_tab_is_not_double_counted(tmp_path):
+    rows = list(synthetic_rows(50))
+    wb = Workbook(write_only=True)
+    for name in ("Purchases 2023-2024", "Purchases 2023-2024 (backup)"):
+        ws = wb.create_sheet(name)
+        ws.append(HEADER)
+        for row in rows:
+            ws.append(row)
+    wb.save(tmp_path / "copy.xlsx")
+
+    single = tmp_path / "single.xlsx"
+    write_workbook(single, 50)
+    with open(tmp_path / "copy.xlsx", "rb") as f, open(single, "rb") as g:
+        assert list(read_purchase_rows(f)) == list(read_purchase_rows(g))
+
+
+def test_reordered_columns():
+    header = list(reversed(HEADER))
+    schema = schema_for_header(tuple(header))
+    row = tuple(reversed(range(16)))
+    assert schema.project(row) == tuple(range(16))
+    assert schema_for_header(tuple(HEADER)).identity
+
+
+def test_unused_columns_may_be_missing():
+    header = [text for text in HEADER if text not in ("Email Address", "Notes")]
+    schema = schema_for_header(tuple(header))
+    row = schema.project(tuple(header))
+    assert row[parser.COLUMNS["B"]] is None and row[parser.COLUMNS["K"]] is None
+    assert row[parser.COL_PRICE] == "Price"
+
+
+@pytest.mark.parametrize("replace, with_", [("Price", "Amount"), ("P-Card Holder", "Cardholder")])
+def test_missing_header_is_an_error(replace, with_):
+    header = [with_ if text == replace else text for text in HEADER]
+    with pytest.raises(SheetSchemaError, match=replace):
+        schema_for_header(tuple(header))
+
+
+def test_repeated_header_is_an_error():
+    with pytest.raises(SheetSchemaError, match="Price"):
+        schema_for_header(tuple(HEADER + ["price "]))
+
+
+def test_tab_without_header(tmp_path):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Purchases 2023-2024")
+    for row in synthetic_rows(5):
+        ws.append(row)
+    wb.create_sheet("Purchases 2024-2025")
+    wb.save(tmp_path / "empty.xlsx")
+    with open(tmp_path / "empty.xlsx", "rb") as f:
+        with pytest.raises(SheetSchemaError, match="Purchases 2023-2024"):
+            read_purchase_rows(f)
+
+    wb = Workbook(write_only=True)
+    wb.create_sheet("Purchases 2024-2025")
+    wb.save(tmp_path / "new.xlsx")
+    with open(tmp_path / "new.xlsx", "rb") as f:
+        assert len(read_purchase_rows(f)) == 0
+
+
+def bad_workbook(path, tab, header):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(tab)
+    ws.append(header)
+    for row in synthetic_rows(5):
+        ws.append(row)
+    wb.save(path)
+    return path.read_bytes()
+
+
+@pytest.mark.parametrize("tab, header, detail", [
+    ("Summary", HEADER, "No purchases tab"),
+    ("Purchases 2023-2024", [text.replace("Price", "Amount") for text in HEADER], "'Purchases 2023-2024'.*'Price'"),
+])
+def test_unrecognized_sheet_is_a_bad_request(sheet_server, tmp_path, monkeypatch, tab, header, detail):
+    import asyncio
+    from fastapi import HTTPException
+    from backend import api
+    from backend.models import BatchReconcileRequest, ReconcileRequest, SessionCreateRequest
+    from conftest import SHEET_LINK
+    from synthetic import CARDHOLDERS
+
+    monkeypatch.setattr(api, "RESULT_CACHE", None)
+    sheet_server.workbook = bad_workbook(tmp_path / "bad.xlsx", tab, header)
+    fields = {"start_date": "2023-08-01", "sheet_link": SHEET_LINK}
+    calls = [
+        api.reconcile(ReconcileRequest(cardholder_name=CARDHOLDERS[0], expected_expenses="", **fields)),
+        api.reconcile_batch(BatchReconcileRequest(
+            cardholders=[{"cardholder_name": CARDHOLDERS[0], "expected_expenses": ""}], **fields
+        )),
+        api.create_session(SessionCreateRequest(cardholder_name=CARDHOLDERS[0], expected_expenses="", **fields)),
+    ]
+    for call in calls:
+        with pytest.raises(HTTPException) as raised:
+            asyncio.run(call)
+        assert raised.value.status_code == 400
+        assert raised.value.detail.startswith("Unrecognized purchase sheet: ")
+        assert re.search(detail, raised.value.detail)
+
+
+def test_refresh_onto_an_unrecognized_sheet_is_a_bad_request(sheet_server, tmp_path):
+    import asyncio
+    from fastapi import HTTPException
+    from backend import api
+    from backend.models import SessionCreateRequest
+    from conftest import SHEET_LINK
+    from synthetic import CARDHOLDERS
+
+    created = asyncio.run(api.create_session(SessionCreateRequest(
+        cardholder_name=CARDHOLDERS[0], expected_expenses="", start_date="2023-08-01", sheet_link=SHEET_LINK
+    )))
+    sheet_server.workbook = bad_workbook(tmp_path / "bad.xlsx", "Summary", HEADER)
+    sheet_server.etag = '"v2"'
+    parser.SHEET_CACHE.ttl_seconds = 0
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(api.refresh_session(created.session_id))
+    assert raised.value.status_code == 400
+    assert "No purchases tab" in raised.value.detail
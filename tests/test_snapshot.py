@@ -0,0 +1,118 @@
+import os
+import stat
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+import parser
+from conftest import SHEET_LINK
+from snapshot import SnapshotStore
+
+
+def test_directory_is_private(tmp_path):
+    directory = tmp_path / "snapshots"
+    store = SnapshotStore(str(directory))
+    assert store.open("sheet") is None
+    assert not directory.exists()
+    store.write("sheet", [(1, "a")], [1])
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+    os.chmod(directory, 0o755)
+    SnapshotStore(str(directory)).write("sheet", [(1, "a")], [1])
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+
+
+def test_import_does_not_create_the_directory(tmp_path):
+    directory = tmp_path / "snapshots"
+    subprocess.run(
+        [sys.executable, "-c", "import parser"],
+        cwd=Path(parser.__file__).parent, env={**os.environ, "EXPENSE_SNAPSHOT_DIR": str(directory)},
+        check=True
+    )
+    assert not directory.exists()
+
+
+def test_symlinked_directory_is_refused(tmp_path, monkeypatch):
+    (tmp_path / "elsewhere").mkdir()
+    os.symlink(tmp_path / "elsewhere", tmp_path / "snapshots")
+    store = parser.open_snapshot_store(str(tmp_path / "snapshots"))
+    with pytest.raises(PermissionError):
+        store.open("sheet")
+    with pytest.raises(PermissionError):
+        store.write("sheet", [(1, "a")], [1])
+    assert os.listdir(tmp_path / "elsewhere") == []
+
+    monkeypatch.setattr(parser, "SNAPSHOTS", store)
+    assert parser.current_snapshot("sheet") is None
+    assert parser.open_snapshot_store("") is None
+
+
+def test_dropped_columns_read_back_as_none(tmp_path):
+    rows = [(1, "a@x.edu", "x"), (2, "b@x.edu", "y")]
+    snapshot = SnapshotStore(str(tmp_path)).write("sheet", rows, [1, 2], dropped_columns=[1])
+    assert snapshot.rows() == [(1, None, "x"), (2, None, "y")]
+    assert snapshot.values[1] == [None]
+
+
+def test_exported_snapshot_keeps_only_used_columns(sheet_server, tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path))
+    monkeypatch.setattr(parser, "SNAPSHOTS", store)
+    rows = parser.fetch_purchase_rows(SHEET_LINK)
+    snapshot = store.open(parser.spreadsheet_id_from_url(SHEET_LINK))
+
+    with open(os.path.join(snapshot.path, "values.json"), encoding="utf-8") as f:
+        assert "@rice.edu" not in f.read()
+    for letter in parser.UNUSED_COLUMNS:
+        assert snapshot.values[parser.COLUMNS[letter]] == [None]
+
+    # Report items are the same either way
+    names = {row[parser.COL_NAME] for row in rows}
+    for name in names:
+        assert (parser.parse_purchase_rows(snapshot.rows(), name, date.min)
+                == parser.parse_purchase_rows(rows, name, date.min))
+
+
+def test_failed_write_stops_serving_the_old_snapshot(sheet_server, tmp_path, monkeypatch):
+    from synthetic import CARDHOLDERS, write_workbook
+
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    monkeypatch.setattr(parser, "SNAPSHOTS", store)
+    spreadsheet_id = parser.spreadsheet_id_from_url(SHEET_LINK)
+    old = parser.fetch_purchase_rows(SHEET_LINK)
+    assert store.open(spreadsheet_id).version == old.version
+
+    write_workbook(tmp_path / "new.xlsx", 320)
+    sheet_server.workbook = (tmp_path / "new.xlsx").read_bytes()
+    sheet_server.etag = '"v2"'
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "write", fail)
+    parser.refresh_snapshot(spreadsheet_id)
+    assert store.open(spreadsheet_id) is None
+
+    items, version = parser.parse_purchases_versioned(SHEET_LINK, CARDHOLDERS[0], "01/01/2000")
+    assert version != old.version
+    assert version == parser.SHEET_CACHE.peek(spreadsheet_id).version
+
+
+def test_discard_without_removing_current(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path))
+    store.write("sheet", [(1, "a")], [1])
+
+    def refuse(path):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(os, "unlink", refuse)
+    with pytest.raises(PermissionError):
+        store.discard("sheet")
+    assert store.open("sheet") is None
+    assert SnapshotStore(str(tmp_path)).open("sheet") is not None
+    monkeypatch.undo()
+
+    assert store.write("sheet", [(2, "b")], [2]).rows() == [(2, "b")]
+    assert store.open("sheet") is not None
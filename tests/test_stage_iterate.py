@@ -0,0 +1,61 @@
+import asyncio
+import time
+from contextlib import aclosing
+
+import pytest
+
+from backend.pools import Stage
+
+
+def slow_rows(n, delay):
+    for i in range(n):
+        time.sleep(delay)
+        yield (i, time.monotonic())
+
+
+def failing_rows():
+    yield 1
+    raise KeyError("boom")
+
+
+@pytest.fixture(params=["thread", "process"])
+def stage(request):
+    stage = Stage("t", request.param, 1, 1)
+    yield stage
+    stage.shutdown()
+
+
+def test_first_rows_arrive_before_the_last_is_computed(stage):
+    async def first_and_last():
+        async with aclosing(stage.iterate(slow_rows, 6, 0.1, batch_size=1)) as batches:
+            batches = [(batch, time.monotonic()) async for batch in batches]
+        return batches
+
+    batches = asyncio.run(first_and_last())
+    assert [row[0] for batch, _ in batches for row in batch] == list(range(6))
+    first_received = batches[0][1]
+    last_computed = batches[-1][0][-1][1]
+    assert first_received < last_computed
+
+
+def test_failure_is_raised(stage):
+    async def collect():
+        return [batch async for batch in stage.iterate(failing_rows, batch_size=1)]
+
+    with pytest.raises(KeyError):
+        asyncio.run(collect())
+
+
+def test_abandoned_iteration_stops_the_generator(stage):
+    async def first_batch():
+        async with aclosing(stage.iterate(slow_rows, 1000, 0.01, batch_size=1)) as batches:
+            async for batch in batches:
+                return batch
+
+    started = time.monotonic()
+    assert asyncio.run(first_batch())[0][0] == 0
+    # The next job only gets the single worker once the abandoned one stopped
+    async def after():
+        return await stage.submit(time.monotonic)
+
+    assert asyncio.run(after()) - started < 5
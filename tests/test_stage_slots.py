@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from backend.api import SlotStreamingResponse
+from backend.pools import Stage, StageSaturated
+
+SCOPE = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "method": "POST", "path": "/"}
+
+
+async def receive():
+    await asyncio.sleep(3600)
+    return {"type": "http.disconnect"}
+
+
+def test_release_is_idempotent():
+    stage = Stage("t", "thread", 1, 1)
+    slot = stage.admit()
+    with pytest.raises(StageSaturated):
+        stage.admit()
+    slot.release()
+    slot.release()
+    assert stage.active == 0
+    stage.admit().release()
+    assert stage.active == 0
+
+
+def test_response_releases_when_sent():
+    stage = Stage("t", "thread", 1, 1)
+    slot = stage.admit()
+    sent = []
+
+    async def body():
+        yield b"a"
+        yield b"b"
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(SlotStreamingResponse(body(), slot)(SCOPE, receive, send))
+    assert b"".join(m.get("body", b"") for m in sent) == b"ab"
+    assert stage.active == 0
+
+
+def test_response_releases_when_client_is_gone_before_the_body():
+    stage = Stage("t", "thread", 1, 1)
+    slot = stage.admit()
+    started = []
+
+    async def body():
+        started.append(True)
+        yield b"never sent"
+
+    async def send(message):
+        raise OSError("client disconnected")
+
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(SlotStreamingResponse(body(), slot)(SCOPE, receive, send))
+    assert not started
+    assert stage.active == 0
@@ -0,0 +1,41 @@
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from vendor import SIMILARITY_CACHE, normalize_vendor, vendor_similarities, vendor_similarity
+
+VENDORS = ["Walmart", "wamlayrmt", "HEB", "H-E-B #552", "Trader Joe's", "Costco Wholesale", "Amazon.com", "Target"]
+
+
+def baseline(expected: str, actual: str) -> float:
+    return SequenceMatcher(None, normalize_vendor(expected), normalize_vendor(actual)).ratio()
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    SIMILARITY_CACHE.clear()
+    yield
+    SIMILARITY_CACHE.clear()
+
+
+def test_expected_is_the_first_sequence():
+    assert vendor_similarity("walmart", "wamlayrmt") == pytest.approx(0.625)
+    assert vendor_similarity("wamlayrmt", "walmart") == pytest.approx(0.75)
+
+
+def test_matches_baseline_orientation():
+    rng = random.Random(6)
+    letters = "abcdefghij "
+    names = VENDORS + ["".join(rng.choice(letters) for _ in range(rng.randint(1, 14))) for _ in range(60)]
+    for expected in names:
+        assert vendor_similarities(expected, names) == [baseline(expected, actual) for actual in names]
+    # Second pass is served from the score cache and reused matchers
+    for expected in reversed(names):
+        assert vendor_similarities(expected, names) == [baseline(expected, actual) for actual in names]
+
+
+def test_empty_names_score_zero():
+    assert vendor_similarity("", "HEB") == 0.0
+    assert vendor_similarities("HEB", ["", "HEB"]) == [0.0, 1.0]
+    assert vendor_similarities("", ["HEB"]) == [0.0]
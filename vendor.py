@@ -0,0 +1,164 @@
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import re
+import sys
+import threading
+
+from metrics import count
+
+
+# ----------------------------
+# Vendor normalization
+# ----------------------------
+
+STORE_NUMBER = re.compile(r"#\s*\d+")
+APOSTROPHES = re.compile(r"['’`]")
+PUNCTUATION = re.compile(r"[^\w\s]+")
+WHITESPACE = re.compile(r"\s+")
+
+CORPORATE_SUFFIXES = {"inc", "llc", "ltd", "co", "corp", "corporation"}
+
+
+@lru_cache(maxsize=4096)
+def normalize_vendor(vendor: str) -> str:
+    """
+    Canonical, interned comparison key for a vendor name.
+
+    Lowercases, drops "#1234" store numbers, apostrophes and other
+    punctuation, and trailing "Inc"/"LLC"-style suffixes:
+      "Trader Joe's #552"  -> "trader joes"
+      "Chick-fil-A, Inc."  -> "chick fil a"
+    Names that would normalize to nothing fall back to lowercase/strip.
+    """
+    key = STORE_NUMBER.sub(" ", vendor.lower())
+    key = APOSTROPHES.sub("", key)
+    key = PUNCTUATION.sub(" ", key)
+
+    words = key.split()
+    while len(words) > 1 and words[-1] in CORPORATE_SUFFIXES:
+        words.pop()
+
+    key = " ".join(words) or WHITESPACE.sub(" ", vendor.lower().strip())
+    return sys.intern(key)
+
+
+# ----------------------------
+# Score cache
+# ----------------------------
+
+class SimilarityCache:
+    """
+    Bounded LRU of (query key, candidate key) -> similarity ratio.
+    """
+
+    def __init__(self, max_entries: int = 65_536):
+        self.max_entries = max_entries
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pair: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._scores.get(pair)
+            if score is not None:
+                self._scores.move_to_end(pair)
+            return score
+
+    def put(self, pair: Tuple[str, str], score: float) -> None:
+        with self._lock:
+            self._scores[pair] = score
+            self._scores.move_to_end(pair)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scores.clear()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+SIMILARITY_CACHE = SimilarityCache()
+
+
+# SequenceMatcher indexes its second sequence, and the candidates (sheet
+# vendors) repeat across queries, so each thread keeps matchers with a
+# candidate key already set as seq2. Not shared: matchers hold state.
+MATCHER_CACHE_SIZE = 4096
+
+_matchers = threading.local()
+
+
+def candidate_matcher(key: str) -> SequenceMatcher:
+    cache = getattr(_matchers, "cache", None)
+    if cache is None:
+        cache = _matchers.cache = OrderedDict()
+
+    matcher = cache.get(key)
+    if matcher is None:
+        matcher = cache[key] = SequenceMatcher(None)
+        matcher.set_seq2(key)
+        if len(cache) > MATCHER_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return matcher
+
+
+# ----------------------------
+# Scoring
+# ----------------------------
+
+def vendor_similarity(vendor1: str, vendor2: str) -> float:
+    """
+    Calculate similarity between two vendor names using difflib.SequenceMatcher
+    over their normalized keys. Returns a value between 0.0 and 1.0.
+    """
+    if not vendor1 or not vendor2:
+        return 0.0
+
+    return vendor_similarities(vendor1, [vendor2])[0]
+
+
+def vendor_similarities(vendor: str, candidates: Sequence[str]) -> List[float]:
+    """
+    Score one vendor against many candidates at once.
+
+    Each distinct candidate key is scored once, as
+    SequenceMatcher(None, vendor, candidate) over the normalized keys (the
+    ratio is not symmetric). Cache misses reuse the candidate's matcher
+    (candidate_matcher), so its index of the candidate is built once.
+    """
+    if not vendor:
+        return [0.0] * len(candidates)
+
+    query = normalize_vendor(vendor)
+    scores: Dict[str, float] = {}
+    misses = 0
+
+    for candidate in candidates:
+        if not candidate:
+            continue
+
+        key = normalize_vendor(candidate)
+        if key in scores:
+            continue
+
+        score = SIMILARITY_CACHE.get((query, key))
+        if score is None:
+            matcher = candidate_matcher(key)
+            matcher.set_seq1(query)
+            score = matcher.ratio()
+            misses += 1
+            SIMILARITY_CACHE.put((query, key), score)
+
+        scores[key] = score
+
+    if misses:
+        count("sequence_matcher_calls", misses)
+    return [
+        scores[normalize_vendor(candidate)] if candidate else 0.0
+        for candidate in candidates
+    ]